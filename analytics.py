@@ -0,0 +1,181 @@
+import threading
+from array import array
+
+import numpy as np
+
+
+class BidderRegistry:
+    """Interns bidder ids to small integers shared by every auction's columns."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = {}  # bidder_id -> int
+        self.ids = []
+        self.names = []
+
+    def intern(self, bidder_id, bidder_name):
+        with self.lock:
+            idx = self.index.get(bidder_id)
+            if idx is None:
+                idx = self.index[bidder_id] = len(self.ids)
+                self.ids.append(bidder_id)
+                self.names.append(bidder_name)
+            elif bidder_name:
+                self.names[idx] = bidder_name
+            return idx
+
+
+bidders = BidderRegistry()
+
+
+class BidColumns:
+    """Bid history as parallel arrays of bidder index, amount and epoch seconds."""
+
+    def __init__(self):
+        self.bidder = array('q')
+        self.amount = array('d')
+        self.time = array('d')
+
+    def __len__(self):
+        return len(self.amount)
+
+    def append(self, bidder_id, bidder_name, amount, epoch):
+        self.bidder.append(bidders.intern(bidder_id, bidder_name))
+        self.amount.append(amount)
+        self.time.append(epoch)
+
+    def rows(self):
+        for idx, amount, epoch in zip(self.bidder, self.amount, self.time):
+            yield bidders.ids[idx], bidders.names[idx], amount, epoch
+
+    def to_numpy(self, start=None, end=None, count=None):
+        """Copy the columns into NumPy arrays, optionally keeping only start <= time <= end.
+
+        ``count`` limits the copy to the first rows, e.g. an auction
+        snapshot's bid count, so a bid appended mid-copy cannot leave the
+        three columns with different lengths.
+        """
+        # Slicing copies each column in one step under the GIL; NumPy then wraps the private
+        # copy. Exporting the live buffers instead would make a concurrent append fail to resize.
+        bidder = np.frombuffer(self.bidder[:count], dtype=np.int64)
+        amount = np.frombuffer(self.amount[:count], dtype=np.float64)
+        times = np.frombuffer(self.time[:count], dtype=np.float64)
+        if count is None:
+            size = min(len(bidder), len(amount), len(times))
+            bidder, amount, times = bidder[:size], amount[:size], times[:size]
+        if start is not None or end is not None:
+            mask = np.ones(len(times), dtype=bool)
+            if start is not None:
+                mask &= times >= start
+            if end is not None:
+                mask &= times <= end
+            bidder, amount, times = bidder[mask], amount[mask], times[mask]
+        return bidder, amount, times
+
+
+PERCENTILES = (25, 50, 75, 90)
+CURVE_POINTS = (0.25, 0.5, 0.75, 1.0)
+
+
+def stack(auctions, start=None, end=None):
+    """Concatenate the auctions' columns with a group index, in auction order."""
+    parts = [auction.bid_columns(start, end) for auction in auctions]
+    counts = np.array([len(part[1]) for part in parts], dtype=np.int64)
+    if not parts or not counts.sum():
+        empty = np.array([], dtype=np.int64)
+        return empty, np.array([]), np.array([]), empty, counts
+    bidder = np.concatenate([part[0] for part in parts])
+    amount = np.concatenate([part[1] for part in parts])
+    times = np.concatenate([part[2] for part in parts])
+    group = np.repeat(np.arange(len(parts)), counts)
+    return bidder, amount, times, group, counts
+
+
+def summarize(auctions, start=None, end=None):
+    """Per-auction bid velocity, unique bidders, amount percentiles and price curve.
+
+    Every aggregate is computed for all requested auctions at once on the
+    stacked columns instead of looping over auctions in Python.
+    """
+    n = len(auctions)
+    bidder, amount, times, group, counts = stack(auctions, start, end)
+    offsets = np.cumsum(counts) - counts
+    has_bids = counts > 0
+    starting = np.array([auction.starting_bid for auction in auctions], dtype=np.float64)
+    snapshots = [auction.snapshot for auction in auctions]
+    auction_start = np.array([snapshot.start_time.timestamp() for snapshot in snapshots])
+    auction_end = np.array([snapshot.end_time.timestamp() for snapshot in snapshots])
+
+    stride = int(bidder.max()) + 1 if len(bidder) else 1
+    unique = np.bincount(np.unique(group * stride + bidder) // stride, minlength=n)
+
+    high = np.full(n, np.nan)
+    last_bid = np.full(n, np.nan)
+    if len(amount):
+        high[has_bids] = np.maximum.reduceat(amount, offsets[has_bids])
+        last_bid[has_bids] = times[offsets[has_bids] + counts[has_bids] - 1]
+
+    window_start = np.full(n, start, dtype=np.float64) if start is not None else auction_start
+    window_end = np.full(n, end, dtype=np.float64) if end is not None else np.fmin(auction_end, last_bid)
+    velocity = counts / (np.maximum(np.nan_to_num(window_end - window_start), 1.0) / 3600)
+
+    # Percentiles: sort amounts within each auction, then interpolate linearly by rank
+    sorted_amount = amount[np.lexsort((amount, group))]
+    ranks = (np.maximum(counts, 1) - 1)[:, None] * (np.array(PERCENTILES) / 100.0)
+    lower = np.floor(ranks).astype(np.int64)
+    last = max(len(sorted_amount) - 1, 0)
+    if len(sorted_amount):
+        lo = sorted_amount[np.minimum(offsets[:, None] + lower, last)]
+        hi = sorted_amount[np.minimum(offsets[:, None] + lower + 1, last)]
+        percentiles = lo + (hi - lo) * (ranks - lower)
+    else:
+        percentiles = np.zeros((n, len(PERCENTILES)))
+
+    # Price curve: standing bid at each fraction of the auction window. One
+    # searchsorted over (auction, time) keys covers every auction; accepted
+    # bids only go up, so the last bid before a checkpoint is the high bid.
+    checkpoints = auction_start[:, None] + np.array(CURVE_POINTS) * (auction_end - auction_start)[:, None]
+    curve = np.repeat(starting[:, None], len(CURVE_POINTS), axis=1)
+    if len(times):
+        origin = min(times.min(), checkpoints.min())
+        span = max(times.max(), checkpoints.max()) - origin + 1
+        bid_keys = group * span + (times - origin)
+        checkpoint_keys = np.arange(n)[:, None] * span + (checkpoints - origin)
+        positions = np.searchsorted(bid_keys, checkpoint_keys, side='right')
+        seen = positions > offsets[:, None]
+        curve[seen] = amount[positions[seen] - 1]
+
+    summaries = []
+    for i, auction in enumerate(auctions):
+        bids = int(counts[i])
+        summaries.append({
+            'post_id': auction.post_id,
+            'bids': bids,
+            'unique_bidders': int(unique[i]),
+            'starting_bid': auction.starting_bid,
+            'high_bid': float(high[i]) if bids else None,
+            'bids_per_hour': float(velocity[i]),
+            'amount_percentiles': dict(zip((f"p{p}" for p in PERCENTILES), percentiles[i].tolist())) if bids else {},
+            'price_curve': dict(zip((f"{int(p * 100)}%" for p in CURVE_POINTS), curve[i].tolist())),
+        })
+    return summaries
+
+
+def top_bidders(auctions, start=None, end=None, limit=10):
+    """Bidders ranked by bid count across auctions, with their highest bid."""
+    bidder, amount, _, _, _ = stack(auctions, start, end)
+    if not len(bidder):
+        return []
+    counts = np.bincount(bidder)
+    highest = np.zeros(len(counts))
+    np.maximum.at(highest, bidder, amount)
+    order = np.argsort(counts, kind='stable')[::-1][:limit]
+    return [
+        {
+            'bidder_id': bidders.ids[idx],
+            'bidder': bidders.names[idx],
+            'bids': int(counts[idx]),
+            'highest_bid': float(highest[idx]),
+        }
+        for idx in order.tolist() if counts[idx]
+    ]
@@ -0,0 +1,200 @@
+import collections
+import threading
+import time
+
+import requests
+
+import metrics
+from graph_client import GraphError, GraphUnavailable, classify
+
+ANNOUNCE_LATENCY = metrics.histogram('announcement_latency_seconds',
+                                     'Time from queueing an announcement to Graph accepting it', ['kind'])
+ANNOUNCEMENTS = metrics.counter('announcements_total', 'Announcements by outcome', ['result'])
+
+
+def can_resend(error):
+    """True if a failed comment POST cannot have been posted, so sending it again won't double it.
+
+    A refused call never left, a connect timeout never reached Graph, and a
+    server or throttle error body means Graph did not take it. A read
+    timeout or a reset connection may have posted the comment already.
+    """
+    if isinstance(error, (GraphUnavailable, requests.ConnectTimeout)):
+        return True
+    if isinstance(error, GraphError):
+        return classify(error.code) in ('server', 'throttle')
+    return False
+
+
+class Announcement:
+    def __init__(self, post_id, message, kind):
+        self.post_id = post_id
+        self.message = message
+        self.kind = kind
+        self.queued_at = time.monotonic()
+
+
+class AnnouncementQueue:
+    """Background sender for auction comments.
+
+    Announcements are sharded by post so each post's messages go out in
+    order from one worker. A "bid" announcement that is still waiting when
+    a newer one arrives for the same post is replaced by it; "start" and
+    "winner" announcements are never coalesced or dropped.
+
+    With ``send_batch`` a worker that finds several announcements waiting
+    sends up to ``batch_size`` of them, one per post, in a single call.
+    It takes ``(post_id, message)`` pairs and returns an exception or None
+    for each. Failures go to ``log(message, level, event, post_id)``.
+    """
+
+    COALESCE_KINDS = ('bid',)
+
+    def __init__(self, send, workers=4, max_retries=3, backoff=1.0, max_depth=10000, name='announcer',
+                 send_batch=None, batch_size=50, log=None):
+        self.send = send
+        self.log = log
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.name = name
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_depth = max_depth
+        self.running = False
+        self.lock = threading.Condition()
+        self.shards = [collections.deque() for _ in range(workers)]
+        self.pending_bids = {}  # post_id -> Announcement still waiting in a shard
+        self.threads = []
+        self.latencies = collections.deque(maxlen=1000)
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'coalesced': 0, 'dropped': 0}
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.threads = [
+            threading.Thread(target=self._worker, args=(shard,), daemon=True, name=f"{self.name}-{i}")
+            for i, shard in enumerate(self.shards)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.lock.notify_all()
+
+    def depth(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def enqueue(self, post_id, message, kind='info'):
+        with self.lock:
+            if kind in self.COALESCE_KINDS:
+                waiting = self.pending_bids.get(post_id)
+                if waiting is not None:
+                    waiting.message = message
+                    self.stats['coalesced'] += 1
+                    return
+                if self.depth() >= self.max_depth:
+                    self.stats['dropped'] += 1
+                    return
+            announcement = Announcement(post_id, message, kind)
+            if kind in self.COALESCE_KINDS:
+                self.pending_bids[post_id] = announcement
+            self.shards[hash(post_id) % self.workers].append(announcement)
+            self.stats['queued'] += 1
+            self.lock.notify_all()
+
+    def _take(self, shard):
+        # The next announcement, plus with send_batch those after it up to a second one for the same post
+        with self.lock:
+            while self.running and not shard:
+                self.lock.wait()
+            taken = []
+            posts = set()
+            limit = self.batch_size if self.send_batch is not None else 1
+            while shard and len(taken) < limit and shard[0].post_id not in posts:
+                announcement = shard.popleft()
+                if self.pending_bids.get(announcement.post_id) is announcement:
+                    del self.pending_bids[announcement.post_id]
+                taken.append(announcement)
+                posts.add(announcement.post_id)
+            return taken
+
+    def _worker(self, shard):
+        while True:
+            announcements = self._take(shard)
+            if not announcements:
+                return
+            if len(announcements) == 1:
+                self._deliver(announcements[0])
+            else:
+                self._deliver_batch(announcements)
+
+    def _deliver(self, announcement):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.send(announcement.post_id, announcement.message)
+            except Exception as e:
+                if attempt < self.max_retries and can_resend(e):
+                    self._retrying(1, attempt)
+                    continue
+                self._failed(announcement, e)
+                return
+            self._sent(announcement)
+            return
+
+    def _deliver_batch(self, announcements):
+        for attempt in range(self.max_retries + 1):
+            try:
+                errors = self.send_batch([(a.post_id, a.message) for a in announcements])
+            except Exception as e:
+                errors = [e] * len(announcements)
+            retry = []
+            for announcement, error in zip(announcements, errors):
+                if error is None:
+                    self._sent(announcement)
+                elif attempt < self.max_retries and can_resend(error):
+                    retry.append(announcement)
+                else:
+                    self._failed(announcement, error)
+            if not retry:
+                return
+            self._retrying(len(retry), attempt)
+            announcements = retry
+
+    def _retrying(self, count, attempt):
+        with self.lock:
+            self.stats['retries'] += count
+        time.sleep(self.backoff * (2 ** attempt))
+
+    def _sent(self, announcement):
+        latency = time.monotonic() - announcement.queued_at
+        with self.lock:
+            self.stats['sent'] += 1
+            self.latencies.append(latency)
+        ANNOUNCE_LATENCY.observe(latency, kind=announcement.kind)
+        ANNOUNCEMENTS.inc(result='sent')
+
+    def _failed(self, announcement, error):
+        with self.lock:
+            self.stats['failed'] += 1
+        ANNOUNCEMENTS.inc(result='failed')
+        if self.log is not None:
+            self.log(f"Error posting {announcement.kind} comment on {announcement.post_id}: {str(error)}", 'error',
+                     'announcement', announcement.post_id)
+
+    def get_stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = dict(self.stats, depth=self.depth(), running=self.running)
+        if latencies:
+            stats['send_latency'] = {
+                'avg': sum(latencies) / len(latencies),
+                'p50': latencies[len(latencies) // 2],
+                'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                'max': latencies[-1],
+            }
+        return stats
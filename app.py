@@ -1,17 +1,62 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user
-import requests
+import atexit
+import collections
 import datetime
+import re
 import threading
 import time
-import re
 import pytz
 import os
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
+import analytics
+import bidparse
+import export
+import importer
+import metrics
+from events import EventBus
+from graph_client import BatchItem, GraphError
+from logs import LEVELS, LogRing, LogWriter
+from pages import DEFAULT_PAGE, PageWorkers, TokenRegistry
+from poll_policy import FixedPollPolicy, PollPolicy
+from profiler import SamplingProfiler
+from read_model import STATUSES, MAX_PER_PAGE, ReadModel
+from scheduler import LifecycleScheduler
+from storage import open_store
+from webhooks import CommentDeduper, WebhookIngestor, extract_comments, verify_signature
 
 load_dotenv()
 
+POLL_INTERVAL = 30  # Seconds between polls of the same auction under the fixed policy
+POLL_ENGINES = ('thread', 'asyncio', 'batch')
+POLL_POLICIES = ('adaptive', 'fixed')
+# embedded: each process monitors its own auctions (single worker only)
+# web: Flask workers share AUCTION_STORE and leave polling to monitor.py
+# monitor: the dedicated monitor process started by monitor.py
+MONITOR_MODE = os.environ.get('MONITOR_MODE', 'embedded')
+# With webhooks configured, polling only reconciles comments the webhook missed
+FB_APP_SECRET = os.environ.get('FB_APP_SECRET')
+FB_VERIFY_TOKEN = os.environ.get('FB_VERIFY_TOKEN')
+RECONCILE_INTERVAL = int(os.environ.get('WEBHOOK_RECONCILE_INTERVAL', 300))
+# adaptive: poll faster near the close and during bidding, slower when idle or near the rate limit
+POLL_POLICY = os.environ.get('POLL_POLICY', 'fixed' if FB_APP_SECRET else 'adaptive')
+LOG_CAPACITY = int(os.environ.get('LOG_CAPACITY', 1000))  # Records kept for /api/logs
+LOG_FILE = os.environ.get('LOG_FILE')  # Also append log lines here
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # When set, /metrics wants "Authorization: Bearer <token>"
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 10000))  # Rows one bulk import request may carry
+CLOSE_TIMEOUT = float(os.environ.get('CLOSE_TIMEOUT', 10))  # Longest the last comment read at an end edge may take
+AUCTION_TIME = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4}) (\d{1,2}):(\d{1,2})')  # DD/MM/YYYY HH:MM
+
+SWEEP_SECONDS = metrics.histogram('poll_sweep_seconds', 'Time to poll every due auction once', ['engine'])
+POLL_SECONDS = metrics.histogram('auction_poll_seconds', 'Time to fetch and process one auction\'s comments',
+                                 ['engine'])
+DETECTION_LAG = metrics.histogram('bid_detection_lag_seconds', 'Time from a bid comment being posted to handling it',
+                                  ['source'], buckets=metrics.LAG_BUCKETS)
+BIDS = metrics.counter('bids_total', 'Bid comments by outcome', ['result'])
+COMMENTS = metrics.counter('comments_total', 'Comments read while polling, by stage', ['stage'])
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key')
 
@@ -32,191 +77,1032 @@ users = {'admin': {'password': 'password123'}}  # Username: admin, Password: pas
 def load_user(user_id):
     return User(user_id) if user_id in users else None
 
+def comment_time(comment):
+    # Epoch seconds a comment was posted: Graph sends '2024-01-01T12:00:00+0000', webhooks an int
+    created_time = comment.get('created_time')
+    if isinstance(created_time, (int, float)):
+        return float(created_time)
+    try:
+        return dt.strptime(created_time, '%Y-%m-%dT%H:%M:%S%z').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+_timezones = {}
+
+def get_timezone(name):
+    # pytz.timezone re-checks the name on every call; auctions share a handful of zones
+    if not isinstance(name, str):
+        raise ValueError(f"Unknown time zone: {name!r}")
+    timezone = _timezones.get(name)
+    if timezone is None:
+        try:
+            timezone = _timezones[name] = pytz.timezone(name)
+        except pytz.UnknownTimeZoneError:
+            raise ValueError(f"Unknown time zone: {name}")
+    return timezone
+
+def parse_auction_time(value):
+    # What dt.strptime(value, '%d/%m/%Y %H:%M') returns, at a fraction of the cost for bulk imports
+    match = AUCTION_TIME.fullmatch(value.strip()) if isinstance(value, str) else None
+    if match is None:
+        raise ValueError(f"time data {value!r} does not match format 'DD/MM/YYYY HH:MM'")
+    day, month, year, hour, minute = map(int, match.groups())
+    return dt(year, month, day, hour, minute)
+
+class CommentCursor:
+    """High-water mark for a post's comment stream.
+
+    ``after`` is the Graph paging cursor of the last page read; the last-seen
+    created_time plus the ids seen at that instant let us drop comments that
+    Graph hands back again when a cursor is stale.
+    """
+
+    def __init__(self):
+        self.after = None
+        self.last_comment_id = None
+        self.last_created_time = None
+        self.ids_at_last_time = set()
+
+    def is_new(self, comment):
+        created_time = comment.get('created_time')
+        if self.last_created_time is None or created_time is None:
+            return comment['id'] not in self.ids_at_last_time
+        if created_time != self.last_created_time:
+            return created_time > self.last_created_time
+        return comment['id'] not in self.ids_at_last_time
+
+    def advance(self, comments, after):
+        if after:
+            self.after = after
+        for comment in comments:
+            created_time = comment.get('created_time')
+            if created_time != self.last_created_time:
+                self.last_created_time = created_time
+                self.ids_at_last_time = set()
+            self.ids_at_last_time.add(comment['id'])
+            self.last_comment_id = comment['id']
+
+    def to_dict(self):
+        return {
+            'after': self.after,
+            'last_comment_id': self.last_comment_id,
+            'last_created_time': self.last_created_time,
+            'ids_at_last_time': sorted(self.ids_at_last_time),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        cursor = cls()
+        cursor.after = data.get('after')
+        cursor.last_comment_id = data.get('last_comment_id')
+        cursor.last_created_time = data.get('last_created_time')
+        cursor.ids_at_last_time = set(data.get('ids_at_last_time', []))
+        return cursor
+
+
+def as_datetime(value):
+    return value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(value)
+
+
+class AuctionSnapshot(collections.namedtuple('AuctionSnapshot', [
+        'post_id', 'version', 'current_bid', 'current_bidder', 'active',
+        'start_time', 'end_time', 'timezone', 'bid_count'])):
+    """Immutable copy of an auction's state that readers use without its lock."""
+    __slots__ = ()
+
+    def is_live(self, now=None):
+        now = now or datetime.datetime.now(self.timezone)
+        return self.start_time <= now <= self.end_time
+
+
 class Auction:
-    def __init__(self, post_id, start_time, end_time, starting_bid=0, timezone='Australia/Sydney'):
+    """One auction; every mutation holds ``lock`` and publishes a new ``snapshot``."""
+
+    def __init__(self, post_id, start_time, end_time, starting_bid=0, timezone='Australia/Sydney', page_id=None):
         self.post_id = post_id
-        self.timezone = pytz.timezone(timezone)
-        self.start_time = datetime.datetime.fromisoformat(start_time).astimezone(self.timezone)
-        self.end_time = datetime.datetime.fromisoformat(end_time).astimezone(self.timezone)
+        self.page_id = page_id or DEFAULT_PAGE  # The Facebook Page whose token reads and comments on the post
+        # Times are ISO strings or datetimes; naive ones are in the server's local time
+        self.timezone = get_timezone(timezone)
+        self.start_time = as_datetime(start_time).astimezone(self.timezone)
+        self.end_time = as_datetime(end_time).astimezone(self.timezone)
         self.starting_bid = starting_bid
         self.current_bid = starting_bid
         self.current_bidder = None
-        self.bid_history = []  # List of (bidder_id, bidder_name, amount, timestamp)
+        self.loaded_bids = analytics.BidColumns()  # Columnar bid history: bidder index, amount, epoch seconds
+        self.stored_bids = 0  # While loaded_bids is None (an ended auction restored without them), how many there are
         self.active = False
+        self.comment_cursor = CommentCursor()
+        self.last_poll_stats = {'fetched': 0, 'parsed': 0, 'pages': 0}
+        self.announcer = None  # The Page's AnnouncementQueue; sends directly while monitoring is stopped
+        self.store = None  # AuctionStore that lifecycle changes and bids are written to
+        self.listener = None  # Called as listener(auction, op, fields) after every recorded change
+        self.logger = None  # The manager's log_message once attached
+        self.lock = threading.RLock()  # Serializes bid handling between the poller and webhook ingestion
+        self.read_lock = threading.Lock()  # Serializes processing comment reads between polls and the close
+        self.next_poll = 0.0  # Epoch seconds when the pollers should read this auction's comments again
+        self.poll_interval = None  # Interval the poll policy last chose
+        self.deleted = False
+        self.closing = False  # Set when the end edge's final read starts; later poll results are dropped
+        self.version = 0
+        self.snapshot = None
+        self.publish()
+
+    def publish(self):
+        # Call with lock held: readers swap to the new snapshot in one reference assignment
+        self.version += 1
+        self.snapshot = AuctionSnapshot(self.post_id, self.version, self.current_bid, self.current_bidder,
+                                        self.active, self.start_time, self.end_time, self.timezone, self.bid_count())
+
+    def bid_count(self):
+        return self.stored_bids if self.loaded_bids is None else len(self.loaded_bids)
+
+    @property
+    def bids(self):
+        # Ended auctions come back from the store without their bids; the first read fetches them
+        if self.loaded_bids is None:
+            with self.lock:
+                if self.loaded_bids is None:
+                    self.loaded_bids = analytics.BidColumns()
+                    self.extend_bids(self.store.bids(self.post_id, self.stored_bids))
+        return self.loaded_bids
+
+    def extend_bids(self, bids):
+        """Append stored bids, [bidder_id, bidder_name, amount, ISO time]; only counted if not loaded."""
+        with self.lock:
+            if self.loaded_bids is None:
+                self.stored_bids += len(bids)
+                return
+            for bidder_id, bidder_name, amount, timestamp in bids:
+                self.loaded_bids.append(bidder_id, bidder_name, amount,
+                                        datetime.datetime.fromisoformat(timestamp).timestamp())
+
+    @property
+    def bid_history(self):
+        # List of (bidder_id, bidder_name, amount, timestamp) in the auction's time zone
+        return [
+            (bidder_id, bidder_name, amount, datetime.datetime.fromtimestamp(epoch, self.timezone))
+            for bidder_id, bidder_name, amount, epoch in self.bids.rows()
+        ]
+
+    @bid_history.setter
+    def bid_history(self, history):
+        bids = analytics.BidColumns()
+        for bidder_id, bidder_name, amount, timestamp in history:
+            bids.append(bidder_id, bidder_name, amount, timestamp.timestamp())
+        with self.lock:
+            self.loaded_bids = bids
+            self.publish()
+
+    def bid_columns(self, start=None, end=None):
+        # NumPy copies of the bids in the current snapshot, consistent with its current_bid
+        return self.bids.to_numpy(start, end, self.snapshot.bid_count)
+
+    def record_created(self):
+        self.record('auction', start_time=self.start_time.isoformat(), end_time=self.end_time.isoformat(),
+                    starting_bid=self.starting_bid, timezone=self.timezone.zone, page_id=self.page_id)
+
+    def record(self, op, **fields):
+        if self.store is not None:
+            self.store.append(dict(fields, op=op, post_id=self.post_id))
+        if self.listener is not None:
+            self.listener(self, op, fields)
 
     def is_active(self):
-        now = datetime.datetime.now(self.timezone)
-        if self.start_time <= now <= self.end_time:
-            if not self.active:
-                self.active = True
-                self.announce_start()
-            return True
-        elif now > self.end_time and self.active:
+        # Lifecycle state as of the last start/end edge the scheduler fired; no side effects
+        return self.active
+
+    def is_live(self, now=None):
+        # Whether now falls inside the auction window, for display
+        return self.snapshot.is_live(now)
+
+    def begin(self):
+        """Start edge: mark the auction active and announce it, once."""
+        with self.lock:
+            if self.active or self.deleted:
+                return False
+            self.active = True
+            self.publish()
+            self.record('state', active=True)
+        self.announce_start()
+        return True
+
+    def finish(self):
+        """End edge: mark the auction ended and announce the winner, once."""
+        with self.lock:
+            if not self.active or self.deleted:
+                return False
             self.active = False
-            self.select_winner()
-        return False
-
-    def parse_bid(self, comment_text, commenter_id, commenter_name):
-        # Simple bid parsing without price_parser
-        match = re.search(r'(\$?\s*(\d+(?:\.\d{2})?))', comment_text)
-        if match:
-            amount = float(match.group(2))
-            if amount > self.current_bid:
-                return amount
+            self.publish()
+            self.record('state', active=False)
+        self.select_winner()
+        return True
+
+    def parse_bid(self, comment_text, commenter_id, commenter_name, amount=None):
+        # Unlocked pre-check; add_bid checks again under the lock.
+        # amount lets batch callers pass a value bidparse.parse_many already extracted
+        if amount is None:
+            amount = bidparse.parse_amount(comment_text)
+        if amount is not None and amount > self.current_bid:
+            return amount
         return None
 
     def add_bid(self, bidder_id, bidder_name, amount):
-        self.current_bid = amount
-        self.current_bidder = bidder_id
-        timestamp = datetime.datetime.now(self.timezone)
-        self.bid_history.append((bidder_id, bidder_name, amount, timestamp))
+        """Accept the bid if it still beats the current one; returns whether it did."""
+        with self.lock:
+            if self.deleted or amount <= self.current_bid:
+                return False
+            self.current_bid = amount
+            self.current_bidder = bidder_id
+            timestamp = datetime.datetime.now(self.timezone)
+            self.bids.append(bidder_id, bidder_name, amount, timestamp.timestamp())
+            self.publish()
+            self.record('bid', bidder_id=bidder_id, bidder_name=bidder_name, amount=amount,
+                        time=timestamp.isoformat())
+        # Notifications may hit the network, so they go out after the lock is released
         self.notify_outbid(bidder_id, bidder_name)
         self.announce_new_bid(bidder_id, bidder_name, amount)
+        return True
 
     def announce_start(self):
-        self.post_to_post(f"Auction started! Starting bid: ${self.starting_bid}")
+        self.post_to_post(f"Auction started! Starting bid: ${self.starting_bid}", kind='start')
 
     def select_winner(self):
         if self.current_bidder:
             winner_msg = f"Auction ended! Winner: {self.current_bidder} with bid ${self.current_bid}!"
-            self.post_to_post(winner_msg)
+            self.post_to_post(winner_msg, kind='winner')
             self.notify_winner(self.current_bidder)
 
-    def post_to_post(self, message):
-        access_token = os.environ.get('FB_ACCESS_TOKEN')
-        if not access_token:
-            print("No Facebook access token configured")
+    def post_to_post(self, message, kind='info'):
+        if self.announcer is None:
+            return  # Not attached to a manager, so there is no Page to post as
+        if self.announcer.running:
+            self.announcer.enqueue(self.post_id, message, kind)
             return
-            
-        url = f"https://graph.facebook.com/v19.0/{self.post_id}/comments"
-        params = {'access_token': access_token, 'message': message}
         try:
-            response = requests.post(url, params=params)
-            if 'error' in response.json():
-                print(f"Error posting comment: {response.json()['error']['message']}")
+            self.announcer.send(self.post_id, message)
         except Exception as e:
-            print(f"Error posting comment: {str(e)}")
+            self.log(f"Error posting comment on {self.post_id}: {str(e)}", 'error', 'announcement')
 
     def announce_new_bid(self, bidder_id, bidder_name, amount):
-        self.post_to_post(f"New bid: {bidder_name} bids ${amount}! Current high: ${amount}")
+        self.post_to_post(f"New bid: {bidder_name} bids ${amount}! Current high: ${amount}", kind='bid')
 
     def notify_outbid(self, bidder_id, bidder_name):
-        print(f"Notification: {bidder_name} ({bidder_id}) outbid! New high: ${self.current_bid}")
+        self.log(f"Notification: {bidder_name} ({bidder_id}) outbid! New high: ${self.current_bid}", event='bid')
 
     def notify_winner(self, winner_id):
-        print(f"Congratulations! User {winner_id} won with ${self.current_bid}")
+        self.log(f"Congratulations! User {winner_id} won with ${self.current_bid}", event='auction')
+
+    def log(self, message, level='info', event=None):
+        if self.logger is not None:
+            self.logger(message, level, event, self.post_id)
 
 class FacebookAuctionManager:
-    def __init__(self):
-        self.access_token = os.environ.get('FB_ACCESS_TOKEN')
-        self.auctions = {}  # post_id -> Auction
+    def __init__(self, store=None, tokens=None):
+        self.tokens = tokens or TokenRegistry.from_env()
+        self.pages = {}  # page_id -> PageWorkers; replaced like auctions
+        self.pages_lock = threading.Lock()
+        self.auctions = {}  # post_id -> Auction; replaced, never mutated, so readers iterate it without locks
+        self.lock = threading.Lock()  # Held by writers swapping in a new auctions dict
         self.monitoring = False
-        self.timezone = pytz.timezone('Australia/Sydney')
+        self.timezone = get_timezone('Australia/Sydney')
         self.date_format = '%d/%m/%Y %H:%M'
-        self.log_messages = []
-        self.monitor_thread = None
+        self.logs = LogRing(LOG_CAPACITY)
+        self.log_writer = LogWriter(self.format_log, LOG_FILE)
+        self.poll_engine = os.environ.get('POLL_ENGINE', 'thread')
+        self.comment_stats = {'polls': 0, 'fetched': 0, 'parsed': 0, 'pages': 0}
+        self.store = store
+        if store is not None:
+            store.log = self.log_message
+        self.store_version = None  # SQLite data_version at the last sync
+        self.store_mark = None  # Where the last sync's changes() left off
+        self.sync_lock = threading.Lock()
+        self.store_watcher = None
+        self.events = EventBus()
+        self.reads = ReadModel(self)  # Cached /api/auctions rows; bumped on every auction change
+        self.profiler = SamplingProfiler()
+        self.poll_interval = RECONCILE_INTERVAL if FB_APP_SECRET else POLL_INTERVAL
+        self.poll_policy = PollPolicy() if POLL_POLICY == 'adaptive' else FixedPollPolicy(self.poll_interval)
+        self.seen_comments = CommentDeduper()
+        self.webhooks = WebhookIngestor(self)
+        self.live = {}  # post_id -> Auction between its start and end edges; each Page's poller sweeps its share
+        # Only the process that polls fires lifecycle edges; monitor.py starts it while it holds the lease
+        self.scheduler = None
+        if MONITOR_MODE == 'embedded':
+            self.scheduler = LifecycleScheduler(self.on_lifecycle_edge, log=self.log_message)
+        self.closers = ThreadPoolExecutor(max_workers=8, thread_name_prefix='closer')  # End edges' last reads
+        self.register_gauges()
+
+    def register_gauges(self):
+        # Read at scrape time, so they cost nothing between scrapes
+        metrics.gauge('auctions', 'Auctions loaded, and those between their start and end',
+                      lambda: {'loaded': len(self.auctions), 'live': len(self.live)}, label='state')
+        metrics.gauge('announcement_queue_depth', 'Announcements waiting to be sent, by Page',
+                      lambda: {page_id: page.announcements.depth() for page_id, page in self.pages.items()},
+                      label='page')
+        metrics.gauge('graph_usage_percent', 'Highest Graph API usage from the last rate-limit headers, by Page',
+                      self.tokens.usage, label='page')
+        metrics.gauge('dashboard_subscribers', 'Open dashboard event streams', lambda: self.events.subscribers)
+
+    def restore(self):
+        """Rebuild auctions from the store after a restart."""
+        if self.store is None:
+            return
+        if hasattr(self.store, 'changes'):
+            self.sync_from_store(full=True)  # Also marks where this process's later syncs start from
+        else:
+            self.attach(*(self.auction_from_record(record) for record in self.store.load()))
+        self.log_message(f"Restored {len(self.auctions)} auctions from storage", event='storage')
+
+    def auction_from_record(self, record):
+        auction = Auction(record['post_id'], record['start_time'], record['end_time'],
+                          record['starting_bid'], record['timezone'], record.get('page_id'))
+        auction.current_bid = record['current_bid']
+        auction.current_bidder = record['current_bidder']
+        auction.active = record['active']
+        if record['bids'] is None:
+            auction.loaded_bids, auction.stored_bids = None, record['bid_count']  # Read on demand
+        else:
+            auction.extend_bids(record['bids'])
+        if record['cursor']:
+            auction.comment_cursor = CommentCursor.from_dict(record['cursor'])
+        auction.publish()
+        return auction
+
+    def sync_from_store(self, refresh=True, full=False):
+        """Pick up changes other processes committed to a shared SQLite store.
+
+        Only what changed since the last sync is read. Web workers
+        (``refresh=True``) apply bids and state changes to their copies; the
+        monitor process owns bid state, so it only adds and drops auctions.
+        ``full`` rereads everything, for a monitor taking over as leader.
+        """
+        with self.sync_lock:
+            version = self.store.data_version()
+            if version == self.store_version and not full:
+                return
+            self.store_version = version
+            self._sync_settings()
+            since = None if full else self.store_mark
+            records, bids, deleted, self.store_mark = self.store.changes(since)
+            self._sync_records(records, bids, deleted, refresh, since is None)
+
+    def _sync_settings(self):
+        timezone = self.store.get_setting('timezone')
+        date_format = self.store.get_setting('date_format')
+        if timezone and date_format and (timezone, date_format) != (self.timezone.zone, self.date_format):
+            self.apply_settings(timezone, date_format)
+            self.events.publish('resync', {})  # Every row's times are formatted anew
+
+    def _sync_records(self, records, bids, deleted, refresh, full):
+        if full:
+            present = {record['post_id'] for record in records}
+            deleted = [post_id for post_id in self.auctions if post_id not in present]
+        for auction in self.detach(*deleted):
+            self.events.publish('auction_removed', {'post_id': auction.post_id})
+        new_bids = collections.defaultdict(list)
+        for post_id, bid in bids:
+            new_bids[post_id].append(bid)
+        fresh, changed = [], []
+        for record in records:
+            auction = self.auctions.get(record['post_id'])
+            if record['new'] and (refresh or not full or auction is None):
+                auction = self.auction_from_record(record)
+                if auction.timezone.zone != self.timezone.zone:
+                    self.localize(auction)
+                fresh.append(auction)
+            elif refresh and auction is not None:
+                self.update_from_record(auction, record, new_bids[auction.post_id])
+                changed.append(auction)
+        for old in self.detach(*(auction.post_id for auction in fresh if auction.post_id in self.auctions)):
+            with old.lock:
+                old.deleted = True  # Re-created elsewhere; this copy must not be polled or record anything
+        self.attach(*fresh)
+        if changed:
+            self.reads.bump()
+        for auction in fresh + changed:
+            self.events.publish('auction', self.auction_row(auction.snapshot))
+
+    def update_from_record(self, auction, record, bids):
+        # Another process's bids and state changes, applied in place without recording them again
+        with auction.lock:
+            auction.current_bid = record['current_bid']
+            auction.current_bidder = record['current_bidder']
+            auction.active = record['active']
+            if record['cursor']:
+                auction.comment_cursor = CommentCursor.from_dict(record['cursor'])
+            auction.extend_bids(bids)
+            auction.publish()
+
+    def start_store_watcher(self, interval=1.0):
+        """Keep a web worker's copy fresh so its dashboards get pushed events."""
+        if self.store_watcher is not None:
+            return
 
-    def start_monitoring(self):
+        def watch():
+            while True:
+                try:
+                    self.sync_from_store()
+                except Exception as e:
+                    self.log_message(f"Error syncing from store: {str(e)}", 'error', 'storage')
+                time.sleep(interval)
+
+        self.store_watcher = threading.Thread(target=watch, daemon=True)
+        self.store_watcher.start()
+
+    def attach(self, *auctions, replace=True):
+        """Add auctions, replacing any with the same post_id unless ``replace`` is False.
+
+        Then a post_id that is taken raises ValueError and nothing is added.
+        """
+        for auction in auctions:
+            auction.announcer = self.page(auction.page_id).announcements
+            auction.store = self.store
+            auction.listener = self.on_auction_change
+            auction.logger = self.log_message
+        with self.lock:
+            taken = None if replace else next(
+                (auction.post_id for auction in auctions if auction.post_id in self.auctions), None)
+            if taken is not None:
+                raise ValueError(f"post_id {taken} already has an auction; delete it first")
+            updated = dict(self.auctions)
+            updated.update((auction.post_id, auction) for auction in auctions)
+            self.auctions = updated
+        self.reads.bump()
+        if self.scheduler is not None:
+            self.scheduler.schedule(*auctions)
+
+    def detach(self, *post_ids):
+        """Remove auctions by post id; returns the ones that were present."""
+        with self.lock:
+            updated = dict(self.auctions)
+            removed = [auction for auction in (updated.pop(post_id, None) for post_id in post_ids) if auction]
+            self.auctions = updated
+        self.reads.bump()
+        for auction in removed:
+            self.live.pop(auction.post_id, None)
+            self.page(auction.page_id).live.pop(auction.post_id, None)
+            if self.scheduler is not None:
+                self.scheduler.cancel(auction.post_id)
+        return removed
+
+    def start_lifecycle(self):
+        if self.scheduler is None:
+            self.scheduler = LifecycleScheduler(self.on_lifecycle_edge, log=self.log_message)
+        self.scheduler.schedule(*self.auctions.values())
+
+    def stop_lifecycle(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        self.live.clear()
+        for page in self.pages.values():
+            page.live.clear()
+
+    def on_lifecycle_edge(self, post_id, edge):
+        auction = self.auctions.get(post_id)
+        if auction is None:
+            return
+        page = self.page(auction.page_id)
+        if edge == 'start':
+            self.live[post_id] = page.live[post_id] = auction
+            auction.begin()
+        else:
+            self.live.pop(post_id, None)
+            page.live.pop(post_id, None)
+            if self.tokens.token(auction.page_id) is None:
+                auction.finish()
+            else:
+                # Off the scheduler thread, so a slow read doesn't hold up other edges
+                self.closers.submit(self.close_auction, post_id, auction)
+
+    def close_auction(self, post_id, auction):
+        """Read the comments once more, then finish: bids since the last poll still count.
+
+        A poll of the auction already in flight either finishes processing
+        before the final read starts (which then reads on from its cursor)
+        or has its results dropped, so nothing it fetched lands afterwards.
+        """
+        with auction.read_lock:
+            auction.closing = True  # Waits out a poll's process_comments, which holds read_lock
+        try:
+            data = self.fetch_comments(post_id, auction, timeout=CLOSE_TIMEOUT)
+            if 'data' in data:
+                # Comments that arrived after the close are not bids
+                end = auction.end_time.timestamp()
+                data = dict(data, data=[comment for comment in data['data']
+                                        if (comment_time(comment) or end) <= end])
+            self.process_comments(post_id, auction, data, final=True)
+        except Exception as e:
+            self.log_message(f"Error reading final comments for {post_id}: {str(e)}", 'error', 'poll', post_id)
+        finally:
+            auction.finish()
+
+    def on_auction_change(self, auction, op, fields):
+        if op in ('auction', 'state', 'bid', 'delete'):
+            self.reads.bump()
+        if op == 'delete':
+            self.events.publish('auction_removed', {'post_id': auction.post_id})
+        elif op in ('auction', 'state', 'bid'):
+            self.events.publish('auction', self.auction_row(auction.snapshot))
+            if op == 'bid':
+                self.events.publish('bid', {
+                    'post_id': auction.post_id,
+                    'bidder': fields['bidder_name'],
+                    'amount': f"${fields['amount']}",
+                    'time': datetime.datetime.fromisoformat(fields['time']).strftime(self.date_format),
+                })
+
+    def page(self, page_id):
+        """The Page's worker group, created (and started, while monitoring) on first use."""
+        page = self.pages.get(page_id)
+        if page is not None:
+            return page
+        with self.pages_lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                page = PageWorkers(page_id, self.send_comment, self.send_comments, self.log_message)
+                self.pages = dict(self.pages, **{page_id: page})
+                if self.monitoring:
+                    self.start_page(page)
+        return page
+
+    def start_monitoring(self, engine=None):
         if self.monitoring:
             return
-        self.monitoring = True
-        self.monitor_thread = threading.Thread(target=self.monitor_loop, daemon=True)
-        self.monitor_thread.start()
-        self.log_message("Monitoring started")
+        engine = engine or self.poll_engine
+        if engine not in POLL_ENGINES:
+            raise ValueError(f"Unknown poll engine: {engine}")
+        self.poll_engine = engine
+        for page_id in self.tokens.pages():
+            self.page(page_id)
+        with self.pages_lock:
+            self.monitoring = True
+            for page in self.pages.values():
+                self.start_page(page)
+        self.log_message(f"Monitoring started ({engine} engine, {len(self.pages)} pages)", event='monitoring')
+
+    def start_page(self, page):
+        # Each Page polls and announces on its own threads, so a throttled token only holds up itself
+        page.announcements.start()
+        if self.poll_engine == 'asyncio':
+            from async_poller import AsyncCommentPoller
+            target, args = AsyncCommentPoller(self, live=page.live).run, ()
+        elif self.poll_engine == 'batch':
+            target, args = self.batch_monitor_loop, (page.live,)
+        else:
+            target, args = self.monitor_loop, (page.live,)
+        page.thread = threading.Thread(target=target, args=args, daemon=True, name=page.thread_name)
+        page.thread.start()
 
     def stop_monitoring(self):
         self.monitoring = False
-        self.log_message("Monitoring stopped")
+        for page in self.pages.values():
+            page.announcements.stop()
+        self.log_message("Monitoring stopped", event='monitoring')
+
+    def monitor_threads(self):
+        return [page.thread for page in self.pages.values() if page.thread is not None]
 
-    def monitor_loop(self):
+    def monitor_loop(self, live=None):
         while self.monitoring:
-            for post_id, auction in list(self.auctions.items()):
-                if auction.is_active():
-                    self.check_comments(post_id, auction)
-            time.sleep(30)  # Poll every 30 seconds
+            started = time.perf_counter()
+            if self.poll_once(live):
+                SWEEP_SECONDS.observe(time.perf_counter() - started, engine='thread')
+            time.sleep(self.poll_wait(live))
+
+    def poll_once(self, live=None):
+        due = self.due_auctions(live=live)
+        for post_id, auction in due:
+            with POLL_SECONDS.time(engine='thread'):
+                self.check_comments(post_id, auction)
+            self.schedule_next_poll(auction)
+        return len(due)
+
+    def due_auctions(self, now=None, live=None):
+        # live: one Page's share of self.live, for that Page's poller
+        now = now or time.time()
+        live = self.live if live is None else live
+        return [(post_id, auction) for post_id, auction in list(live.items()) if auction.next_poll <= now]
+
+    def poll_wait(self, live=None):
+        # Sleep until the next auction is due, waking at least every second for newly started ones
+        now = time.time()
+        live = self.live if live is None else live
+        due = min((auction.next_poll for auction in list(live.values())), default=now + 1)
+        return min(max(due - now, 0.1), 1.0)
+
+    def schedule_next_poll(self, auction, now=None):
+        """Pick the auction's next poll time from the poll policy; returns the interval."""
+        now = now or time.time()
+        usage, regain_in = 0, 0
+        graph = self.tokens.client(auction.page_id)
+        if graph is not None:
+            usage, regain_in = graph.usage, graph.regain_in()
+        interval = self.poll_policy.interval(auction, now, usage, regain_in)
+        auction.poll_interval = interval
+        auction.next_poll = now + interval
+        return interval
+
+    def poll_schedule(self):
+        now = time.time()
+        return {
+            'policy': POLL_POLICY,
+            'usage': self.tokens.usage(),
+            'auctions': {
+                post_id: {
+                    'interval': round(auction.poll_interval, 1) if auction.poll_interval else None,
+                    'next_poll_in': round(max(auction.next_poll - now, 0), 1),
+                    'last_poll': dict(auction.last_poll_stats),  # fetched, parsed and pages of its last read
+                }
+                for post_id, auction in list(self.live.items())
+            },
+        }
 
     def check_comments(self, post_id, auction):
-        if not self.access_token:
-            self.log_message("No access token configured")
+        if self.tokens.token(auction.page_id) is None:
+            self.log_message(f"No access token configured for page {auction.page_id}", 'warning', 'poll', post_id)
             return
-            
-        url = f"https://graph.facebook.com/v19.0/{post_id}/comments"
-        params = {'access_token': self.access_token, 'fields': 'message,from{id,name}'}
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            if 'error' in data:
-                error_msg = data['error']['message']
-                self.log_message(f"Error fetching comments for {post_id}: {error_msg}")
-                return
-            for comment in data.get('data', []):
-                text = comment['message'].lower()
-                bidder_id = comment['from']['id']
-                bidder_name = comment['from']['name']
-                amount = auction.parse_bid(text, bidder_id, bidder_name)
-                if amount:
-                    auction.add_bid(bidder_id, bidder_name, amount)
-                    self.log_message(f"New bid on {post_id}: ${amount} by {bidder_name}")
+            data = self.fetch_comments(post_id, auction)
+            self.process_comments(post_id, auction, data)
         except Exception as e:
             error_str = str(e)
-            self.log_message(f"Error checking comments for {post_id}: {error_str}")
+            self.log_message(f"Error checking comments for {post_id}: {error_str}", 'error', 'poll', post_id)
 
-    def add_auction(self, post_id, start_time, end_time, starting_bid, timezone='Australia/Sydney'):
+    def send_comment(self, post_id, message, page_id=None):
+        graph = self.tokens.client(page_id)
+        if graph is None:
+            self.log_message(f"No Facebook access token configured for page {page_id or DEFAULT_PAGE}", 'warning',
+                             'announcement', post_id)
+            return
+        data = graph.post(f"{post_id}/comments", {'message': message})
+        if 'error' in data:
+            raise GraphError(data['error']['message'], data['error'].get('code'))
+
+    def send_comments(self, comments, page_id=None):
+        """Post (post_id, message) pairs in one Graph batch; returns an exception or None for each."""
+        graph = self.tokens.client(page_id)
+        if graph is None:
+            raise GraphError(f"No Facebook access token configured for page {page_id or DEFAULT_PAGE}")
+        items = [BatchItem('POST', f"{post_id}/comments", {'message': message}, key=post_id)
+                 for post_id, message in comments]
+        graph.batch(items)
+        return [item.error() for item in items]
+
+    def comment_params(self, after=None):
+        params = {
+            'fields': 'message,created_time,from{id,name}',
+            'order': 'chronological',
+            'filter': 'stream',
+            'limit': 100,
+        }
+        if after:
+            params['after'] = after
+        return params
+
+    def fetch_comments(self, post_id, auction, timeout=None):
+        # Read forward from the auction's cursor, following paging to the end
+        state = self.new_comment_read(auction)
+        graph = self.tokens.client(auction.page_id)
+        while True:
+            data = graph.get(f"{post_id}/comments", self.comment_params(state['after']), timeout=timeout)
+            if not self.read_comment_page(auction, state, data):
+                return state
+
+    def new_comment_read(self, auction):
+        return {'data': [], 'after': auction.comment_cursor.after, 'fetched': 0, 'pages': 0}
+
+    def read_comment_page(self, auction, state, data):
+        """Fold one page of Graph comments into state; return True if more pages follow."""
+        if 'error' in data:
+            if not state['pages']:
+                state['error'] = data['error']
+            return False  # Keep what was read; the cursor resumes from there
+        state['pages'] += 1
+        page = data.get('data', [])
+        state['fetched'] += len(page)
+        state['data'].extend(comment for comment in page if auction.comment_cursor.is_new(comment))
+        paging = data.get('paging', {})
+        state['after'] = paging.get('cursors', {}).get('after') or state['after']
+        return bool(page and paging.get('next'))
+
+    def process_comments(self, post_id, auction, data, final=False):
+        # final: the end edge's last read (close_auction); any other read of a closing auction is stale
+        if 'error' in data:
+            error_msg = data['error']['message']
+            self.log_message(f"Error fetching comments for {post_id}: {error_msg}", 'error', 'poll', post_id)
+            return
+        comments = data.get('data', [])
+        stats = {
+            'fetched': data.get('fetched', len(comments)),
+            'parsed': len(comments),
+            'pages': data.get('pages', 1),
+        }
+        amounts = bidparse.parse_many([comment.get('message') for comment in comments])
+        with auction.read_lock:
+            if auction.closing and not final:
+                return
+            auction.last_poll_stats = stats
+            self.comment_stats['polls'] += 1
+            for key, value in stats.items():
+                self.comment_stats[key] += value
+                COMMENTS.inc(value, stage=key)
+            for comment, amount in zip(comments, amounts):
+                auction.comment_cursor.advance([comment], None)
+                if amount is not None and self.seen_comments.claim(comment['id']):
+                    self.handle_comment(post_id, auction, comment, amount)
+            auction.comment_cursor.advance([], data.get('after'))
+            if comments:
+                auction.record('cursor', cursor=auction.comment_cursor.to_dict())
+        if comments and self.store is not None:
+            self.store.flush()
+
+    def handle_comment(self, post_id, auction, comment, amount=None, source='poll'):
+        text = comment['message']
+        bidder_id = comment['from']['id']
+        bidder_name = comment['from']['name']
+        posted = comment_time(comment)
+        if posted is not None:
+            DETECTION_LAG.observe(max(time.time() - posted, 0), source=source)
+        amount = auction.parse_bid(text, bidder_id, bidder_name, amount)
+        if not amount or not auction.add_bid(bidder_id, bidder_name, amount):
+            BIDS.inc(result='rejected')
+            return None
+        BIDS.inc(result='accepted')
+        self.log_message(f"New bid on {post_id}: ${amount} by {bidder_name}", event='bid', post_id=post_id)
+        return amount
+
+    def ingest_comment(self, post_id, comment):
+        """Handle one comment delivered by webhook; return False if it is not for an auction."""
+        auction = self.auctions.get(post_id)
+        if auction is None and post_id and '_' in post_id:
+            # Webhooks name posts as {page_id}_{post_id}; auctions may use either form
+            auction = self.auctions.get(post_id.split('_', 1)[1])
+        if auction is None:
+            return False
+        if auction.is_active():
+            self.handle_comment(auction.post_id, auction, comment, source='webhook')
+        return True
+
+    def delete_auction(self, post_id):
+        removed = self.detach(post_id)
+        if not removed:
+            return False, 'Auction not found'
+        auction = removed[0]
+        with auction.lock:
+            # A bid already past the dict lookup must not be recorded after the delete
+            auction.deleted = True
+            auction.record('delete')
+        error = self.flush_store(post_id)
+        if error:
+            return False, f"Auction deleted, but not saved yet (the store keeps retrying): {error}"
+        self.log_message(f"Auction {post_id} deleted", event='auction', post_id=post_id)
+        return True, 'Auction deleted'
+
+    def batch_monitor_loop(self, live=None):
+        while self.monitoring:
+            started = time.perf_counter()
+            if self.poll_once_batched(live):
+                SWEEP_SECONDS.observe(time.perf_counter() - started, engine='batch')
+            time.sleep(self.poll_wait(live))
+
+    def poll_once_batched(self, live=None):
+        """Poll every active auction through Graph batch requests.
+
+        Comment reads go out up to 50 per HTTP request, with follow-up pages
+        in later rounds; announcements raised while processing go to the
+        Page's queue, which writes them back in batches too. Each Page's
+        auctions are batched under its own token.
+        """
+        due = self.due_auctions(live=live)
+        by_page = collections.defaultdict(dict)
+        for post_id, auction in due:
+            by_page[auction.page_id][post_id] = auction
+        for page_id, auctions in by_page.items():
+            self.poll_page_batched(page_id, auctions)
+        return len(due)
+
+    def poll_page_batched(self, page_id, live):
+        graph = self.tokens.client(page_id)
+        try:
+            if graph is None:
+                self.log_message(f"No access token configured for page {page_id}", level='warning', event='poll')
+                return
+            pending = {post_id: self.new_comment_read(auction) for post_id, auction in live.items()}
+            while pending:
+                items = [
+                    BatchItem('GET', f"{post_id}/comments", self.comment_params(state['after']), key=post_id)
+                    for post_id, state in pending.items()
+                ]
+                graph.batch(items)
+                more = {}
+                for item in items:
+                    state = pending[item.key]
+                    if self.read_comment_page(live[item.key], state, item.result):
+                        more[item.key] = state
+                    else:
+                        try:
+                            self.process_comments(item.key, live[item.key], state)
+                        except Exception as e:
+                            self.log_message(f"Error checking comments for {item.key}: {str(e)}", 'error', 'poll', item.key)
+                pending = more
+        finally:
+            for auction in live.values():
+                self.schedule_next_poll(auction)
+
+    def new_auction(self, post_id, start_time, end_time, starting_bid=0, timezone='Australia/Sydney', page_id=None):
+        """Check dashboard-form fields and build an Auction, not yet attached; raises ValueError."""
+        post_id = str(post_id).strip() if isinstance(post_id, (str, int)) else None
+        if not post_id:
+            raise ValueError("post_id is required")
+        page_id = str(page_id).strip() if page_id else self.tokens.page_for_post(post_id)
+        if page_id and self.tokens.token(page_id) is None:
+            raise ValueError(f"No access token configured for page {page_id}")
+        start = parse_auction_time(start_time)
+        end = parse_auction_time(end_time)
+        if end <= start:
+            raise ValueError("end_time must be after start_time")
         try:
-            # Convert DD/MM/YYYY HH:MM to ISO format
-            start_dt = dt.strptime(start_time, '%d/%m/%Y %H:%M')
-            end_dt = dt.strptime(end_time, '%d/%m/%Y %H:%M')
-            start_iso = start_dt.strftime('%Y-%m-%dT%H:%M')
-            end_iso = end_dt.strftime('%Y-%m-%dT%H:%M')
-            
             starting_bid = float(starting_bid or 0)
-            self.auctions[post_id] = Auction(post_id, start_iso, end_iso, starting_bid, timezone)
-            self.log_message(f"Auction added for post {post_id}")
-            return True, "Auction added successfully"
+        except (TypeError, ValueError):
+            raise ValueError(f"starting_bid must be a number, got {starting_bid!r}")
+        if not 0 <= starting_bid < float('inf'):
+            raise ValueError(f"starting_bid must be zero or more, got {starting_bid}")
+        return Auction(post_id, start, end, starting_bid, timezone, page_id)
+
+    def add_auction(self, post_id, start_time, end_time, starting_bid, timezone='Australia/Sydney', page_id=None):
+        try:
+            auction = self.new_auction(post_id, start_time, end_time, starting_bid, timezone, page_id)
+            self.attach(auction, replace=False)
         except ValueError as e:
             error_str = str(e)
-            self.log_message(f"Error adding auction: {error_str}")
+            self.log_message(f"Error adding auction: {error_str}", 'error', 'auction', post_id)
             return False, f"Invalid input: {error_str}"
+        auction.record_created()
+        error = self.flush_store(auction.post_id)
+        if error:
+            return False, f"Auction added, but not saved yet (the store keeps retrying): {error}"
+        self.log_message(f"Auction added for post {auction.post_id}", event='auction', post_id=auction.post_id)
+        return True, "Auction added successfully"
+
+    def flush_store(self, post_id=None):
+        """Wait until queued store writes are durable; returns the write error as a string, or None."""
+        if self.store is None:
+            return None
+        try:
+            self.store.flush()
+        except Exception as e:
+            self.log_message(f"Error saving to the auction store: {str(e)}", 'error', 'storage', post_id)
+            return str(e)
+        return None
 
-    def log_message(self, message):
-        timestamp = datetime.datetime.now(self.timezone).strftime(self.date_format)
-        log_entry = f"[{timestamp}] {message}"
-        self.log_messages.append(log_entry)
-        # Keep only last 1000 log messages
-        if len(self.log_messages) > 1000:
-            self.log_messages.pop(0)
-        print(log_entry)
+    def import_auctions(self, rows, replace=False):
+        """Create auctions from importer (row, fields, error) rows; returns (created, errors).
+
+        Every row is checked on its own and a bad one only adds a
+        {'row', 'post_id', 'message'} entry to errors. A post that already
+        has an auction is such an error unless ``replace`` is set. The good
+        ones are attached and scheduled together, written with one store
+        flush, and dashboards get one resync instead of an event per auction.
+        """
+        auctions = {}
+        errors = []
+        for row, fields, error in rows:
+            post_id = fields.get('post_id') if fields else None
+            if error is None:
+                try:
+                    auction = self.new_auction(post_id, fields.get('start_time'), fields.get('end_time'),
+                                               fields.get('starting_bid'), fields.get('timezone') or 'Australia/Sydney',
+                                               fields.get('page_id') or None)
+                    if auction.post_id in auctions:
+                        raise ValueError(f"post_id {auction.post_id} appears more than once")
+                    if not replace and auction.post_id in self.auctions:
+                        raise ValueError(f"post_id {auction.post_id} already has an auction; "
+                                         f"import with replace=1 to overwrite it")
+                    auctions[auction.post_id] = auction
+                    continue
+                except (TypeError, ValueError) as e:
+                    error = str(e)
+            errors.append({'row': row, 'post_id': post_id, 'message': error})
+        created = list(auctions.values())
+        if created:
+            for old in self.detach(*auctions) if replace else []:
+                with old.lock:
+                    old.deleted = True  # Its store record is overwritten by the new one below
+            for auction in created:
+                auction.store = self.store
+                auction.record_created()  # Before attach sets the listener, so no event per auction
+            self.attach(*created)
+            if self.store is not None:
+                self.store.flush()
+            self.events.publish('resync', {})
+        self.log_message(f"Imported {len(created)} auctions, {len(errors)} rows rejected", event='auction')
+        return len(created), errors
+
+    def apply_settings(self, timezone, date_format):
+        self.timezone = get_timezone(timezone)
+        self.date_format = date_format
+        for auction in self.auctions.values():
+            self.localize(auction)
+        self.reads.bump()
+
+    def localize(self, auction):
+        with auction.lock:
+            auction.timezone = self.timezone
+            auction.start_time = auction.start_time.astimezone(self.timezone)
+            auction.end_time = auction.end_time.astimezone(self.timezone)
+            auction.publish()
+
+    def log_message(self, message, level='info', event=None, post_id=None):
+        # O(1) and never waits on output: the ring keeps it, the writer thread prints it
+        self.log_writer.write(self.logs.append(time.time(), level, event, post_id, message))
+
+    def format_log(self, record):
+        timestamp = datetime.datetime.fromtimestamp(record.time, self.timezone).strftime(self.date_format)
+        return f"[{timestamp}] {record.message}"
+
+    def log_entry(self, record):
+        return dict(record.to_dict(), text=self.format_log(record))
+
+    def announcement_stats(self):
+        pages = {page_id: page.announcements.get_stats() for page_id, page in self.pages.items()}
+        totals = {key: sum(stats[key] for stats in pages.values())
+                  for key in ('queued', 'sent', 'failed', 'retries', 'coalesced', 'dropped', 'depth')}
+        return dict(totals, running=self.monitoring, pages=pages)
+
+    def page_stats(self):
+        """Per Page: whether it has a token, its auctions, poll thread, announcements and Graph budget."""
+        counts = collections.Counter(auction.page_id for auction in self.auctions.values())
+        graph = self.tokens.get_stats()
+        stats = {}
+        for page_id in dict.fromkeys([*graph, *self.pages, *counts]):
+            page = self.pages.get(page_id)
+            stats[page_id] = {
+                'token': page_id in graph,
+                'auctions': counts[page_id],
+                'live': len(page.live) if page else 0,
+                'polling': bool(page and page.thread and page.thread.is_alive()),
+                'announcements': page.announcements.get_stats() if page else None,
+                'graph': graph.get(page_id),
+            }
+        return stats
 
     def get_auctions_data(self):
-        auctions_data = []
-        for post_id, auction in self.auctions.items():
-            status = "Active" if auction.is_active() else "Ended"
-            bidder = auction.current_bidder or "None"
-            end_time = auction.end_time.strftime(self.date_format)
-            auctions_data.append({
-                'post_id': post_id,
-                'current_bid': f"${auction.current_bid}",
-                'bidder': bidder,
-                'status': status,
-                'end_time': end_time
-            })
-        return auctions_data
-
-    def get_bid_history(self):
+        return list(self.reads.current().rows)
+
+    def auction_row(self, snapshot, live=None):
+        # Built from an immutable snapshot, so reads never wait on bid handling
+        if live is None:
+            live = snapshot.is_live()
+        return {
+            'post_id': snapshot.post_id,
+            'current_bid': f"${snapshot.current_bid}",
+            'bidder': snapshot.current_bidder or "None",
+            'status': "Active" if live else "Ended",
+            'end_time': snapshot.end_time.strftime(self.date_format)
+        }
+
+    def select_auctions(self, post_ids=None):
+        auctions = self.auctions
+        if not post_ids:
+            return list(auctions.values())
+        return [auctions[post_id] for post_id in post_ids if post_id in auctions]
+
+    def get_bid_history(self, post_ids=None, start=None, end=None):
         history = {}
-        for post_id, auction in self.auctions.items():
-            history[post_id] = []
-            for bidder_id, bidder_name, amount, timestamp in auction.bid_history:
-                formatted_time = timestamp.strftime(self.date_format)
-                history[post_id].append({
-                    'time': formatted_time,
-                    'bidder': bidder_name,
-                    'amount': f"${amount}"
-                })
+        for auction in self.select_auctions(post_ids):
+            bidder, amount, times = auction.bid_columns(start, end)
+            history[auction.post_id] = [
+                {
+                    'time': datetime.datetime.fromtimestamp(epoch, self.timezone).strftime(self.date_format),
+                    'bidder': analytics.bidders.names[idx],
+                    'amount': f"${value}"
+                }
+                for idx, value, epoch in zip(bidder.tolist(), amount.tolist(), times.tolist())
+            ]
         return history
 
-# Global manager instance
-manager = FacebookAuctionManager()
+    def get_analytics_summary(self, post_ids=None, start=None, end=None, top=10):
+        auctions = self.select_auctions(post_ids)
+        return {
+            'auctions': analytics.summarize(auctions, start, end),
+            'top_bidders': analytics.top_bidders(auctions, start, end, top),
+        }
+
+# Global manager instance; set AUCTION_STORE (e.g. sqlite:auctions.db or wal:data) to persist auctions
+manager = FacebookAuctionManager(open_store(os.environ.get('AUCTION_STORE')))
+if MONITOR_MODE != 'embedded' and not hasattr(manager.store, 'data_version'):
+    raise RuntimeError(f"MONITOR_MODE={MONITOR_MODE} needs a shared store, e.g. AUCTION_STORE=sqlite:auctions.db")
+manager.restore()
+atexit.register(manager.log_writer.flush)  # Print whatever the writer thread hadn't got to
+
+# Routes that never read auction state, so needn't wait on a sync
+UNSYNCED_ENDPOINTS = {'static', 'health', 'get_metrics', 'verify_webhook', 'receive_webhook'}
+
+@app.before_request
+def sync_shared_state():
+    if MONITOR_MODE == 'web' and request.endpoint not in UNSYNCED_ENDPOINTS:
+        manager.sync_from_store()
 
 # ... (rest of your Flask routes remain the same, including the policy routes)s
 
@@ -246,7 +1132,36 @@ def dashboard():
 @app.route('/api/auctions', methods=['GET'])
 @login_required
 def get_auctions():
-    return jsonify(manager.get_auctions_data())
+    status = request.args.get('status') or None
+    ending_soon = request.args.get('ending_soon') in ('1', 'true')
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args['per_page']) if request.args.get('per_page') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page and per_page must be integers'}), 400
+    if status is not None and status not in STATUSES:
+        return jsonify({'success': False, 'message': f'Unknown status: {status}'}), 400
+    if page < 1 or (per_page is not None and not 1 <= per_page <= MAX_PER_PAGE):
+        return jsonify({'success': False, 'message': f'page must be >= 1 and per_page 1-{MAX_PER_PAGE}'}), 400
+
+    def build(view):
+        rows, total = manager.reads.query(view, status, ending_soon, page, per_page)
+        return rows, {'X-Total-Count': str(total)}
+
+    return cached_json(('auctions', status, ending_soon, page, per_page), build)
+
+@app.route('/api/auctions/stats')
+@login_required
+def get_auction_stats():
+    return cached_json(('stats',), lambda view: (view.stats, {}))
+
+def cached_json(query, build):
+    # Unchanged lists come back as a 304 for the browser's If-None-Match
+    body, etag, headers = manager.reads.response(query, build)
+    response = Response(body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/api/auctions', methods=['POST'])
 @login_required
@@ -257,88 +1172,294 @@ def add_auction():
         data['start_time'],
         data['end_time'],
         data['starting_bid'],
-        data.get('timezone', 'Australia/Sydney')
+        data.get('timezone', 'Australia/Sydney'),
+        data.get('page_id') or None
     )
     return jsonify({'success': success, 'message': message})
 
+@app.route('/api/auctions/batch', methods=['POST'])
+@login_required
+def add_auctions():
+    # A JSON list of POST /api/auctions bodies, or {"auctions": [...], "replace": true}
+    data = request.get_json(silent=True)
+    items = data.get('auctions') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'success': False, 'message': 'Expected a JSON list of auctions or {"auctions": [...]}'}), 400
+    replace = request.args.get('replace') in ('1', 'true') or (isinstance(data, dict) and data.get('replace') is True)
+    return import_response(importer.read_json(items), replace)
+
+@app.route('/api/auctions/import', methods=['POST'])
+@login_required
+def import_auctions():
+    # A CSV or NDJSON file, uploaded as the "file" form field or sent as the request body;
+    # replace=1 overwrites auctions that already exist instead of rejecting their rows
+    upload = request.files.get('file')
+    fmt = request.args.get('format') or (importer.detect_format(upload.filename, upload.mimetype) if upload
+                                         else importer.detect_format(mimetype=request.mimetype))
+    if fmt not in importer.IMPORT_FORMATS:
+        return jsonify({'success': False, 'message': f"Unsupported import format: {fmt or 'unknown'}; "
+                                                     f"use {' or '.join(importer.IMPORT_FORMATS)}"}), 400
+    try:
+        text = (upload.read() if upload else request.get_data()).decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return jsonify({'success': False, 'message': 'Import files must be UTF-8'}), 400
+    replace = (request.args.get('replace') or request.form.get('replace')) in ('1', 'true')
+    return import_response(importer.read_rows(fmt, text), replace)
+
+def import_response(rows, replace=False):
+    try:
+        created, errors = manager.import_auctions(importer.limit(rows, IMPORT_MAX_ROWS), replace)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({
+        'success': not errors,
+        'message': f"Created {created} auctions" + (f", {len(errors)} rows rejected" if errors else ''),
+        'created': created,
+        'errors': errors,
+    })
+
 @app.route('/api/auctions/<post_id>', methods=['DELETE'])
 @login_required
 def delete_auction(post_id):
-    if post_id in manager.auctions:
-        del manager.auctions[post_id]
-        manager.log_message(f"Auction {post_id} deleted")
-        return jsonify({'success': True, 'message': 'Auction deleted'})
-    return jsonify({'success': False, 'message': 'Auction not found'})
+    success, message = manager.delete_auction(post_id)
+    return jsonify({'success': success, 'message': message})
+
+@app.route('/api/events')
+@login_required
+def stream_events():
+    # Server-Sent Events: one JSON frame per auction/bid change, fanned out to every dashboard
+    if MONITOR_MODE == 'web':
+        manager.start_store_watcher()
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    stream = manager.events.stream(int(last_event_id) if last_event_id.isdigit() else None)
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/webhook', methods=['GET'])
+def verify_webhook():
+    if (request.args.get('hub.mode') == 'subscribe' and FB_VERIFY_TOKEN
+            and request.args.get('hub.verify_token') == FB_VERIFY_TOKEN):
+        return request.args.get('hub.challenge', '')
+    return 'Verification failed', 403
+
+@app.route('/webhook', methods=['POST'])
+def receive_webhook():
+    body = request.get_data()
+    if not verify_signature(FB_APP_SECRET, body, request.headers.get('X-Hub-Signature-256')):
+        return jsonify({'success': False, 'message': 'Invalid signature'}), 403
+    payload = request.get_json(force=True, silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    comments = extract_comments(payload)
+    if MONITOR_MODE == 'web':
+        manager.store.push_inbox(comments)  # The monitor process dedupes and ingests them
+    elif comments:
+        manager.webhooks.submit(comments)
+    return jsonify({'success': True})
+
+@app.route('/api/webhooks')
+@login_required
+def webhook_stats():
+    return jsonify(manager.webhooks.get_stats())
 
 @app.route('/api/monitoring', methods=['POST'])
 @login_required
 def toggle_monitoring():
     action = request.json.get('action')
     if action == 'start':
-        manager.start_monitoring()
+        engine = request.json.get('engine')
+        if engine and engine not in POLL_ENGINES:
+            return jsonify({'success': False, 'message': f'Unknown poll engine: {engine}'})
+        if MONITOR_MODE == 'web':
+            # The monitor process picks this up on its next tick
+            manager.store.set_setting('poll_engine', engine or manager.poll_engine)
+            manager.store.set_setting('monitoring', '1')
+        else:
+            manager.start_monitoring(engine)
         return jsonify({'success': True, 'message': 'Monitoring started'})
     elif action == 'stop':
-        manager.stop_monitoring()
+        if MONITOR_MODE == 'web':
+            manager.store.set_setting('monitoring', '0')
+        else:
+            manager.stop_monitoring()
         return jsonify({'success': True, 'message': 'Monitoring stopped'})
     return jsonify({'success': False, 'message': 'Invalid action'})
 
 @app.route('/api/monitoring/status')
 @login_required
 def monitoring_status():
-    return jsonify({'monitoring': manager.monitoring})
+    if MONITOR_MODE == 'web':
+        return jsonify({
+            'monitoring': manager.store.get_setting('monitoring') == '1',
+            'engine': manager.store.get_setting('poll_engine', manager.poll_engine),
+            'monitor': manager.store.lease_holder('monitor'),
+        })
+    return jsonify({
+        'monitoring': manager.monitoring,
+        'engine': manager.poll_engine,
+        'comments': manager.comment_stats,
+        'lifecycle': manager.scheduler.get_stats(),
+        'polling': manager.poll_schedule(),
+        'events': manager.events.get_stats(),
+        'reads': manager.reads.get_stats(),
+        'graph': manager.tokens.get_stats(),
+        'logs': dict(manager.logs.get_stats(), **manager.log_writer.get_stats()),
+    })
+
+@app.route('/metrics')
+def get_metrics():
+    # Prometheus scrapers can't log in; protect with METRICS_TOKEN instead
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiler', methods=['GET'])
+@login_required
+def get_profile():
+    # ?format=collapsed gives flamegraph.pl / speedscope input
+    if request.args.get('format') == 'collapsed':
+        return Response(manager.profiler.collapsed(), mimetype='text/plain')
+    return jsonify(dict(manager.profiler.get_stats(), top=manager.profiler.top(int(request.args.get('limit', 20)))))
+
+@app.route('/api/profiler', methods=['POST'])
+@login_required
+def toggle_profiler():
+    data = request.json or {}
+    action = data.get('action')
+    if action == 'start':
+        name = data.get('thread', 'monitor')
+        if name == 'monitor':
+            # The first Page's poller; name others as monitor-<page id>
+            target = next(iter(manager.monitor_threads()), None) if manager.monitoring else None
+        else:
+            target = next((thread for thread in threading.enumerate() if thread.name == name), None)
+        if target is None or not target.is_alive():
+            return jsonify({'success': False, 'message': f'No running thread {name}'})
+        try:
+            interval = float(data.get('interval', 0.01))
+            duration = float(data['duration']) if data.get('duration') else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'interval and duration must be numbers'})
+        if not manager.profiler.start(target, interval, duration):
+            return jsonify({'success': False, 'message': 'Profiler already running'})
+        return jsonify({'success': True, 'message': f'Profiling {target.name}'})
+    elif action == 'stop':
+        manager.profiler.stop()
+        return jsonify({'success': True, 'message': 'Profiler stopped'})
+    return jsonify({'success': False, 'message': 'Invalid action'})
+
+@app.route('/api/announcements')
+@login_required
+def announcement_stats():
+    return jsonify(manager.announcement_stats())
+
+@app.route('/api/pages')
+@login_required
+def page_stats():
+    return jsonify(manager.page_stats())
 
 @app.route('/api/logs')
 @login_required
 def get_logs():
-    return jsonify({'logs': manager.log_messages[-100:]})  # Last 100 log entries
+    # Without since: the last `limit` records. With since: the ones after it, for incremental tailing
+    try:
+        since = int(request.args['since']) if request.args.get('since') else None
+        limit = min(int(request.args.get('limit', 100)), LOG_CAPACITY)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since and limit must be integers'}), 400
+    level = request.args.get('level') or None
+    if level is not None and level not in LEVELS:
+        return jsonify({'success': False, 'message': f'Unknown level: {level}'}), 400
+    records, next_seq, missed = manager.logs.since(since, limit, level, request.args.get('post_id') or None)
+    return jsonify({'logs': [manager.log_entry(record) for record in records], 'next': next_seq, 'missed': missed})
+
+@app.route('/api/logs/stream')
+@login_required
+def stream_logs():
+    # Server-Sent Events tail of the log; resumes from Last-Event-ID or ?since=
+    since = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+    level = request.args.get('level') or None
+    if level is not None and level not in LEVELS:
+        return jsonify({'success': False, 'message': f'Unknown level: {level}'}), 400
+    stream = manager.logs.stream(int(since) if since.isdigit() else None, level, request.args.get('post_id') or None)
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def parse_time_arg(value):
+    # Epoch seconds or ISO 8601; naive ISO times are in the dashboard's time zone
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = manager.timezone.localize(parsed)
+        return parsed.timestamp()
+
+def analytics_filters():
+    post_ids = [p for value in request.args.getlist('post_id') for p in value.split(',') if p]
+    return post_ids or None, parse_time_arg(request.args.get('start')), parse_time_arg(request.args.get('end'))
 
 @app.route('/api/analytics')
 @login_required
 def get_analytics():
-    return jsonify(manager.get_bid_history())
+    try:
+        post_ids, start, end = analytics_filters()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid time filter: {str(e)}'}), 400
+    return jsonify(manager.get_bid_history(post_ids, start, end))
+
+@app.route('/api/analytics/summary')
+@login_required
+def get_analytics_summary():
+    try:
+        post_ids, start, end = analytics_filters()
+        top = int(request.args.get('top', 10))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid filter: {str(e)}'}), 400
+    return jsonify(manager.get_analytics_summary(post_ids, start, end, top))
 
 @app.route('/api/export')
 @login_required
 def export_bids():
-    if not manager.auctions:
+    fmt = request.args.get('format', 'txt')
+    if fmt not in export.available_formats():
+        return jsonify({'success': False, 'message': f'Unsupported export format: {fmt}'}), 400
+    try:
+        post_ids, start, end = analytics_filters()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid time filter: {str(e)}'}), 400
+    auctions = manager.select_auctions(post_ids)
+    if not auctions:
         return jsonify({'success': False, 'message': 'No auctions to export'})
-    
+
+    mimetype, extension = export.EXPORT_FORMATS[fmt]
+    gzip = request.args.get('compress') == 'gzip'
     timestamp = datetime.datetime.now(manager.timezone).strftime("%Y%m%d_%H%M%S")
-    filename = f"auction_bids_{timestamp}.txt"
-    
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            for post_id, auction in manager.auctions.items():
-                f.write(f"Auction {post_id}:\n")
-                for bidder_id, bidder_name, amount, timestamp in auction.bid_history:
-                    formatted_time = timestamp.strftime(manager.date_format)
-                    f.write(f"  {formatted_time}: {bidder_name} bid ${amount}\n")
-        
-        manager.log_message(f"Bids exported to {filename}")
-        return send_file(filename, as_attachment=True)
-    except Exception as e:
-        error_str = str(e)
-        manager.log_message(f"Error exporting bids: {error_str}")
-        return jsonify({'success': False, 'message': f'Export failed: {error_str}'})
+    filename = f"auction_bids_{timestamp}.{extension}" + ('.gz' if gzip else '')
+
+    def generate():
+        try:
+            yield from export.stream_export(fmt, auctions, start, end, manager.timezone, manager.date_format, gzip)
+            manager.log_message(f"Exported bids for {len(auctions)} auctions as {filename}", event='export')
+        except Exception as e:
+            manager.log_message(f"Error exporting bids: {str(e)}", 'error', 'export')
+            raise
+
+    return Response(generate(), mimetype='application/gzip' if gzip else mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 @app.route('/api/settings', methods=['POST'])
 @login_required
 def update_settings():
     data = request.json
-    manager.timezone = pytz.timezone(data['timezone'])
-    manager.date_format = data['date_format']
-    
-    # Update all existing auctions
-    for auction in manager.auctions.values():
-        auction.timezone = manager.timezone
-        auction.start_time = auction.start_time.astimezone(manager.timezone)
-        auction.end_time = auction.end_time.astimezone(manager.timezone)
-        auction.bid_history = [
-            (bidder_id, bidder_name, amount, timestamp.astimezone(manager.timezone)) 
-            for bidder_id, bidder_name, amount, timestamp in auction.bid_history
-        ]
-    
-    manager.log_message(f"Settings updated: Time zone {data['timezone']}, format {data['date_format']}")
+    manager.apply_settings(data['timezone'], data['date_format'])
+    if MONITOR_MODE == 'web':
+        manager.store.set_setting('timezone', data['timezone'])
+        manager.store.set_setting('date_format', data['date_format'])
+
+    manager.log_message(f"Settings updated: Time zone {data['timezone']}, format {data['date_format']}", event='settings')
     return jsonify({'success': True, 'message': 'Settings updated'})
 
 @app.route('/test')
@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# The registry hands back app's histograms of the same name
+SWEEP_SECONDS = metrics.histogram('poll_sweep_seconds', 'Time to poll every due auction once', ['engine'])
+POLL_SECONDS = metrics.histogram('auction_poll_seconds', 'Time to fetch and process one auction\'s comments',
+                                 ['engine'])
+
+
+class AsyncCommentPoller:
+    """Polls auction comments on an asyncio loop instead of one serial sweep.
+
+    Each auction carries its own next-poll time, chosen by the manager's
+    poll policy, in a heap; at most ``max_in_flight`` Graph fetches run at
+    once and every fetch is bounded by ``deadline`` seconds so one slow
+    post cannot hold up the rest.
+    """
+
+    def __init__(self, manager, max_in_flight=20, poll_interval=None, deadline=10, live=None):
+        self.manager = manager
+        self.live = manager.live if live is None else live  # One Page's live auctions, or all of them
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval  # None: ask the manager's poll policy per auction
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='poller')
+        self.schedule = []  # Heap of (next_poll, post_id)
+        self.pending = set()  # post_ids scheduled or in flight
+        self.semaphore = None
+
+    def run(self):
+        try:
+            asyncio.run(self._main())
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def _main(self):
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        while self.manager.monitoring:
+            now = time.monotonic()
+            for post_id in list(self.live):
+                if post_id not in self.pending:
+                    self.pending.add(post_id)
+                    heapq.heappush(self.schedule, (now, post_id))
+
+            started = time.perf_counter()
+            due = []
+            while self.schedule and self.schedule[0][0] <= now:
+                _, post_id = heapq.heappop(self.schedule)
+                due.append(self._spawn(tasks, self._poll_and_reschedule(post_id)))
+            if due:
+                self._spawn(tasks, self._time_pass(started, due))
+
+            # Wake at least once a second so newly started auctions and stop requests are seen
+            wait = self.schedule[0][0] - time.monotonic() if self.schedule else 1.0
+            await asyncio.sleep(min(max(wait, 0), 1.0))
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _spawn(self, tasks, coroutine):
+        task = asyncio.create_task(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    async def _time_pass(self, started, due):
+        # A scheduler pass is this engine's sweep: from popping its first due auction to the last one finishing
+        await asyncio.gather(*due, return_exceptions=True)
+        SWEEP_SECONDS.observe(time.perf_counter() - started, engine='asyncio')
+
+    async def _poll_and_reschedule(self, post_id):
+        started = time.perf_counter()
+        try:
+            await self.poll(post_id)
+        finally:
+            POLL_SECONDS.observe(time.perf_counter() - started, engine='asyncio')
+            auction = self.live.get(post_id)
+            if auction is not None:
+                interval = self.poll_interval or self.manager.schedule_next_poll(auction)
+                heapq.heappush(self.schedule, (time.monotonic() + interval, post_id))
+            else:
+                self.pending.discard(post_id)
+
+    async def poll(self, post_id):
+        auction = self.live.get(post_id)
+        if auction is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self.manager.tokens.token(auction.page_id) is None:
+            self.manager.log_message(f"No access token configured for page {auction.page_id}", 'warning', 'poll',
+                                     post_id)
+            return
+        async with self.semaphore:
+            try:
+                data = await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, self.manager.fetch_comments, post_id, auction, self.deadline),
+                    self.deadline,
+                )
+            except asyncio.TimeoutError:
+                self.manager.log_message(f"Timed out fetching comments for {post_id}", 'warning', 'poll', post_id)
+                return
+            except Exception as e:
+                self.manager.log_message(f"Error checking comments for {post_id}: {str(e)}", 'error', 'poll', post_id)
+                return
+        try:
+            await loop.run_in_executor(self.executor, self.manager.process_comments, post_id, auction, data)
+        except Exception as e:
+            self.manager.log_message(f"Error checking comments for {post_id}: {str(e)}", 'error', 'poll', post_id)
+
+    async def sweep(self):
+        """Poll every live auction once, concurrently, and return when all are done."""
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        with SWEEP_SECONDS.time(engine='asyncio'):
+            await asyncio.gather(*(self.poll(post_id) for post_id in list(self.live)))
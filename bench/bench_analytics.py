@@ -0,0 +1,60 @@
+"""Time /api/analytics queries over a large in-memory bid history.
+
+    python bench/bench_analytics.py --auctions 1000 --bids-per-auction 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(label, fn, repeat=20):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    print(f"{label:<44} {(time.perf_counter() - started) / repeat * 1000:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--auctions', type=int, default=1000)
+    parser.add_argument('--bids-per-auction', type=int, default=100)
+    parser.add_argument('--bidders', type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.pop('AUCTION_STORE', None)
+    import app
+    manager = app.FacebookAuctionManager()
+    manager.log_message = lambda message, *args, **kwargs: None
+    rng = random.Random(1)
+    base = time.time() - 86400
+    auctions = {}
+    for i in range(args.auctions):
+        auction = app.Auction(f"post{i}", '2020-01-01T00:00', '2099-01-01T00:00', 0, 'UTC')
+        auction.start_time = app.datetime.datetime.fromtimestamp(base, auction.timezone)
+        auction.end_time = app.datetime.datetime.fromtimestamp(base + 86400, auction.timezone)
+        amount = 0.0
+        for j in range(args.bids_per_auction):
+            amount += rng.randint(1, 20)
+            bidder = rng.randrange(args.bidders)
+            auction.bids.append(f"user{bidder}", f"User {bidder}", amount, base + j * 86400 / args.bids_per_auction)
+        auction.publish()
+        auctions[auction.post_id] = auction
+    manager.auctions = auctions  # No attach(): keep the lifecycle scheduler from announcing anything
+
+    total = args.auctions * args.bids_per_auction
+    print(f"{total} bids across {args.auctions} auctions")
+    timed('history, one post', lambda: manager.get_bid_history(['post7']))
+    timed('summary, one post', lambda: manager.get_analytics_summary(['post7']))
+    timed('summary, one post, last 6h', lambda: manager.get_analytics_summary(['post7'], base + 64800))
+    timed('top bidders, all auctions', lambda: app.analytics.top_bidders(list(manager.auctions.values())),
+          repeat=5)
+    timed('summary, all auctions', lambda: manager.get_analytics_summary(), repeat=3)
+
+
+if __name__ == '__main__':
+    main()
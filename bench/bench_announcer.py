@@ -0,0 +1,210 @@
+"""Check AnnouncementQueue's coalescing and delivery guarantees.
+
+  coalesce   bids queued behind each other for a post collapse into one
+             comment with the latest amount; start and winner each go out
+             once, in order around it
+  flaky      producers race sharded workers while --fail-rate of sends
+             raise a resendable error, with one send per comment and with
+             send_batch: every post gets its start first and its winner
+             last, bids only go up and the last one is the latest queued,
+             and nothing fails
+  full       a queue capped at --max-depth drops bids once full, but never
+             a start or a winner
+
+It exits non-zero if any check fails.
+
+    python bench/bench_announcer.py --posts 200 --bids 50
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from announcer import AnnouncementQueue  # noqa: E402
+from graph_client import GraphUnavailable  # noqa: E402
+
+
+class FlakyGraph:
+    """Records what was posted per post; refuses a share of sends with a resendable error."""
+
+    def __init__(self, fail_rate=0.0, latency=0.0, seed=1):
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.posted = collections.defaultdict(list)
+        self.refused = 0
+
+    def fails(self):
+        with self.lock:
+            if self.rng.random() < self.fail_rate:
+                self.refused += 1
+                return True
+            return False
+
+    def send(self, post_id, message):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fails():
+            raise GraphUnavailable('Graph budget spent')
+        with self.lock:
+            self.posted[post_id].append(message)
+
+    def send_batch(self, comments):
+        if self.latency:
+            time.sleep(self.latency)
+        errors = []
+        for post_id, message in comments:
+            if self.fails():
+                errors.append(GraphUnavailable('Graph budget spent'))
+                continue
+            with self.lock:
+                self.posted[post_id].append(message)
+            errors.append(None)
+        return errors
+
+
+def drain(queue, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = queue.get_stats()
+        if stats['depth'] == 0 and stats['sent'] + stats['failed'] == stats['queued']:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def check_sequence(label, post_id, posted, last_bid=None):
+    # start, then strictly rising bids, then winner; each message is a kind and an amount
+    failures = []
+    kinds = [message.split()[0] for message in posted]
+    if kinds.count('start') != 1 or kinds.count('winner') != 1 or kinds[:1] != ['start'] or kinds[-1:] != ['winner']:
+        failures.append(f"{label}: {post_id} posted {kinds}")
+        return failures
+    amounts = [int(message.split()[1]) for message in posted[1:-1]]
+    if amounts != sorted(set(amounts)):
+        failures.append(f"{label}: {post_id} bids went out of order: {amounts}")
+    if last_bid is not None and amounts[-1:] != [last_bid]:
+        failures.append(f"{label}: {post_id} last bid posted {amounts[-1:]}, latest queued was {last_bid}")
+    return failures
+
+
+def coalesce(args):
+    graph = FlakyGraph()
+    queue = AnnouncementQueue(graph.send, workers=args.workers)
+    for i in range(args.posts):
+        queue.enqueue(f"post{i}", 'start 0', 'start')
+        for amount in range(1, args.bids + 1):
+            queue.enqueue(f"post{i}", f"bid {amount}", 'bid')
+        queue.enqueue(f"post{i}", f"winner {args.bids}", 'winner')
+    queue.start()  # Only now, so every bid was still waiting when the next arrived
+    failures = [] if drain(queue) else ['coalesce: queue did not drain']
+    queue.stop()
+    for i in range(args.posts):
+        posted = graph.posted[f"post{i}"]
+        if posted != ['start 0', f"bid {args.bids}", f"winner {args.bids}"]:
+            failures.append(f"coalesce: post{i} posted {posted}")
+    stats = queue.get_stats()
+    if stats['coalesced'] != args.posts * (args.bids - 1):
+        failures.append(f"coalesce: {stats['coalesced']} coalesced, expected {args.posts * (args.bids - 1)}")
+    print(f"{'coalesce':<12}{args.posts} posts x {args.bids} bids -> {stats['sent']} comments, "
+          f"{stats['coalesced']} coalesced")
+    return failures
+
+
+def produce(queue, post_ids, bids, seed):
+    # Interleave the posts' sequences the way concurrent auctions would
+    rng = random.Random(seed)
+    progress = {post_id: 0 for post_id in post_ids}
+    for post_id in post_ids:
+        queue.enqueue(post_id, 'start 0', 'start')
+    while progress:
+        post_id = rng.choice(list(progress))
+        progress[post_id] += 1
+        if progress[post_id] > bids:
+            queue.enqueue(post_id, f"winner {bids}", 'winner')
+            del progress[post_id]
+        else:
+            queue.enqueue(post_id, f"bid {progress[post_id]}", 'bid')
+        if rng.random() < 0.05:
+            time.sleep(0.001)
+
+
+def run_producers(queue, posts, bids, producers, prefix):
+    post_ids = [f"{prefix}{i}" for i in range(posts)]
+    threads = [threading.Thread(target=produce, args=(queue, post_ids[n::producers], bids, n))
+               for n in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return post_ids
+
+
+def flaky(args, batched):
+    label = 'flaky-batch' if batched else 'flaky'
+    graph = FlakyGraph(args.fail_rate, latency=0.0005)
+    queue = AnnouncementQueue(graph.send, workers=args.workers, max_retries=50, backoff=0.0005,
+                              send_batch=graph.send_batch if batched else None, batch_size=10)
+    queue.start()
+    post_ids = run_producers(queue, args.posts, args.bids, args.producers, label)
+    failures = [] if drain(queue) else [f"{label}: queue did not drain"]
+    queue.stop()
+    for post_id in post_ids:
+        failures += check_sequence(label, post_id, graph.posted[post_id], last_bid=args.bids)
+    stats = queue.get_stats()
+    if stats['failed'] or stats['dropped'] or stats['sent'] != stats['queued']:
+        failures.append(f"{label}: queued {stats['queued']}, sent {stats['sent']}, failed {stats['failed']}, "
+                        f"dropped {stats['dropped']}")
+    if not stats['coalesced'] or not stats['retries']:
+        failures.append(f"{label}: nothing coalesced ({stats['coalesced']}) or resent ({stats['retries']}); "
+                        f"the run proves nothing")
+    print(f"{label:<12}{args.posts} posts x {args.bids} bids -> {stats['sent']} comments, "
+          f"{stats['coalesced']} coalesced, {graph.refused} refused and {stats['retries']} resent")
+    return failures
+
+
+def full(args):
+    graph = FlakyGraph(args.fail_rate, latency=0.001)
+    queue = AnnouncementQueue(graph.send, workers=args.workers, max_retries=50, backoff=0.0005,
+                              max_depth=args.max_depth)
+    queue.start()
+    post_ids = run_producers(queue, args.posts, args.bids, args.producers, 'full')
+    failures = [] if drain(queue) else ['full: queue did not drain']
+    queue.stop()
+    for post_id in post_ids:
+        failures += check_sequence('full', post_id, graph.posted[post_id])
+    stats = queue.get_stats()
+    bids = sum(len(graph.posted[post_id]) - 2 for post_id in post_ids)
+    if not stats['dropped'] or not bids:
+        failures.append(f"full: {stats['dropped']} bids dropped and {bids} sent at max_depth {args.max_depth}; "
+                        f"the run proves nothing")
+    print(f"{'full':<12}max_depth {args.max_depth}: {stats['dropped']} bids dropped, {bids} sent, "
+          f"{len(post_ids)} starts and winners all sent")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--bids', type=int, default=50, help='Bids queued per post')
+    parser.add_argument('--workers', type=int, default=4, help='Queue shards')
+    parser.add_argument('--producers', type=int, default=8, help='Threads queueing announcements')
+    parser.add_argument('--fail-rate', type=float, default=0.3, help='Share of sends refused as resendable')
+    parser.add_argument('--max-depth', type=int, default=250, help='Queue cap for the full scenario')
+    args = parser.parse_args()
+
+    failures = coalesce(args) + flaky(args, batched=False) + flaky(args, batched=True) + full(args)
+    for message in failures[:20]:
+        print(f"  FAIL {message}")
+    print('OK' if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Check bidparse against the labelled corpus and measure comments/sec.
+
+Each line of --corpus is {"text": ..., "amount": ... or null} with an
+optional "decimal_mark". Exits non-zero if any corpus entry is misparsed.
+
+    python bench/bench_bidparse.py --comments 200000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bidparse  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHATTER = [
+    'love this!', 'so pretty', 'how much is shipping?', 'is this still available', 'following',
+    'omg want', 'what size is it?', 'pm sent', 'beautiful work', 'can you ship to canada',
+]
+
+
+def legacy_parse(text):
+    # The regex Auction.parse_bid used before bidparse, for comparison
+    match = re.search(r'(\$?\s*(\d+(?:\.\d{2})?))', text.lower())
+    return float(match.group(2)) if match else None
+
+
+def check_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    failures = 0
+    legacy_correct = 0
+    for entry in entries:
+        parser = bidparse.BidParser(entry.get('decimal_mark', '.'))
+        got = parser.parse(entry['text'])
+        if got != entry['amount']:
+            failures += 1
+            print(f"  MISMATCH {entry['text']!r}: expected {entry['amount']}, got {got}")
+        if legacy_parse(entry['text']) == entry['amount']:
+            legacy_correct += 1
+    print(f"Corpus: {len(entries) - failures}/{len(entries)} correct "
+          f"(previous regex: {legacy_correct}/{len(entries)})")
+    return failures
+
+
+def synthetic_comments(count, bid_ratio, seed=1):
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(count):
+        if rng.random() < bid_ratio:
+            amount = rng.randint(5, 5000)
+            comments.append(rng.choice([f"{amount}", f"${amount:,}", f"bid {amount}", f"I'll pay ${amount}.00",
+                                        f"2 for ${amount}", f"{amount / 1000:.1f}k"]))
+        else:
+            comments.append(rng.choice(CHATTER))
+    return comments
+
+
+def timed(label, fn, comments):
+    fn(comments[:1000])
+    started = time.perf_counter()
+    fn(comments)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(comments) / elapsed:>12,.0f} comments/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join(HERE, 'bid_corpus.jsonl'))
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--bid-ratio', type=float, default=0.3, help='share of synthetic comments that are bids')
+    args = parser.parse_args()
+
+    failures = check_corpus(args.corpus)
+    comments = synthetic_comments(args.comments, args.bid_ratio)
+    timed('previous regex', lambda texts: [legacy_parse(text) for text in texts], comments)
+    timed('bidparse.parse_amount', lambda texts: [bidparse.parse_amount(text) for text in texts], comments)
+    timed('bidparse.parse_many', bidparse.parse_many, comments)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
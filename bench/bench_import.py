@@ -0,0 +1,194 @@
+"""Measure auctions created per second, one at a time and in bulk.
+
+  modal    POST /api/auctions per row, as the dashboard's create form does
+  single   FacebookAuctionManager.add_auction per row, without the HTTP layer
+  bulk     FacebookAuctionManager.import_auctions with every row at once
+  csv      POST /api/auctions/import with the rows as a CSV upload
+  ndjson   POST /api/auctions/import with the rows as NDJSON
+
+--bad-share of the rows are invalid (impossible dates, unknown time zones,
+end before start, non-numeric bids, repeated post ids). The bulk paths
+must create every good row, schedule its start and end, and report every
+bad one by row number. Importing the rows a second time must reject every
+one, since their posts already have auctions, unless replace is set. With
+--store the auctions are also written to a temporary wal or sqlite store.
+
+It exits non-zero if any check fails.
+
+    python bench/bench_import.py --rows 5000
+    python bench/bench_import.py --rows 2000 --store sqlite
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TIMEZONES = ['Australia/Sydney', 'UTC', 'America/New_York']
+FIELDS = ['post_id', 'start_time', 'end_time', 'starting_bid', 'timezone']
+
+
+def make_rows(count, bad_share, seed):
+    """Catalogue rows and the 1-based numbers of the ones that must be rejected."""
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    rows, bad = [], set()
+    for i in range(count):
+        start = now + datetime.timedelta(days=rng.randint(1, 30), minutes=rng.randint(0, 1439))
+        end = start + datetime.timedelta(hours=rng.randint(1, 72))
+        row = {
+            'post_id': f"lot{i}",
+            'start_time': start.strftime('%d/%m/%Y %H:%M'),
+            'end_time': end.strftime('%d/%m/%Y %H:%M'),
+            'starting_bid': str(rng.randint(0, 500)),
+            'timezone': rng.choice(TIMEZONES),
+        }
+        if i and rng.random() < bad_share:
+            kind = rng.randrange(5)
+            if kind == 0:
+                row['start_time'] = '31/02/2025 10:00'
+            elif kind == 1:
+                row['timezone'] = 'Mars/Olympus_Mons'
+            elif kind == 2:
+                row['start_time'], row['end_time'] = row['end_time'], row['start_time']
+            elif kind == 3:
+                row['starting_bid'] = 'ten dollars'
+            else:
+                row['post_id'] = rows[-1]['post_id']
+            bad.add(i + 1)
+        rows.append(row)
+    return rows, bad
+
+
+def new_manager(app, store_kind, directory):
+    store = None
+    if store_kind:
+        path = os.path.join(directory, f"{store_kind}-{time.monotonic_ns()}")
+        store = app.open_store(f"{store_kind}:{path}.db" if store_kind == 'sqlite' else f"{store_kind}:{path}")
+    manager = app.FacebookAuctionManager(store)
+    manager.log_message = lambda message, *args, **kwargs: None
+    return manager
+
+
+def as_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def as_ndjson(rows):
+    return ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--bad-share', type=float, default=0.02)
+    parser.add_argument('--store', choices=('wal', 'sqlite'))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.pop('AUCTION_STORE', None)
+    os.environ['MONITOR_MODE'] = 'embedded'
+    os.environ['IMPORT_MAX_ROWS'] = str(max(args.rows, 10000))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        import importer
+
+    rows, bad = make_rows(args.rows, args.bad_share, args.seed)
+    good = args.rows - len(bad)
+    client = app.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    failures = []
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        def run(name, create):
+            manager = app.manager = new_manager(app, args.store, directory)
+            started = time.perf_counter()
+            created, errors = create(manager)
+            elapsed = time.perf_counter() - started
+            results[name] = elapsed
+            scheduled = manager.scheduler.get_stats()['auctions']
+            # Every path must create the same auctions, one per good row (duplicate post_ids are bad rows)
+            if created != good or len(manager.auctions) != good:
+                failures.append(f"{name}: created {created} of {good} good rows")
+            if scheduled != good:
+                failures.append(f"{name}: {scheduled} auctions scheduled for {good} created")
+            if name not in ('modal', 'single'):
+                rejected = {error['row'] for error in errors}
+                if rejected != bad:
+                    failures.append(f"{name}: rejected rows {sorted(rejected ^ bad)[:10]} differ from the bad ones")
+            if manager.store is not None:
+                manager.store.close()
+            manager.scheduler.stop()
+            speedup = f"{results['modal'] / elapsed:>7.1f}x"
+            print(f"{name:<8} {created:>7} {len(errors):>7} {elapsed:>9.3f} {created / elapsed:>12.0f} {speedup}")
+
+        def single(manager):
+            created = errors = 0
+            for row in rows:
+                success, _ = manager.add_auction(row['post_id'], row['start_time'], row['end_time'],
+                                                 row['starting_bid'], row['timezone'])
+                created += success
+                errors += not success
+            return created, [None] * errors
+
+        def modal(manager):
+            created = errors = 0
+            for row in rows:
+                success = client.post('/api/auctions', json=row).get_json()['success']
+                created += success
+                errors += not success
+            return created, [None] * errors
+
+        def upload(body, mimetype):
+            def create(manager):
+                response = client.post('/api/auctions/import', data=body, content_type=mimetype)
+                data = response.get_json()
+                if response.status_code != 200:
+                    failures.append(f"import answered {response.status_code}: {data.get('message')}")
+                    return 0, []
+                return data['created'], data['errors']
+            return create
+
+        print(f"{args.rows} rows, {len(bad)} bad, store {args.store or 'none'}")
+        print(f"{'path':<8} {'created':>7} {'errors':>7} {'seconds':>9} {'auctions/s':>12} speedup")
+        run('modal', modal)
+        run('single', single)
+        run('bulk', lambda manager: manager.import_auctions(importer.read_json(rows)))
+        run('csv', upload(as_csv(rows), 'text/csv'))
+        run('ndjson', upload(as_ndjson(rows), 'application/x-ndjson'))
+
+        manager = new_manager(app, args.store, directory)
+        manager.import_auctions(importer.read_json(rows))
+        created, errors = manager.import_auctions(importer.read_json(rows))
+        if created or len(errors) != args.rows:
+            failures.append(f"re-import created {created} auctions over existing ones, rejected {len(errors)} rows")
+        created, errors = manager.import_auctions(importer.read_json(rows), replace=True)
+        scheduled = manager.scheduler.get_stats()['auctions']
+        if created != good or len(manager.auctions) != good or scheduled != good:
+            failures.append(f"replace created {created} and left {len(manager.auctions)} auctions, "
+                            f"{scheduled} scheduled, for {good} good rows")
+        if manager.store is not None:
+            manager.store.close()
+        manager.scheduler.stop()
+
+    for message in failures:
+        print(f"  FAIL {message}")
+    print('OK' if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
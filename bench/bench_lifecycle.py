@@ -0,0 +1,212 @@
+"""Drive the lifecycle scheduler with thousands of auctions on a fake clock.
+
+Checks that every auction gets exactly one start and one end edge, in that
+order and at its scheduled instant, that deleted auctions fire nothing, and
+that reading status (get_auctions_data) has no side effects, and that a
+poll still in flight when an auction closes can't land a bid after the
+winner is announced. Exits non-zero on any violation. Also times the real
+scheduler thread's wake-up lag.
+
+    python bench/bench_lifecycle.py --auctions 5000
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def iso(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isoformat()
+
+
+def simulate(app, count, horizon, step, read_every, seed=1):
+    rng = random.Random(seed)
+    clock = FakeClock(1_800_000_000.0)
+    origin = clock.now
+    manager = app.FacebookAuctionManager()
+    manager.log_message = lambda message, *args, **kwargs: None
+    manager.scheduler = app.LifecycleScheduler(manager.on_lifecycle_edge, clock=clock, threaded=False)
+
+    fired = {}  # post_id -> [(edge, clock time)]
+    announced = []
+    windows = {}
+    for i in range(count):
+        start = origin + rng.uniform(0, horizon)
+        end = start + rng.uniform(60, horizon / 4)
+        auction = app.Auction(f"post{i}", iso(start), iso(end), 0, 'UTC')
+        auction.post_to_post = lambda message, kind='info', post_id=auction.post_id: announced.append((post_id, kind))
+        windows[auction.post_id] = (start, end)
+        manager.attach(auction)
+
+    edge = manager.on_lifecycle_edge
+
+    def recording_edge(post_id, which):
+        fired.setdefault(post_id, []).append((which, clock.now))
+        edge(post_id, which)
+
+    manager.scheduler.fire = recording_edge
+    deleted = {f"post{i}" for i in rng.sample(range(count), count // 20)}
+    for post_id in deleted:
+        manager.delete_auction(post_id)
+
+    errors = []
+    reads = 0
+    fire_time = 0.0
+    max_live = 0
+    tick = 0
+    while clock.now <= origin + horizon * 1.5:
+        if tick % read_every == 0:
+            before = (len(announced), manager.scheduler.stats['fired'], len(manager.live))
+            manager.get_auctions_data()
+            for auction in list(manager.auctions.values())[:100]:
+                auction.is_active()
+            reads += 1
+            if (len(announced), manager.scheduler.stats['fired'], len(manager.live)) != before:
+                errors.append('status read had side effects')
+                break
+        tick += 1
+        started = time.perf_counter()
+        manager.scheduler.run_due()
+        fire_time += time.perf_counter() - started
+        max_live = max(max_live, len(manager.live))
+        clock.now += step
+
+    for post_id, (start, end) in windows.items():
+        edges = fired.get(post_id, [])
+        if post_id in deleted:
+            if edges:
+                errors.append(f"{post_id} was deleted but fired {edges}")
+            continue
+        if [which for which, _ in edges] != ['start', 'end']:
+            errors.append(f"{post_id} fired {edges}")
+            continue
+        (_, started_at), (_, ended_at) = edges
+        if not (start <= started_at < start + step and end <= ended_at < end + step):
+            errors.append(f"{post_id} fired late: start {started_at - start:.1f}s, end {ended_at - end:.1f}s")
+    kinds = [kind for _, kind in announced]
+    if kinds.count('start') != count - len(deleted):
+        errors.append(f"{kinds.count('start')} start announcements for {count - len(deleted)} auctions")
+    if manager.live:
+        errors.append(f"{len(manager.live)} auctions still live after every end time")
+
+    print(f"Simulated {count} auctions ({len(deleted)} deleted) over {tick} ticks of {step:.0f}s, "
+          f"{reads} status reads")
+    print(f"  edges fired {manager.scheduler.stats['fired']}, stale skipped {manager.scheduler.stats['stale']}, "
+          f"peak live {max_live}, scheduler time {fire_time * 1000:.1f} ms total")
+    return errors
+
+
+def close_race(app):
+    # A poll that fetched before the end edge but processes after the close's final read
+    manager = app.FacebookAuctionManager()
+    manager.log_message = lambda message, *args, **kwargs: None
+    manager.scheduler = None
+    manager.tokens.token = lambda page_id: 'token'
+    now = time.time()
+    auction = app.Auction('race', iso(now - 60), iso(now - 1), 0, 'UTC')
+    announced = []
+    auction.post_to_post = lambda message, kind='info': announced.append(kind)
+    manager.attach(auction)
+    manager.on_lifecycle_edge('race', 'start')
+
+    def comment(comment_id, amount, epoch):
+        created = datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+0000')
+        return {'id': comment_id, 'message': f"bid {amount}", 'created_time': created,
+                'from': {'id': f"user{amount}", 'name': f"User {amount}"}}
+
+    comments = [comment('c1', 50, now - 10), comment('c2', 70, now)]  # c2 came in after the close
+    release = threading.Event()
+
+    def fetch_comments(post_id, auction, timeout=None):
+        if timeout is None:  # The poll; the close passes CLOSE_TIMEOUT
+            release.wait(5)
+        return {'data': list(comments), 'fetched': len(comments), 'pages': 1}
+
+    manager.fetch_comments = fetch_comments
+    poll = threading.Thread(target=manager.check_comments, args=('race', auction))
+    poll.start()
+    manager.on_lifecycle_edge('race', 'end')
+    manager.closers.shutdown(wait=True)
+    release.set()
+    poll.join()
+    errors = []
+    if auction.current_bid != 50:
+        errors.append(f"close race: winning bid {auction.current_bid}, expected 50 from before the close")
+    if announced[-1:] != ['winner'] or announced.count('winner') != 1:
+        errors.append(f"close race: announcements {announced}, expected the winner last")
+    return errors
+
+
+def measure_lag(app, count, spread):
+    # Real clock and thread: how long after its instant does each edge fire?
+    manager = app.FacebookAuctionManager()
+    manager.log_message = lambda message, *args, **kwargs: None
+    lags = []
+    done = threading.Event()
+    target = count * 2
+    edge = manager.on_lifecycle_edge
+
+    def timed_edge(post_id, which):
+        auction = manager.auctions[post_id]
+        due = (auction.start_time if which == 'start' else auction.end_time).timestamp()
+        lags.append(time.time() - due)
+        edge(post_id, which)
+        if len(lags) == target:
+            done.set()
+
+    manager.scheduler.fire = timed_edge
+    base = time.time() + 0.5
+    for i in range(count):
+        start = base + random.uniform(0, spread)
+        auction = app.Auction(f"lag{i}", iso(start), iso(start + random.uniform(0.05, spread)), 0, 'UTC')
+        auction.post_to_post = lambda message, kind='info': None
+        manager.attach(auction)
+    done.wait(spread * 3 + 5)
+    lags.sort()
+    if lags:
+        print(f"Real clock: {len(lags)}/{target} edges, lag p50 {lags[len(lags) // 2] * 1000:.2f} ms, "
+              f"p99 {lags[int(len(lags) * 0.99)] * 1000:.2f} ms, max {lags[-1] * 1000:.2f} ms")
+    return len(lags) == target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=5000)
+    parser.add_argument('--horizon', type=float, default=7 * 86400, help='Fake seconds over which auctions start')
+    parser.add_argument('--step', type=float, default=30, help='Fake clock tick (s)')
+    parser.add_argument('--read-every', type=int, default=500, help='Ticks between dashboard status reads')
+    parser.add_argument('--lag-auctions', type=int, default=500)
+    parser.add_argument('--lag-spread', type=float, default=2.0, help='Real seconds over which lag edges fall')
+    args = parser.parse_args()
+
+    os.environ.pop('AUCTION_STORE', None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    errors = simulate(app, args.auctions, args.horizon, args.step, args.read_every)
+    errors += close_race(app)
+    if not measure_lag(app, args.lag_auctions, args.lag_spread):
+        errors.append('real-clock scheduler missed edges')
+    for error in errors[:20]:
+        print(f"  FAIL {error}")
+    print('OK' if not errors else f"{len(errors)} failures")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Compare sweep latency of the thread, asyncio and batch poll engines.
+
+Before timing anything it checks the batch engine: --check-posts auctions
+(more than one 50-item Graph batch), one of them a post Graph refuses,
+must each end up with the bid from their own post's comments, in one HTTP
+request per batch. Then, for every engine, it checks that an auction's
+comment cursor pages through a backlog once, that a poll with nothing new
+parses nothing, and that the next one parses only what was added, as
+reported in the poll schedule's last_poll. It exits non-zero if a check
+fails.
+
+    python bench/bench_polling.py --latency 0.02 --sizes 10 100 1000
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_graph import start_server
+
+
+def build_manager(app_module, count, prefix='post'):
+    manager = app_module.FacebookAuctionManager()
+    manager.log_message = lambda message, *args, **kwargs: None
+    # Fire lifecycle edges here rather than racing the scheduler thread
+    manager.scheduler = app_module.LifecycleScheduler(manager.on_lifecycle_edge, threaded=False)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = (now - datetime.timedelta(days=1)).isoformat()
+    end = (now + datetime.timedelta(days=1)).isoformat()
+    for i in range(count):
+        auction = app_module.Auction(f"{prefix}{i}", start, end, 0, 'UTC')
+        auction.active = True  # Skip the start announcement; only polling is measured
+        auction.post_to_post = lambda message, kind='info': None
+        manager.attach(auction)
+    manager.scheduler.run_due()
+    return manager
+
+
+def check_batch(app_module, server, count, broken):
+    manager = build_manager(app_module, count, prefix='check')
+    for i in range(count):
+        server.state.add_comment(f"check{i}", f"bid {1000 + i}", f"bidder{i}", f"Bidder {i}")
+    server.state.broken_posts.add(f"check{broken}")
+    before = server.state.requests
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.poll_once_batched()
+    failures = []
+    for i in range(count):
+        auction = manager.auctions[f"check{i}"]
+        expected = (0, None) if i == broken else (1000 + i, f"bidder{i}")
+        if (auction.current_bid, auction.current_bidder) != expected:
+            failures.append(f"check{i} has {auction.current_bid} by {auction.current_bidder}, expected {expected}")
+    requests = server.state.requests - before
+    if requests != math.ceil(count / 50):
+        failures.append(f"{requests} HTTP requests for {count} posts")
+    print(f"batch check: {count} posts, check{broken} broken, {requests} requests, {len(failures)} failures")
+    return failures
+
+
+def check_cursor(app_module, server, engine, poll):
+    # fetched/parsed/pages of each poll, read from the status payload, plus HTTP requests made
+    post_id = f"cursor-{engine}"
+    manager = build_manager(app_module, 1, prefix=post_id)
+    auction = manager.auctions[f"{post_id}0"]
+    for i in range(250):  # Three pages at the poller's limit of 100
+        server.state.add_comment(auction.post_id, f"bid {i + 1}", f"user{i}", f"User {i}")
+    failures = []
+    expected = [((250, 250, 3), 3), ((0, 0, 1), 1), ((3, 3, 1), 1)]
+    for round_no, (stats, requests) in enumerate(expected):
+        if round_no == 2:
+            for i in range(3):
+                server.state.add_comment(auction.post_id, f"bid {1000 + i}", f"late{i}", f"Late {i}")
+        auction.next_poll = 0
+        before = server.state.requests
+        with contextlib.redirect_stdout(io.StringIO()):
+            poll(manager)
+        last = manager.poll_schedule()['auctions'][auction.post_id]['last_poll']
+        got = (last['fetched'], last['parsed'], last['pages']), server.state.requests - before
+        if got != (stats, requests):
+            failures.append(f"{engine} poll {round_no + 1}: (fetched, parsed, pages), requests = {got}, "
+                            f"expected {(stats, requests)}")
+    if auction.current_bid != 1002:
+        failures.append(f"{engine}: current bid {auction.current_bid} after the cursor checks, expected 1002")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--latency', type=float, default=0.02, help='Fake Graph latency per request (s)')
+    parser.add_argument('--in-flight', type=int, default=20)
+    parser.add_argument('--skip-thread-above', type=int, default=1000,
+                        help='Skip the serial engine for sizes above this')
+    parser.add_argument('--check-posts', type=int, default=120)
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, comments_per_post=5)
+    os.environ['GRAPH_API_URL'] = server.url
+    os.environ['FB_ACCESS_TOKEN'] = 'bench-token'
+    os.environ['GRAPH_RATE_LIMIT'] = '1000000'  # Measure the engines, not the client's request budget
+    import app
+    from async_poller import AsyncCommentPoller
+
+    failures = check_batch(app, server, args.check_posts, broken=args.check_posts // 3)
+
+    def sweep(manager):
+        poller = AsyncCommentPoller(manager, max_in_flight=args.in_flight)
+        asyncio.run(poller.sweep())
+        poller.executor.shutdown()
+
+    latency, server.state.latency = server.state.latency, 0
+    cursor_failures = []
+    for engine, poll in (('thread', lambda manager: manager.poll_once()), ('asyncio', sweep),
+                         ('batch', lambda manager: manager.poll_once_batched())):
+        cursor_failures += check_cursor(app, server, engine, poll)
+    server.state.latency = latency
+    print(f"cursor check: thread, asyncio and batch engines, {len(cursor_failures)} failures")
+    failures += cursor_failures
+    print(f"{'auctions':>8} {'engine':>8} {'sweep (s)':>10} {'requests':>9}")
+    for size in args.sizes:
+        if size <= args.skip_thread_above:
+            manager = build_manager(app, size)
+            before = server.state.requests
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.poll_once()
+            elapsed = time.perf_counter() - started
+            print(f"{size:>8} {'thread':>8} {elapsed:>10.3f} {server.state.requests - before:>9}")
+
+        manager = build_manager(app, size)
+        poller = AsyncCommentPoller(manager, max_in_flight=args.in_flight)
+        before = server.state.requests
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(poller.sweep())
+        elapsed = time.perf_counter() - started
+        poller.executor.shutdown()
+        print(f"{size:>8} {'asyncio':>8} {elapsed:>10.3f} {server.state.requests - before:>9}")
+
+        manager = build_manager(app, size)
+        before = server.state.requests
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.poll_once_batched()
+        elapsed = time.perf_counter() - started
+        print(f"{size:>8} {'batch':>8} {elapsed:>10.3f} {server.state.requests - before:>9}")
+
+    server.shutdown()
+    for message in failures:
+        print(f"  FAIL {message}")
+    print('OK' if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
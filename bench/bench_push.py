@@ -0,0 +1,94 @@
+"""Load test for the /api/events push channel with many simulated dashboards.
+
+    python bench/bench_push.py --subscribers 10 100 300 --events 200
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from werkzeug.serving import make_server
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def subscriber(base_url, expected, latencies, ready, lock):
+    session = requests.Session()
+    session.post(f"{base_url}/login", data={'username': 'admin', 'password': 'password123'})
+    received = 0
+    with session.get(f"{base_url}/api/events", stream=True, timeout=60) as response:
+        ready.release()
+        event_type = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event: '):
+                event_type = line[7:]
+            elif line.startswith('data: ') and event_type == 'auction':
+                sent = json.loads(line[6:])['ts']
+                with lock:
+                    latencies.append(time.time() - sent)
+                received += 1
+                if received >= expected:
+                    return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[10, 100, 300])
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.pop('AUCTION_STORE', None)
+    import app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app.manager.log_message = lambda message, *args, **kwargs: None
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{'subscribers':>11} {'events':>7} {'publish us/event':>17} {'p50 ms':>8} {'p99 ms':>8} {'delivered':>10}")
+    for count in args.subscribers:
+        latencies = []
+        lock = threading.Lock()
+        ready = threading.Semaphore(0)
+        threads = [
+            threading.Thread(target=subscriber, args=(base_url, args.events, latencies, ready, lock), daemon=True)
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for _ in threads:
+            ready.acquire()
+        time.sleep(0.5)  # Let every stream reach its blocking read
+
+        auction = app.Auction('bench', '2020-01-01T00:00', '2099-01-01T00:00', 0, 'UTC')
+        auction.active = True  # No start edge event; only the published ones are counted
+        app.manager.attach(auction)
+        publish_time = 0.0
+        for i in range(args.events):
+            started = time.perf_counter()
+            app.manager.on_auction_change(auction, 'state', {})
+            publish_time += time.perf_counter() - started
+            time.sleep(0.002)
+        for thread in threads:
+            thread.join(timeout=30)
+        print(f"{count:>11} {args.events:>7} {publish_time / args.events * 1e6:>17.1f} "
+              f"{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f} "
+              f"{len(latencies):>10}")
+        app.manager.detach('bench')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Restart cost when most stored auctions have long ended.
+
+Seeds each store backend with --ended finished auctions and --live
+running ones, --bids bids each, restarts, and restores a manager from
+it. Checks that:
+
+  * only the running auctions come back with their bids in memory
+  * an ended auction's bid history still reads back in full on demand,
+    and its bid count is right before that
+  * the WAL store's snapshot holds no bid lists for ended auctions
+    (they're in the archive file), and survives a second restart
+
+It exits non-zero if any check fails.
+
+    python bench/bench_restore.py --ended 2000 --live 50 --bids 100
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ended', type=int, default=2000)
+    parser.add_argument('--live', type=int, default=50)
+    parser.add_argument('--bids', type=int, default=100, help='Bids per auction')
+    args = parser.parse_args()
+    if args.ended < 2 or args.bids < 1:
+        parser.error('needs at least 2 ended auctions with a bid each')
+
+    os.environ.pop('AUCTION_STORE', None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    from storage import SQLiteStore, WALStore
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    failures = []
+
+    def make_store(backend, directory):
+        if backend == 'wal':
+            # At least one snapshot while seeding, so there is an archive to read back
+            events = (args.ended + args.live) * (args.bids + 1)
+            return WALStore(os.path.join(directory, 'wal'), snapshot_every=min(5000, max(events // 2, 1)))
+        return SQLiteStore(os.path.join(directory, 'auctions.db'))
+
+    def seed(store):
+        for i in range(args.ended + args.live):
+            ended = i < args.ended
+            start, end = (now - datetime.timedelta(days=2), now - datetime.timedelta(days=1)) if ended else \
+                (now - datetime.timedelta(hours=1), now + datetime.timedelta(hours=1))
+            post_id = f"{'ended' if ended else 'live'}{i}"
+            store.append({'op': 'auction', 'post_id': post_id, 'start_time': start.isoformat(),
+                          'end_time': end.isoformat(), 'starting_bid': 0, 'timezone': 'UTC'})
+            for n in range(1, args.bids + 1):
+                store.append({'op': 'bid', 'post_id': post_id, 'bidder_id': f"user{n % 37}",
+                              'bidder_name': f"User {n % 37}", 'amount': float(n),
+                              'time': (start + datetime.timedelta(seconds=n)).isoformat()})
+        store.close()
+
+    def restore(backend, directory):
+        manager = app.FacebookAuctionManager(make_store(backend, directory))
+        manager.log_message = lambda message, *args, **kwargs: None
+        manager.scheduler = None
+        started = time.perf_counter()
+        manager.restore()
+        return manager, time.perf_counter() - started
+
+    def check(backend, manager):
+        auctions = manager.auctions
+        if len(auctions) != args.ended + args.live:
+            failures.append(f"{backend}: restored {len(auctions)} auctions")
+            return
+        loaded = sum(auction.loaded_bids is not None for auction in auctions.values())
+        if loaded != args.live:
+            failures.append(f"{backend}: {loaded} auctions restored with bids, expected the {args.live} live ones")
+        auction = auctions['ended0']
+        if auction.snapshot.bid_count != args.bids:
+            failures.append(f"{backend}: ended auction counts {auction.snapshot.bid_count} bids unloaded")
+        history = auction.bid_history
+        if [amount for _, _, amount, _ in history] != [float(n) for n in range(1, args.bids + 1)]:
+            failures.append(f"{backend}: ended auction read back {len(history)} bids")
+        if manager.get_bid_history(['ended1'])['ended1'][-1]['amount'] != f"${float(args.bids)}":
+            failures.append(f"{backend}: bid history API missed an ended auction's bids")
+
+    print(f"{'backend':>7} {'restore (s)':>12} {'with bids':>10} {'snapshot (KB)':>14}")
+    for backend in ('wal', 'sqlite'):
+        with tempfile.TemporaryDirectory() as directory:
+            seed(make_store(backend, directory))
+            manager, elapsed = restore(backend, directory)
+            loaded = sum(auction.loaded_bids is not None for auction in manager.auctions.values())
+            check(backend, manager)
+            manager.store.close()
+            size = ''
+            if backend == 'wal':
+                path = os.path.join(directory, 'wal', 'auctions.snapshot.json')
+                size = f"{os.path.getsize(path) / 1024:.0f}"
+                with open(path, encoding='utf-8') as f:
+                    records = json.load(f)['auctions'].values()
+                kept = sum(len(record['bids']) for record in records if record['post_id'].startswith('ended'))
+                if kept:
+                    failures.append(f"wal: snapshot still holds {kept} bids of ended auctions")
+                manager, _ = restore(backend, directory)  # Snapshot, archive and log tail again
+                check('wal after a second restart', manager)
+                manager.store.close()
+            print(f"{backend:>7} {elapsed:>12.3f} {loaded:>10} {size:>14}")
+
+    for message in failures:
+        print(f"  FAIL {message}")
+    print('OK' if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Sustained bids/sec with durable (fsync'd) writes for each store backend.
+
+    python bench/bench_storage.py --bids 20000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStore, WALStore
+
+
+def make_store(backend, directory):
+    if backend == 'wal':
+        return WALStore(os.path.join(directory, 'wal'), snapshot_every=5000)
+    return SQLiteStore(os.path.join(directory, 'auctions.db'))
+
+
+def seed(store, auctions):
+    for i in range(auctions):
+        store.append({'op': 'auction', 'post_id': f"post{i}", 'start_time': '2025-01-01T00:00:00+00:00',
+                      'end_time': '2025-01-02T00:00:00+00:00', 'starting_bid': 0, 'timezone': 'UTC'})
+    store.flush()
+
+
+def bid_event(n, auctions):
+    return {'op': 'bid', 'post_id': f"post{n % auctions}", 'bidder_id': f"user{n % 97}",
+            'bidder_name': f"User {n % 97}", 'amount': float(n), 'time': '2025-01-01T12:00:00+00:00'}
+
+
+def run_writers(store, bids, auctions, writers, flush_every):
+    per_writer = bids // writers
+
+    def writer(offset):
+        for i in range(per_writer):
+            store.append(bid_event(offset + i, auctions))
+            if (i + 1) % flush_every == 0:
+                store.flush()
+        store.flush()
+
+    threads = [threading.Thread(target=writer, args=(w * per_writer,)) for w in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_writer * writers / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bids', type=int, default=20000)
+    parser.add_argument('--auctions', type=int, default=200)
+    args = parser.parse_args()
+
+    scenarios = [
+        ('1 writer, fsync per bid', 1, 1),
+        ('1 writer, fsync per 50-bid poll', 1, 50),
+        ('16 writers, fsync per bid (group commit)', 16, 1),
+    ]
+    print(f"{'backend':>7} {'scenario':<42} {'bids/s':>10} {'commits':>8} {'restore (s)':>12}")
+    for backend in ('wal', 'sqlite'):
+        for label, writers, flush_every in scenarios:
+            directory = tempfile.mkdtemp(prefix='bench-store-')
+            try:
+                store = make_store(backend, directory)
+                seed(store, args.auctions)
+                commits_before = store.commits
+                # fsync-per-bid is slow; keep its run short
+                bids = args.bids if flush_every > 1 or writers > 1 else min(args.bids, 2000)
+                rate = run_writers(store, bids, args.auctions, writers, flush_every)
+                commits = store.commits - commits_before
+                store.close()
+                started = time.perf_counter()
+                restored = make_store(backend, directory)
+                restored.load()
+                restore_time = time.perf_counter() - started
+                restored.close()
+                print(f"{backend:>7} {label:<42} {rate:>10.0f} {commits:>8} {restore_time:>12.3f}")
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Measure how web workers keep up with a shared SQLite store.
+
+A writer connection plays the monitor process: it seeds --auctions
+auctions with --bids bids each, then places one bid, and then makes a
+mix of changes (bids, state and cursor updates, deletes, re-creations).
+After each step a web-mode manager syncs, and its auctions must match a
+manager that reloaded everything from the store. Also checked:
+
+  * the sync after one foreign bid is much cheaper than a full reload
+    (under --max-sync-share of it)
+  * a monitor-style sync (refresh=False) only adds and drops auctions
+  * /health, /metrics and /webhook never wait on a sync
+
+It exits non-zero if any check fails.
+
+    python bench/bench_sync.py --auctions 1000 --bids 100
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def auction_event(post_id, now):
+    return {'op': 'auction', 'post_id': post_id, 'start_time': (now - datetime.timedelta(hours=1)).isoformat(),
+            'end_time': (now + datetime.timedelta(hours=1)).isoformat(), 'starting_bid': 0, 'timezone': 'UTC'}
+
+
+def bid_event(post_id, amount, rng):
+    bidder = rng.randint(1, 500)
+    return {'op': 'bid', 'post_id': post_id, 'bidder_id': f"user{bidder}", 'bidder_name': f"User {bidder}",
+            'amount': float(amount), 'time': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+
+
+def state(manager):
+    return {
+        post_id: (auction.current_bid, auction.current_bidder, auction.active,
+                  auction.comment_cursor.to_dict(), list(auction.bids.rows()))
+        for post_id, auction in manager.auctions.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=1000)
+    parser.add_argument('--bids', type=int, default=100, help='Bids per auction before the run')
+    parser.add_argument('--max-sync-share', type=float, default=0.1,
+                        help='Largest share of a full reload one incremental sync may take')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.pop('AUCTION_STORE', None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    from storage import SQLiteStore
+
+    rng = random.Random(args.seed)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    failures = []
+
+    def new_manager(path, restore=True):
+        manager = app.FacebookAuctionManager(SQLiteStore(path))
+        manager.log_message = lambda message, *args, **kwargs: None
+        manager.scheduler = None  # Web workers don't fire lifecycle edges
+        if restore:
+            manager.restore()
+        return manager
+
+    def compare(label, manager, path):
+        reference = new_manager(path)
+        expected, actual = state(reference), state(manager)
+        reference.store.close()
+        if expected != actual:
+            wrong = sorted(post_id for post_id in expected.keys() | actual.keys()
+                           if expected.get(post_id) != actual.get(post_id))
+            failures.append(f"{label}: {len(wrong)} auctions differ from a full reload, e.g. {wrong[:5]}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'auctions.db')
+        writer = SQLiteStore(path)
+        amounts = {}
+        started = time.perf_counter()
+        for i in range(args.auctions):
+            post_id = f"post{i}"
+            writer.append(auction_event(post_id, now))
+            amounts[post_id] = 0
+            for _ in range(args.bids):
+                amounts[post_id] += rng.randint(1, 10)
+                writer.append(bid_event(post_id, amounts[post_id], rng))
+        writer.flush()
+        print(f"seeded {args.auctions} auctions x {args.bids} bids in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        web = new_manager(path)
+        full = time.perf_counter() - started
+        monitor = new_manager(path)
+
+        post_id = rng.choice(list(amounts))
+        amounts[post_id] += 5
+        writer.append(bid_event(post_id, amounts[post_id], rng))
+        writer.flush()
+        started = time.perf_counter()
+        web.sync_from_store()
+        one_bid = time.perf_counter() - started
+        print(f"full reload {full * 1000:.1f} ms, sync after one foreign bid {one_bid * 1000:.2f} ms")
+        if one_bid > full * args.max_sync_share:
+            failures.append(f"one-bid sync took {one_bid * 1000:.1f} ms against a {full * 1000:.1f} ms full reload")
+        compare('after one bid', web, path)
+
+        # A mix of everything another process writes
+        posts = list(amounts)
+        for post_id in rng.sample(posts, 50):
+            amounts[post_id] += rng.randint(1, 10)
+            writer.append(bid_event(post_id, amounts[post_id], rng))
+        for post_id in rng.sample(posts, 10):
+            writer.append({'op': 'state', 'post_id': post_id, 'active': True})
+            writer.append({'op': 'cursor', 'post_id': post_id, 'cursor': {'after': 'c1', 'last_comment_id': 'x',
+                                                                          'ids_at_last_time': ['x']}})
+        dropped = rng.sample(posts, 6)
+        for post_id in dropped:
+            writer.append({'op': 'delete', 'post_id': post_id})
+        recreated = dropped[:2] + rng.sample([p for p in posts if p not in dropped], 2)
+        for post_id in recreated:
+            writer.append(auction_event(post_id, now))
+            writer.append(bid_event(post_id, 1, rng))
+        writer.append(auction_event('brand-new', now))
+        writer.flush()
+        web.sync_from_store()
+        compare('after mixed changes', web, path)
+        expected = set(posts) - set(dropped) | set(recreated) | {'brand-new'}
+        if set(web.auctions) != expected:
+            failures.append(f"web worker holds {len(web.auctions)} auctions, expected {len(expected)}")
+
+        before = {post_id: auction for post_id, auction in monitor.auctions.items()}
+        monitor.sync_from_store(refresh=False)
+        if set(monitor.auctions) != expected:
+            failures.append(f"monitor holds {len(monitor.auctions)} auctions, expected {len(expected)}")
+        kept = [post_id for post_id in expected if post_id in before and post_id not in recreated]
+        if any(monitor.auctions[post_id] is not before[post_id] for post_id in kept):
+            failures.append('monitor sync replaced auctions it owns')
+        if any(len(monitor.auctions[post_id].bids) != len(before[post_id].bids) for post_id in kept):
+            failures.append('monitor sync changed bids it owns')
+
+        syncs = []
+        sync = web.sync_from_store
+        web.sync_from_store = lambda *a, **kw: syncs.append(1) or sync(*a, **kw)
+        app.manager, app.MONITOR_MODE = web, 'web'
+        client = app.app.test_client()
+        for url in ('/health', '/metrics'):
+            client.get(url)
+        client.post('/webhook', data=b'{}')
+        if syncs:
+            failures.append(f"{len(syncs)} syncs for /health, /metrics and /webhook")
+        client.get('/login')
+        if not syncs:
+            failures.append('a page that reads auctions did not sync')
+
+        for manager in (web, monitor):
+            manager.store.close()
+        writer.close()
+
+    for message in failures:
+        print(f"  FAIL {message}")
+    print('OK' if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
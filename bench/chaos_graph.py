@@ -0,0 +1,196 @@
+"""Run GraphClient against the fault-injecting fake Graph server.
+
+Each scenario starts a fresh server and client and checks one behaviour:
+
+  hangs      requests that hang are cut off by the read timeout and retried
+  errors     30% 5xx answers are retried away with jittered backoff
+  throttle   a per-second call limit opens the throttle circuit, later calls
+             fail fast, and the client keeps well under a naive retry loop
+  outage     a full outage opens the server circuit; a probe closes it again
+             once the server is back
+  broken     a post that always fails backs off alone; other posts and the
+             shared circuits are unaffected
+  batch      the same isolation for batched reads
+  post       an announcement whose POST hangs past the read timeout is
+             not sent again: Graph may already have posted it
+
+It exits non-zero if any check fails.
+
+    python bench/chaos_graph.py
+    python bench/chaos_graph.py --only throttle
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_graph import start_server  # noqa: E402
+from announcer import AnnouncementQueue  # noqa: E402
+from graph_client import BatchItem, GraphClient, GraphError, GraphUnavailable  # noqa: E402
+
+
+def make_client(server, **kwargs):
+    client = GraphClient('token', base_url=server.url, **kwargs)
+    for breaker in client.breakers.values():
+        breaker.base_cooldown = breaker.cooldown = 1.0  # Keep the run short
+    client.posts.base = 0.5
+    return client
+
+
+def call(client, post_id='post1'):
+    """One read; returns ('ok' | 'error' | 'refused' | 'raised', seconds)."""
+    started = time.monotonic()
+    try:
+        body = client.get(f"{post_id}/comments", {'limit': 5})
+        outcome = 'error' if 'error' in body else 'ok'
+    except GraphUnavailable:
+        outcome = 'refused'
+    except Exception:
+        outcome = 'raised'
+    return outcome, time.monotonic() - started
+
+
+def hangs(check):
+    server = start_server(slow_rate=0.2, slow_latency=2.0, seed=1)
+    client = make_client(server, connect_timeout=0.5, read_timeout=0.25)
+    results = [call(client) for _ in range(60)]
+    worst = max(seconds for _, seconds in results)
+    ok = sum(outcome == 'ok' for outcome, _ in results)
+    bound = (client.retries + 1) * client.read_timeout + 8
+    check(ok >= 57, f"{ok}/60 reads succeeded through 20% hanging requests")
+    check(worst < bound, f"slowest call {worst:.2f}s (bound {bound:.1f}s)")
+    return f"{ok}/60 ok, {server.state.faults['slow']} hangs, slowest {worst:.2f}s"
+
+
+def errors(check):
+    server = start_server(error_rate=0.3, seed=2)
+    client = make_client(server)
+    client.breakers['server'].threshold = 100  # Measure retries alone here
+    results = [call(client) for _ in range(100)]
+    ok = sum(outcome == 'ok' for outcome, _ in results)
+    check(ok >= 93, f"{ok}/100 reads succeeded through 30% 5xx answers")
+    return f"{ok}/100 ok, {server.state.faults['error']} injected 5xx, {server.state.requests} requests"
+
+
+def throttle(check):
+    server = start_server(rate_limit=20)
+    client = make_client(server, rate=1000)  # Let the usage headers and throttle answers do the limiting
+    seconds = 3.0
+    outcomes = {}
+    fast_refusals = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        outcome, took = call(client)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if outcome == 'refused':
+            fast_refusals.append(took)
+            time.sleep(0.001)
+    sent = server.state.requests
+    check(client.breakers['throttle'].opened >= 1, 'throttle circuit opened')
+    check(sent < 20 * seconds * 2, f"{sent} requests reached the server in {seconds:.0f}s against a 20/s limit")
+    check(max(fast_refusals, default=0) < 0.05, f"refused calls took at most {max(fast_refusals, default=0) * 1000:.1f} ms")
+    return f"{sent} sent, outcomes {outcomes}, throttled {server.state.faults['throttle']}"
+
+
+def outage(check):
+    server = start_server()
+    client = make_client(server)
+    server.state.outage = True
+    during = [call(client)[0] for _ in range(40)]
+    sent_during = server.state.requests
+    check(client.breakers['server'].state == 'open', 'server circuit open during the outage')
+    check(during.count('refused') >= 30, f"{during.count('refused')}/40 calls refused without a request")
+    server.state.outage = False
+    time.sleep(1.1)
+    after = [call(client)[0] for _ in range(5)]
+    check(after.count('ok') == 5, f"{after.count('ok')}/5 reads succeeded after recovery")
+    check(client.breakers['server'].state == 'closed', 'server circuit closed again')
+    return f"{sent_during} requests during the outage, then {after}"
+
+
+def broken(check):
+    server = start_server(broken_posts={'bad'})
+    client = make_client(server)
+    good = 0
+    for _ in range(50):
+        good += call(client, 'good')[0] == 'ok'
+        call(client, 'bad')
+    bad = server.state.calls_per_post['bad']
+    check(good == 50, f"{good}/50 reads of a healthy post succeeded")
+    check(bad < 10, f"broken post reached the server {bad} times in 50 tries")
+    check(all(breaker.state == 'closed' for breaker in client.breakers.values()), 'shared circuits stayed closed')
+    return f"good {good}/50, broken post sent {bad}/50"
+
+
+def batch(check):
+    server = start_server(broken_posts={'bad'})
+    client = make_client(server)
+    good = 0
+    for _ in range(20):
+        items = [BatchItem('GET', f"{post_id}/comments", {'limit': 5}, key=post_id)
+                 for post_id in ('a', 'b', 'bad', 'c')]
+        client.batch(items)
+        good += sum('error' not in item.result for item in items if item.key != 'bad')
+    sent_bad = server.state.calls_per_post['bad']
+    check(good == 60, f"{good}/60 healthy batch items succeeded")
+    check(sent_bad < 8, f"broken post sent in {sent_bad}/20 batches")
+    return f"good {good}/60, broken post sent {sent_bad}/20"
+
+
+def post(check):
+    server = start_server(slow_rate=1.0, slow_latency=0.6)
+    client = make_client(server, read_timeout=0.2)
+
+    def send(post_id, message):
+        data = client.post(f"{post_id}/comments", {'message': message})
+        if 'error' in data:
+            raise GraphError(data['error']['message'], data['error'].get('code'))
+
+    queue = AnnouncementQueue(send, workers=1, backoff=0.05)
+    queue.start()
+    queue.enqueue('post1', 'Winner: Bidder with $10', 'winner')
+    deadline = time.monotonic() + 5
+    while queue.get_stats()['failed'] + queue.get_stats()['sent'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    queue.stop()
+    time.sleep(server.state.slow_latency + 0.2)  # Let the hung request finish posting
+    posted = [message for post_id, message, _ in server.state.posted if post_id == 'post1']
+    check(len(posted) == 1, f"winner posted {len(posted)} times through a POST read timeout")
+    check(queue.get_stats()['retries'] == 0, f"{queue.get_stats()['retries']} resends after a read timeout")
+    return f"posted {len(posted)}, queue {queue.get_stats()['failed']} failed, {queue.get_stats()['retries']} retries"
+
+
+SCENARIOS = {'hangs': hangs, 'errors': errors, 'throttle': throttle, 'outage': outage, 'broken': broken,
+             'batch': batch, 'post': post}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', choices=sorted(SCENARIOS), action='append')
+    args = parser.parse_args()
+
+    failures = []
+    for name in args.only or SCENARIOS:
+        problems = []
+
+        def check(passed, message):
+            if not passed:
+                problems.append(message)
+
+        started = time.monotonic()
+        summary = SCENARIOS[name](check)
+        print(f"{name:<10} {time.monotonic() - started:>5.1f}s  {summary}")
+        for message in problems:
+            print(f"  FAIL {message}")
+        failures.extend(problems)
+    print('OK' if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    threading.excepthook = lambda args: None  # Server threads whose client hung up early
+    main()
@@ -0,0 +1,244 @@
+"""Local stand-in for the parts of the Graph API this app talks to.
+
+Run standalone with ``python bench/fake_graph.py --port 8765`` and point the
+app at it with ``GRAPH_API_URL=http://127.0.0.1:8765``.
+
+It can also inject faults: a share of requests that hang (``slow_rate``
+for ``slow_latency`` seconds), fail with a 5xx (``error_rate``) or get
+throttled (``throttle_rate``); a per-second call limit answered with
+code 4 and X-App-Usage headers, counted per access token like Graph's
+per-Page limits (``rate_limit``, or ``token_limits`` for some tokens); a
+full ``outage``; and posts that always fail with code 100
+(``broken_posts``). Knobs can be changed while it runs.
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeGraphState:
+    def __init__(self, latency=0.0, comments_per_post=5, error_rate=0.0, throttle_rate=0.0, slow_rate=0.0,
+                 slow_latency=5.0, rate_limit=None, token_limits=None, broken_posts=(), seed=None):
+        self.latency = latency
+        self.comments_per_post = comments_per_post
+        self.comments = {}  # post_id -> list of comment dicts
+        self.posted = []  # (post_id, message, epoch seconds received)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rate_limit = rate_limit  # Calls per second per token before answering code 4
+        self.token_limits = dict(token_limits or {})  # token -> its own calls per second
+        self.broken_posts = set(broken_posts)
+        self.outage = False
+        self.rng = random.Random(seed)
+        self.recent = collections.defaultdict(collections.deque)  # token -> call times in the last second
+        self.faults = collections.Counter()
+        self.calls_per_post = collections.Counter()
+        self.calls_per_token = collections.Counter()
+        self.throttled_per_token = collections.Counter()
+
+    def fault(self, calls=1, token=None):
+        """Pick this request's injected fault: None, 'outage', 'error', 'throttle' or 'slow'; and the usage %."""
+        with self.lock:
+            now = time.monotonic()
+            self.calls_per_token[token] += calls
+            limit = self.token_limits.get(token, self.rate_limit)
+            recent = self.recent[token]
+            recent.extend([now] * calls)
+            while recent and recent[0] < now - 1:
+                recent.popleft()
+            usage = min(len(recent) * 100 // limit, 100) if limit else 0
+            roll = self.rng.random()
+            if self.outage:
+                kind = 'outage'
+            elif limit and len(recent) > limit:
+                kind = 'throttle'
+                self.throttled_per_token[token] += 1
+            elif roll < self.error_rate:
+                kind = 'error'
+            elif roll < self.error_rate + self.throttle_rate:
+                kind = 'throttle'
+            elif roll < self.error_rate + self.throttle_rate + self.slow_rate:
+                kind = 'slow'
+            else:
+                kind = None
+            if kind:
+                self.faults[kind] += 1
+            return kind, 100 if kind == 'throttle' else usage
+
+    def get_comments(self, post_id):
+        with self.lock:
+            if post_id not in self.comments:
+                self.comments[post_id] = [
+                    {
+                        'id': f"{post_id}_{i}",
+                        'message': f"bid {10 + i}",
+                        'from': {'id': f"user{i}", 'name': f"User {i}"},
+                        'created_time': '2025-01-01T00:00:00+0000',
+                    }
+                    for i in range(self.comments_per_post)
+                ]
+            return list(self.comments[post_id])
+
+    def add_comment(self, post_id, message, from_id='page', from_name='Page'):
+        with self.lock:
+            comments = self.comments.setdefault(post_id, [])
+            comment = {
+                'id': f"{post_id}_{len(comments)}",
+                'message': message,
+                'from': {'id': from_id, 'name': from_name},
+                'created_time': time.strftime('%Y-%m-%dT%H:%M:%S+0000', time.gmtime()),
+            }
+            comments.append(comment)
+            return comment
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, usage=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if usage is not None:
+            self.send_header('X-App-Usage', json.dumps({'call_count': usage, 'total_cputime': 0, 'total_time': 0}))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client timed out first
+
+    def _inject(self, state, query, calls=1):
+        # Answers the request with a fault and returns True, or returns False to serve it normally
+        token = query.get('access_token', [None])[0]
+        kind, usage = state.fault(calls, token)
+        self.usage = usage if state.rate_limit or token in state.token_limits else None
+        if kind == 'slow':
+            time.sleep(state.slow_latency)
+            return False
+        if kind == 'outage':
+            self._send_json({'error': {'message': 'Service unavailable', 'code': 2}}, 503)
+        elif kind == 'error':
+            self._send_json({'error': {'message': 'An unknown error occurred', 'code': 1}}, 500)
+        elif kind == 'throttle':
+            self._send_json({'error': {'message': 'Application request limit reached', 'code': 4}}, 403, 100)
+        return kind is not None
+
+    def _begin(self):
+        state = self.server.state
+        with state.lock:
+            state.requests += 1
+        if state.latency:
+            time.sleep(state.latency)
+        parsed = urlparse(self.path)
+        return state, parsed.path.strip('/').split('/'), parse_qs(parsed.query)
+
+    def _comments_page(self, state, post_id, query):
+        # Cursors are the index of the last comment returned, as strings
+        comments = state.get_comments(post_id)
+        limit = int(query.get('limit', ['25'])[0])
+        after = query.get('after', [None])[0]
+        start = int(after) + 1 if after is not None else 0
+        page = comments[start:start + limit]
+        if not page:
+            return {'data': []}
+        paging = {'cursors': {'before': str(start), 'after': str(start + len(page) - 1)}}
+        if start + len(page) < len(comments):
+            paging['next'] = f"/{post_id}/comments?after={start + len(page) - 1}&limit={limit}"
+        return {'data': page, 'paging': paging}
+
+    def _dispatch(self, state, method, parts, query):
+        with state.lock:
+            state.calls_per_post[parts[0]] += 1
+        if parts[0] in state.broken_posts:
+            return 400, {'error': {'message': 'Unsupported get request. Object does not exist', 'code': 100}}
+        if len(parts) == 2 and parts[1] == 'comments':
+            if method == 'GET':
+                return 200, self._comments_page(state, parts[0], query)
+            message = query.get('message', [''])[0]
+            with state.lock:
+                state.posted.append((parts[0], message, time.time()))
+            comment = state.add_comment(parts[0], message)
+            return 200, {'id': comment['id']}
+        return 404, {'error': {'message': 'Unknown path', 'code': 100}}
+
+    def _batch(self, state, query):
+        # Each entry mirrors Graph's batch response: code, headers and a JSON string body
+        results = []
+        for item in json.loads(query.get('batch', ['[]'])[0]):
+            relative = urlparse('/' + item['relative_url'].lstrip('/'))
+            item_query = parse_qs(relative.query)
+            item_query.update(parse_qs(item.get('body', '')))
+            status, payload = self._dispatch(state, item['method'], relative.path.strip('/').split('/'), item_query)
+            results.append({'code': status, 'headers': [], 'body': json.dumps(payload)})
+        return results
+
+    def do_GET(self):
+        state, parts, query = self._begin()
+        if self._inject(state, query):
+            return
+        status, payload = self._dispatch(state, 'GET', parts, query)
+        self._send_json(payload, status, self.usage)
+
+    def do_POST(self):
+        state, parts, query = self._begin()
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            query.update(parse_qs(self.rfile.read(length).decode('utf-8')))
+        if parts == [''] and 'batch' in query:
+            if not self._inject(state, query, len(json.loads(query['batch'][0]))):
+                self._send_json(self._batch(state, query), usage=self.usage)
+            return
+        if self._inject(state, query):
+            return
+        status, payload = self._dispatch(state, 'POST', parts, query)
+        self._send_json(payload, status, self.usage)
+
+
+class FakeGraphServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Many pools connecting at once overflow the default backlog of 5 and wait on SYN retries
+
+
+def start_server(port=0, **kwargs):
+    """Start a fake Graph server on a background thread and return it."""
+    server = FakeGraphServer(('127.0.0.1', port), FakeGraphHandler)
+    server.state = FakeGraphState(**kwargs)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local fake Graph API server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--comments', type=int, default=5)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with code 4')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Share of requests that hang')
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    parser.add_argument('--rate-limit', type=int, help='Calls per second before throttling')
+    args = parser.parse_args()
+    server = start_server(args.port, latency=args.latency, comments_per_post=args.comments,
+                          error_rate=args.error_rate, throttle_rate=args.throttle_rate, slow_rate=args.slow_rate,
+                          slow_latency=args.slow_latency, rate_limit=args.rate_limit)
+    print(f"Fake Graph API listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,178 @@
+"""Run auctions for several Pages against the fake Graph server and check that
+one throttled Page does not slow the others down.
+
+Every Page has its own token and --auctions live auctions, polled every
+--interval seconds, and a commenter posts --bid-rate bids a second spread
+over all of them. Two phases of --duration seconds run on one manager
+each:
+
+  baseline   every Page healthy
+  throttled  the fake server limits the --throttled Page's token to
+             --throttled-limit calls a second, far below what its
+             auctions need
+
+For the healthy Pages the throttled phase must match the baseline: every
+bid posted before the last poll round is seen, and detection lag and
+announcement latency stay within --slack of it. The throttled Page must
+back off rather than keep sending into its limit.
+
+It exits non-zero if any check fails.
+
+    python bench/multi_page.py
+    python bench/multi_page.py --pages 10 --engine batch
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_graph import start_server  # noqa: E402
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+def run_phase(app, server, args, phase, throttled):
+    page_ids = [f"page{i}" for i in range(args.pages)]
+    tokens = {page_id: f"{phase}-{page_id}" for page_id in page_ids}
+    if throttled:
+        server.state.token_limits[tokens[throttled]] = args.throttled_limit
+    manager = app.FacebookAuctionManager(tokens=app.TokenRegistry(page_tokens=tokens))
+    manager.log_message = lambda message, *args, **kwargs: None
+    manager.poll_policy = app.FixedPollPolicy(args.interval)
+
+    posted = {}  # comment id -> (page_id, epoch seconds posted)
+    detected = {}  # comment id -> epoch seconds the bid was accepted
+    handle_comment = manager.handle_comment
+
+    def timed_handle_comment(post_id, auction, comment, amount=None, source='poll'):
+        accepted = handle_comment(post_id, auction, comment, amount, source)
+        if accepted:
+            detected[comment['id']] = time.time()
+        return accepted
+
+    manager.handle_comment = timed_handle_comment
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = (now - datetime.timedelta(hours=1)).isoformat()
+    end = (now + datetime.timedelta(hours=1)).isoformat()
+    auctions = [app.Auction(f"{page_id}_{phase}{i}", start, end, 0, 'UTC', page_id)
+                for page_id in page_ids for i in range(args.auctions)]
+    before = dict(server.state.calls_per_token)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.start_monitoring(args.engine)
+        manager.attach(*auctions)
+
+        rng = random.Random(args.seed)
+        amounts = {auction.post_id: 0 for auction in auctions}
+        deadline = time.time() + args.duration
+        while time.time() < deadline:
+            auction = rng.choice(auctions)
+            amounts[auction.post_id] += rng.randint(1, 20)
+            comment = server.state.add_comment(auction.post_id, f"bid {amounts[auction.post_id]}",
+                                               f"user{rng.randint(1, 500)}", 'Bidder')
+            posted[comment['id']] = (auction.page_id, time.time())
+            time.sleep(rng.expovariate(args.bid_rate))
+        time.sleep(args.interval * 2 + 1)  # One more poll round for the last bids
+        manager.stop_monitoring()
+        for thread in manager.monitor_threads():
+            thread.join(timeout=10)
+        manager.stop_lifecycle()
+
+    cutoff = deadline - args.interval * 2  # Bids after this may legitimately still be unread
+    results = {}
+    for page_id in page_ids:
+        lags = [detected[comment_id] - at for comment_id, (page, at) in posted.items()
+                if page == page_id and comment_id in detected]
+        missed = sum(1 for comment_id, (page, at) in posted.items()
+                     if page == page_id and at < cutoff and comment_id not in detected)
+        announcements = manager.pages[page_id].announcements.get_stats()
+        graph = manager.tokens.client(page_id).get_stats()
+        results[page_id] = {
+            'bids': sum(1 for page, _ in posted.values() if page == page_id),
+            'seen': len(lags),
+            'missed': missed,
+            'lag_p50': percentile(lags, 0.5),
+            'lag_p95': percentile(lags, 0.95),
+            'announced': announcements['sent'],
+            'announce_p95': announcements.get('send_latency', {}).get('p95', 0.0),
+            'requests': server.state.calls_per_token[tokens[page_id]] - before.get(tokens[page_id], 0),
+            'throttle_opened': graph['circuits']['throttle']['opened'],
+        }
+    return results
+
+
+def print_phase(name, results, throttled):
+    print(f"{name}")
+    print(f"  {'page':<8} {'bids':>5} {'seen':>5} {'missed':>6} {'lag p50':>8} {'lag p95':>8} "
+          f"{'announced':>9} {'ann p95':>8} {'requests':>8}")
+    for page_id, row in results.items():
+        mark = ' *' if page_id == throttled else ''
+        print(f"  {page_id:<8} {row['bids']:>5} {row['seen']:>5} {row['missed']:>6} {row['lag_p50']:>7.2f}s "
+              f"{row['lag_p95']:>7.2f}s {row['announced']:>9} {row['announce_p95']:>7.2f}s {row['requests']:>8}{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--auctions', type=int, default=10, help='Live auctions per Page')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls of one auction')
+    parser.add_argument('--bid-rate', type=float, default=20, help='Bids per second over all Pages')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of bidding per phase')
+    parser.add_argument('--throttled', default='page0')
+    parser.add_argument('--throttled-limit', type=int, default=2, help='Calls per second the throttled token gets')
+    parser.add_argument('--engine', choices=('thread', 'asyncio', 'batch'), default='thread')
+    parser.add_argument('--slack', type=float, default=0.5, help='Seconds healthy Pages may lose to the baseline')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    server = start_server(comments_per_post=0)
+    os.environ.pop('AUCTION_STORE', None)
+    os.environ['GRAPH_API_URL'] = server.url
+    os.environ['MONITOR_MODE'] = 'embedded'
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    baseline = run_phase(app, server, args, 'a', None)
+    throttled = run_phase(app, server, args, 'b', args.throttled)
+    print_phase('baseline', baseline, None)
+    print_phase(f"throttled ({args.throttled} limited to {args.throttled_limit}/s)", throttled, args.throttled)
+
+    failures = []
+    for page_id, row in throttled.items():
+        if page_id == args.throttled:
+            continue
+        base = baseline[page_id]
+        if row['missed']:
+            failures.append(f"{page_id} missed {row['missed']} bids while {args.throttled} was throttled")
+        if row['lag_p95'] > base['lag_p95'] + args.slack:
+            failures.append(f"{page_id} detection lag p95 {row['lag_p95']:.2f}s vs {base['lag_p95']:.2f}s baseline")
+        if row['announce_p95'] > base['announce_p95'] + args.slack:
+            failures.append(f"{page_id} announcement p95 {row['announce_p95']:.2f}s "
+                            f"vs {base['announce_p95']:.2f}s baseline")
+    slow = throttled[args.throttled]
+    if not slow['throttle_opened']:
+        failures.append(f"{args.throttled}'s throttle circuit never opened")
+    budget = args.throttled_limit * (args.duration + args.interval * 2 + 1)
+    if slow['requests'] > budget:
+        failures.append(f"{args.throttled} sent {slow['requests']} requests against a {budget:.0f}-call allowance")
+    for message in failures:
+        print(f"  FAIL {message}")
+    print('OK' if not failures else f"{len(failures)} failures")
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    threading.excepthook = lambda args: None  # Server threads whose client hung up early
+    main()
@@ -0,0 +1,339 @@
+"""Replay a synthetic auction day through the whole bid pipeline and record the results.
+
+A seeded schedule compresses a day of --auctions auctions into --duration
+real seconds. Start times are staggered, bidding is sparse at first and
+comes in bursts before each close, and some comments are chatter. A
+child process plays the outside world:
+
+  * the fake Graph API (bench/fake_graph.py), with optional latency,
+    5xx answers and throttling
+  * the commenters, posting each scheduled comment at its time
+  * --dashboards dashboard clients, each holding /api/events open and
+    refreshing /api/auctions and /api/auctions/stats with If-None-Match
+
+This process runs the app unmodified: lifecycle scheduler, the chosen
+poll engine, announcer, and the Flask app on a local port. Its CPU and
+RSS are the app's alone.
+
+Reported: bid detection latency (comment posted to bid accepted), bids
+missed (every scheduled bid outbids the last, so any not accepted were
+posted after the auction's final poll), announcement latency (bid
+accepted to the "New bid" comment reaching Graph), Graph requests per
+bid, CPU seconds, peak RSS, dashboard request latency and 304 share,
+and push latency. Poll intervals stay in real seconds, so a day squeezed
+much below the default --duration mostly measures missed closing bids.
+
+Each run is appended to --results with the commit it ran on. The latest
+run is printed next to the previous one with the same settings.
+
+    python bench/replay_day.py --auctions 50 --duration 180 --dashboards 10
+    python bench/replay_day.py --engine asyncio --latency 0.05 --error-rate 0.05
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+CHATTER = ['Is this still available?', 'Beautiful piece!', 'Does it ship to Perth?', 'following', 'wow']
+BID_TEMPLATES = ['{}', '${}', 'bid {}', 'I bid ${}', '{} dollars', 'bid: ${}!']
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def make_schedule(auctions, duration, seed, bidders=300):
+    """Auctions as (post_id, start, end) offsets in seconds, and comments as (offset, post_id, from_id, message, amount)."""
+    rng = random.Random(seed)
+    lots, comments = [], []
+    for i in range(auctions):
+        post_id = f"post{i}"
+        start = rng.uniform(0, duration * 0.4)
+        end = min(start + rng.uniform(duration * 0.3, duration * 0.55), duration * 0.95)
+        lots.append((post_id, start, end))
+        times = []
+        t = start
+        while True:
+            t += rng.expovariate(8 / (end - start))  # About eight bids spread over the auction
+            if t >= end:
+                break
+            times.append(t)
+        closing = end - (end - start) * 0.15
+        times += [rng.uniform(closing, end - 0.5) for _ in range(rng.randint(5, 25))]  # The burst before close
+        amount = rng.randint(1, 20) * 5
+        for t in sorted(times):
+            bidder = rng.randrange(bidders)
+            if rng.random() < 0.15:
+                comments.append((t, post_id, f"user{bidder}", rng.choice(CHATTER), None))
+                continue
+            amount += rng.choice([1, 2, 5, 5, 10, 25])
+            comments.append((t, post_id, f"user{bidder}", rng.choice(BID_TEMPLATES).format(amount), float(amount)))
+    comments.sort()
+    return lots, comments
+
+
+def outside_world(conn, server_options, dashboards, refresh):
+    """Child process: fake Graph, commenters and dashboard clients."""
+    import requests
+    from fake_graph import start_server
+
+    server = start_server(**server_options)
+    conn.send(server.url)
+    app_url, day_start, comments, duration = conn.recv()
+    stop = threading.Event()
+    injected = {}  # (post_id, amount) -> epoch seconds posted
+    dashboard = {'latencies': [], 'not_modified': 0, 'requests': 0, 'push': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def commenters():
+        for offset, post_id, from_id, message, amount in comments:
+            delay = day_start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            server.state.add_comment(post_id, message, from_id, from_id.replace('user', 'User '))
+            if amount is not None:
+                injected[(post_id, amount)] = time.time()
+
+    def dashboard_client(index):
+        session = requests.Session()
+        session.post(f"{app_url}/login", data={'username': 'admin', 'password': 'password123'})
+        etags = {}
+        rng = random.Random(index)
+        time.sleep(rng.uniform(0, refresh))
+        while not stop.is_set():
+            for path in ('/api/auctions?page=1&per_page=50', '/api/auctions/stats'):
+                headers = {'If-None-Match': etags[path]} if path in etags else {}
+                started = time.perf_counter()
+                try:
+                    response = session.get(app_url + path, headers=headers, timeout=10)
+                except requests.RequestException:
+                    with lock:
+                        dashboard['errors'] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                if response.headers.get('ETag'):
+                    etags[path] = response.headers['ETag']
+                with lock:
+                    dashboard['requests'] += 1
+                    dashboard['latencies'].append(elapsed)
+                    dashboard['not_modified'] += response.status_code == 304
+            stop.wait(refresh)
+
+    def push_client():
+        session = requests.Session()
+        session.post(f"{app_url}/login", data={'username': 'admin', 'password': 'password123'})
+        try:
+            with session.get(f"{app_url}/api/events", stream=True, timeout=(5, 30)) as response:
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if stop.is_set():
+                        return
+                    if line.startswith('event: '):
+                        event = line[7:]
+                    elif line.startswith('data: ') and event == 'auction':
+                        with lock:
+                            dashboard['push'].append(time.time() - json.loads(line[6:])['ts'])
+        except requests.RequestException:
+            pass
+
+    threads = [threading.Thread(target=commenters, daemon=True)]
+    for i in range(dashboards):
+        threads.append(threading.Thread(target=dashboard_client, args=(i,), daemon=True))
+        threads.append(threading.Thread(target=push_client, daemon=True))
+    for thread in threads:
+        thread.start()
+    conn.recv()  # The app is done
+    stop.set()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    conn.send({
+        'injected': [(post_id, amount, at) for (post_id, amount), at in injected.items()],
+        'posted': server.state.posted,
+        'requests': server.state.requests,
+        'faults': dict(server.state.faults),
+        'dashboard': dashboard,
+        'cpu': usage.ru_utime + usage.ru_stime,
+    })
+
+
+def current_rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('+dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    lots, comments = make_schedule(args.auctions, args.duration, args.seed)
+    context = multiprocessing.get_context('spawn')
+    conn, child_conn = context.Pipe()
+    server_options = {'latency': args.latency, 'error_rate': args.error_rate, 'throttle_rate': args.throttle_rate,
+                      'comments_per_post': 0, 'seed': args.seed}
+    world = context.Process(target=outside_world, args=(child_conn, server_options, args.dashboards, args.refresh),
+                            daemon=True)
+    world.start()
+    graph_url = conn.recv()
+
+    os.environ.pop('AUCTION_STORE', None)
+    os.environ['GRAPH_API_URL'] = graph_url
+    os.environ['FB_ACCESS_TOKEN'] = 'replay-token'
+    os.environ['MONITOR_MODE'] = 'embedded'
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    manager = app.manager
+    manager.log_writer.stdout = False
+
+    detected = {}  # (post_id, amount) -> epoch seconds the bid was accepted
+    handle_comment = manager.handle_comment
+
+    def timed_handle_comment(post_id, auction, comment, amount=None, source='poll'):
+        accepted = handle_comment(post_id, auction, comment, amount, source)
+        if accepted:
+            detected[(post_id, float(accepted))] = time.time()
+        return accepted
+
+    manager.handle_comment = timed_handle_comment
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    day_start = time.time() + 1
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.start_monitoring(args.engine)
+        auctions = []
+        for post_id, start, end in lots:
+            auction = app.Auction(post_id, datetime.datetime.fromtimestamp(day_start + start).astimezone().isoformat(),
+                                  datetime.datetime.fromtimestamp(day_start + end).astimezone().isoformat(), 0, 'UTC')
+            auctions.append(auction)
+        manager.attach(*auctions)
+        conn.send((f"http://127.0.0.1:{server.server_port}", day_start, comments, args.duration))
+        time.sleep(max(day_start + args.duration + args.grace - time.time(), 0))
+        manager.stop_monitoring()
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    conn.send('done')
+    world_stats = conn.recv()
+    world.join(timeout=10)
+    server.shutdown()
+
+    injected = {(post_id, amount): at for post_id, amount, at in world_stats['injected']}
+    lags = [detected[key] - at for key, at in injected.items() if key in detected]
+    announced = []
+    for post_id, message, at in world_stats['posted']:
+        if message.startswith('New bid:'):
+            amount = float(message.rsplit('$', 1)[1])
+            if (post_id, amount) in detected:
+                announced.append(at - detected[(post_id, amount)])
+    accepted = len(detected)
+    cpu = (usage_after.ru_utime + usage_after.ru_stime) - (usage_before.ru_utime + usage_before.ru_stime)
+    dashboard = world_stats['dashboard']
+    wall = args.duration + args.grace
+    return {
+        'bids_posted': len(injected),
+        'bids_accepted': accepted,
+        'bids_missed': len(injected) - len(lags),
+        'detection_p50': percentile(lags, 0.5),
+        'detection_p95': percentile(lags, 0.95),
+        'detection_max': max(lags, default=None),
+        'announcements': len(announced),
+        'announce_p50': percentile(announced, 0.5),
+        'announce_p95': percentile(announced, 0.95),
+        'graph_requests': world_stats['requests'],
+        'requests_per_bid': world_stats['requests'] / accepted if accepted else None,
+        'graph_faults': world_stats['faults'],
+        'cpu_seconds': cpu,
+        'cpu_percent': cpu / wall * 100,
+        'rss_peak_mb': usage_after.ru_maxrss / 1024,
+        'rss_end_mb': current_rss_mb(),
+        'dashboard_requests': dashboard['requests'],
+        'dashboard_p50_ms': (percentile(dashboard['latencies'], 0.5) or 0) * 1000,
+        'dashboard_p99_ms': (percentile(dashboard['latencies'], 0.99) or 0) * 1000,
+        'dashboard_304_share': dashboard['not_modified'] / dashboard['requests'] if dashboard['requests'] else None,
+        'dashboard_errors': dashboard['errors'],
+        'push_p50_ms': (percentile(dashboard['push'], 0.5) or 0) * 1000,
+        'push_p99_ms': (percentile(dashboard['push'], 0.99) or 0) * 1000,
+        'load_cpu_seconds': world_stats['cpu'],
+    }
+
+
+def fmt(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.3f}" if abs(value) < 100 else f"{value:.0f}"
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=180, help='Real seconds the auction day is compressed into')
+    parser.add_argument('--grace', type=float, default=10, help='Seconds to keep running after the last close')
+    parser.add_argument('--dashboards', type=int, default=10)
+    parser.add_argument('--refresh', type=float, default=2.0, help='Seconds between a dashboard\'s refreshes')
+    parser.add_argument('--engine', choices=['thread', 'asyncio', 'batch'], default='thread')
+    parser.add_argument('--latency', type=float, default=0.02, help='Fake Graph latency per request (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--results', default=os.path.join(BENCH_DIR, 'results', 'replay_day.jsonl'),
+                        help='JSON-lines file each run is appended to')
+    args = parser.parse_args()
+
+    settings = {key: getattr(args, key) for key in ('auctions', 'duration', 'dashboards', 'refresh', 'engine',
+                                                     'latency', 'error_rate', 'throttle_rate', 'seed')}
+    previous = None
+    if os.path.exists(args.results):
+        with open(args.results, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['settings'] == settings:
+                    previous = record
+
+    results = run(args)
+    record = {'commit': git_commit(), 'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+              'settings': settings, 'results': results}
+    os.makedirs(os.path.dirname(args.results), exist_ok=True)
+    with open(args.results, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+    print(f"{'':<22} {'this run':>12} {'previous':>12}")
+    print(f"{'commit':<22} {record['commit'] or '-':>12} {(previous or {}).get('commit') or '-':>12}")
+    for key, value in results.items():
+        if key == 'graph_faults':
+            continue
+        before = previous['results'].get(key) if previous else None
+        print(f"{key:<22} {fmt(value):>12} {fmt(before):>12}")
+    if results['graph_faults']:
+        print(f"{'graph_faults':<22} {results['graph_faults']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Fire recorded (or synthetic) Page feed webhook payloads at /webhook.
+
+Each line of --payloads is one JSON webhook body as Meta delivers it. Without
+a file, synthetic comment payloads are generated for --posts posts. Bodies
+are signed with --app-secret the same way Meta signs them.
+
+    python bench/replay_webhooks.py --url http://127.0.0.1:5000/webhook \\
+        --app-secret "$FB_APP_SECRET" --count 20000 --concurrency 32
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import requests
+
+
+def synthetic_payloads(count, posts, page_id='1000'):
+    for i in range(count):
+        yield {
+            'object': 'page',
+            'entry': [{
+                'id': page_id,
+                'time': int(time.time()),
+                'changes': [{
+                    'field': 'feed',
+                    'value': {
+                        'item': 'comment',
+                        'verb': 'add',
+                        'post_id': f"{page_id}_post{i % posts}",
+                        'comment_id': f"post{i % posts}_c{i}",
+                        'message': f"bid {10 + i}",
+                        'from': {'id': f"user{i % 500}", 'name': f"User {i % 500}"},
+                        'created_time': int(time.time()),
+                    },
+                }],
+            }],
+        }
+
+
+def recorded_payloads(path, count):
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+    for i in range(count):
+        yield json.loads(lines[i % len(lines)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000/webhook')
+    parser.add_argument('--app-secret', required=True)
+    parser.add_argument('--payloads', help='JSON-lines file of recorded webhook bodies')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.payloads:
+        payloads = recorded_payloads(args.payloads, args.count)
+    else:
+        payloads = synthetic_payloads(args.count, args.posts)
+    bodies = []
+    for payload in payloads:
+        body = json.dumps(payload).encode('utf-8')
+        signature = 'sha256=' + hmac.new(args.app_secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        bodies.append((body, signature))
+
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    next_index = [0]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next_index[0]
+                next_index[0] += 1
+            if index >= len(bodies):
+                return
+            body, signature = bodies[index]
+            started = time.perf_counter()
+            try:
+                status = session.post(args.url, data=body, headers={
+                    'Content-Type': 'application/json',
+                    'X-Hub-Signature-256': signature,
+                }).status_code
+            except requests.RequestException:
+                status = 'error'
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Sent {len(bodies)} payloads in {elapsed:.2f}s ({len(bodies) / elapsed:.0f}/s)")
+    print(f"Latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.2f} ms")
+    print(f"Status codes: {statuses}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Replay synthetic bid traces against the poll policies and compare them.
+
+Each auction gets a trace of bid times: a slow background rate, a few
+bidding wars, and a surge in the closing minutes. Polling is simulated on
+a virtual clock: a poll detects every bid placed since the previous one,
+and the gap is that bid's detection lag. Graph usage is modelled as the
+share of --hourly-budget spent in the last hour and fed back to the
+policy the way the X-App-Usage header would be. Bids placed after an
+auction's last poll are reported as missed.
+
+    python bench/sim_polling.py --auctions 200 --hours 72
+"""
+import argparse
+import bisect
+import collections
+import datetime
+import heapq
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import BidColumns  # noqa: E402
+from poll_policy import FixedPollPolicy, PollPolicy  # noqa: E402
+
+CLOSING = 600  # Seconds before end_time reported separately
+
+
+class SimAuction:
+    # Just what the policies read: end_time and the bids seen so far
+    def __init__(self, post_id, start, end):
+        self.post_id = post_id
+        self.start = start
+        self.end = end
+        self.end_time = datetime.datetime.fromtimestamp(end, datetime.timezone.utc)
+        self.bids = BidColumns()
+
+
+def poisson(rng, rate, start, end):
+    times = []
+    t = start
+    while rate > 0:
+        t += rng.expovariate(rate)
+        if t >= end:
+            return times
+        times.append(t)
+    return times
+
+
+def make_traces(count, hours, seed):
+    rng = random.Random(seed)
+    traces = []
+    for i in range(count):
+        start = rng.uniform(0, hours * 3600 / 2)
+        end = start + rng.uniform(1, hours) * 3600
+        bids = poisson(rng, 1 / 3600, start, end)  # About one bid an hour
+        for _ in range(rng.randint(0, 3)):
+            war = rng.uniform(start, end)
+            bids += poisson(rng, 1 / 20, war, min(war + rng.uniform(60, 600), end))
+        bids += poisson(rng, 1 / rng.uniform(15, 90), max(end - CLOSING, start), end)
+        traces.append((SimAuction(f"post{i}", start, end), sorted(bids)))
+    return traces
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def simulate(policy, traces, hourly_budget):
+    for auction, _ in traces:
+        auction.bids = BidColumns()
+    recent = collections.deque()  # Request times in the last hour
+    schedule = [(auction.start, i) for i, (auction, _) in enumerate(traces)]
+    heapq.heapify(schedule)
+    detected = [0] * len(traces)
+    lags, closing_lags = [], []
+    requests = 0
+    peak_usage = 0.0
+    intervals = []
+    while schedule:
+        now, i = heapq.heappop(schedule)
+        auction, bids = traces[i]
+        if now > auction.end:
+            continue
+        requests += 1
+        recent.append(now)
+        while recent[0] < now - 3600:
+            recent.popleft()
+        usage = min(len(recent) / hourly_budget * 100, 100)
+        peak_usage = max(peak_usage, usage)
+        seen = bisect.bisect_right(bids, now)
+        for bid_time in bids[detected[i]:seen]:
+            lags.append(now - bid_time)
+            if bid_time >= auction.end - CLOSING:
+                closing_lags.append(now - bid_time)
+            auction.bids.append('bidder', 'Bidder', 0, bid_time)
+        detected[i] = seen
+        interval = policy.interval(auction, now, usage)
+        intervals.append(interval)
+        heapq.heappush(schedule, (now + interval, i))
+    missed = sum(len(bids) - detected[i] for i, (_, bids) in enumerate(traces))
+    auction_hours = sum(auction.end - auction.start for auction, _ in traces) / 3600
+    return {
+        'requests': requests,
+        'per_auction_hour': requests / auction_hours,
+        'lag_p50': percentile(lags, 0.5),
+        'lag_p95': percentile(lags, 0.95),
+        'closing_p50': percentile(closing_lags, 0.5),
+        'closing_p95': percentile(closing_lags, 0.95),
+        'missed': missed,
+        'peak_usage': peak_usage,
+        'min_interval': min(intervals),
+        'max_interval': max(intervals),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=200)
+    parser.add_argument('--hours', type=float, default=72, help='Longest auction duration')
+    parser.add_argument('--fixed-interval', type=float, default=30)
+    parser.add_argument('--hourly-budget', type=int, default=20000, help='Graph calls per hour treated as 100%% usage')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    traces = make_traces(args.auctions, args.hours, args.seed)
+    total_bids = sum(len(bids) for _, bids in traces)
+    print(f"{args.auctions} auctions, {total_bids} bids, budget {args.hourly_budget} calls/h")
+    print(f"{'policy':<14} {'requests':>9} {'req/auc-h':>9} {'lag p50':>8} {'lag p95':>8} "
+          f"{'close p50':>9} {'close p95':>9} {'missed':>6} {'peak use':>8} {'interval':>13}")
+    for name, policy in (('fixed', FixedPollPolicy(args.fixed_interval)), ('adaptive', PollPolicy())):
+        r = simulate(policy, traces, args.hourly_budget)
+        print(f"{name:<14} {r['requests']:>9} {r['per_auction_hour']:>9.1f} {r['lag_p50']:>7.1f}s {r['lag_p95']:>7.1f}s "
+              f"{r['closing_p50']:>8.1f}s {r['closing_p95']:>8.1f}s {r['missed']:>6} {r['peak_usage']:>7.0f}% "
+              f"{r['min_interval']:>5.0f}-{r['max_interval']:<5.0f}s")
+
+
+if __name__ == '__main__':
+    main()
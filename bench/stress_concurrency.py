@@ -0,0 +1,193 @@
+"""Hammer one manager with concurrent bids, deletes, settings changes and reads.
+
+Bidder threads push rising bids into random auctions through
+handle_comment. A churn thread deletes and re-adds auctions, a settings
+thread keeps switching time zone, and reader threads pull dashboard rows,
+bid history, analytics and exports. The run checks these invariants:
+
+  * no thread raises
+  * every snapshot's current_bid is the last of its first bid_count bids
+    (or the starting bid), and bids strictly increase
+  * snapshot versions never go backwards for a reader
+  * an auction is never read, or bid on, after delete_auction returned
+  * at the end each auction's accepted bids match its bid columns
+
+It exits non-zero on any violation.
+
+    python bench/stress_concurrency.py --seconds 10 --bidders 8 --readers 8
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TIMEZONES = ['UTC', 'Australia/Sydney', 'America/New_York', 'Asia/Tokyo']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--auctions', type=int, default=50)
+    parser.add_argument('--bidders', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.pop('AUCTION_STORE', None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    import analytics
+    import export
+
+    manager = app.FacebookAuctionManager()
+    manager.log_message = lambda message, *args, **kwargs: None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    window = ((now - datetime.timedelta(days=1)).isoformat(), (now + datetime.timedelta(days=1)).isoformat())
+
+    errors = []
+    errors_lock = threading.Lock()
+    deleted = set()  # post_ids whose delete_auction has returned
+    accepted = {}  # Auction -> number of bids handle_comment accepted (keyed by object: ids get reused)
+    counts = {'bids': 0, 'rejected': 0, 'reads': 0, 'deletes': 0, 'settings': 0}
+    read_latencies = []
+    stop = threading.Event()
+    serial = [0]
+
+    def fail(message):
+        with errors_lock:
+            errors.append(message)
+        stop.set()
+
+    def new_auction():
+        with errors_lock:
+            serial[0] += 1
+            post_id = f"post{serial[0]}"
+        auction = app.Auction(post_id, *window, 0, 'UTC')
+        auction.post_to_post = lambda message, kind='info': None
+        auction.notify_outbid = lambda bidder_id, bidder_name: None
+        return auction
+
+    manager.attach(*(new_auction() for _ in range(args.auctions)))
+
+    def guarded(fn):
+        def run():
+            try:
+                fn()
+            except Exception as e:
+                import traceback
+                fail(f"{threading.current_thread().name}: {e!r}\n{traceback.format_exc()}")
+        return run
+
+    def bidder(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            auction = rng.choice(list(manager.auctions.values()))
+            amount = auction.snapshot.current_bid + rng.choice([-1, 1, 1, 2, 5])
+            user = rng.randrange(1000)
+            comment = {'id': f"{seed}-{rng.random()}", 'message': f"bid ${amount}",
+                       'from': {'id': f"user{user}", 'name': f"User {user}"}}
+            was_deleted = auction.post_id in deleted
+            if manager.handle_comment(auction.post_id, auction, comment):
+                if was_deleted:
+                    fail(f"bid accepted on {auction.post_id} after it was deleted")
+                with errors_lock:
+                    accepted[auction] = accepted.get(auction, 0) + 1
+                    counts['bids'] += 1
+            else:
+                with errors_lock:
+                    counts['rejected'] += 1
+
+    def check_snapshot(auction, snapshot, versions):
+        if versions.get(auction, 0) > snapshot.version:
+            fail(f"{auction.post_id} snapshot version went backwards")
+        versions[auction] = snapshot.version
+        _, amount, _ = auction.bids.to_numpy(count=snapshot.bid_count)
+        if len(amount) != snapshot.bid_count:
+            fail(f"{auction.post_id} snapshot has {snapshot.bid_count} bids, columns gave {len(amount)}")
+        expected = amount[-1] if len(amount) else auction.starting_bid
+        if expected != snapshot.current_bid:
+            fail(f"{auction.post_id} current_bid {snapshot.current_bid} != last bid {expected}")
+        if len(amount) > 1 and not (amount[1:] > amount[:-1]).all():
+            fail(f"{auction.post_id} bids are not strictly increasing")
+
+    def reader(seed):
+        rng = random.Random(seed)
+        versions = {}
+        while not stop.is_set():
+            gone = set(deleted)
+            started = time.perf_counter()
+            choice = rng.randrange(4)
+            if choice == 0:
+                rows = manager.get_auctions_data()
+                if gone & {row['post_id'] for row in rows}:
+                    fail(f"deleted auctions still listed: {sorted(gone & {row['post_id'] for row in rows})[:3]}")
+            elif choice == 1:
+                manager.get_bid_history(rng.sample(list(manager.auctions), 3))
+            elif choice == 2:
+                analytics.summarize(rng.sample(list(manager.auctions.values()), 5))
+            else:
+                for _ in export.stream_export('csv', rng.sample(list(manager.auctions.values()), 3)):
+                    pass
+            elapsed = time.perf_counter() - started
+            for auction in rng.sample(list(manager.auctions.values()), 5):
+                check_snapshot(auction, auction.snapshot, versions)
+            with errors_lock:
+                counts['reads'] += 1
+                read_latencies.append(elapsed)
+
+    def churn():
+        rng = random.Random(7)
+        while not stop.is_set():
+            post_id = rng.choice(list(manager.auctions))
+            if manager.delete_auction(post_id)[0]:
+                deleted.add(post_id)
+                counts['deletes'] += 1
+            manager.attach(new_auction())
+            time.sleep(0.002)
+
+    def settings():
+        rng = random.Random(11)
+        while not stop.is_set():
+            manager.apply_settings(rng.choice(TIMEZONES), rng.choice(['%d/%m/%Y %H:%M', '%Y-%m-%d %H:%M']))
+            counts['settings'] += 1
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=guarded(lambda seed=i: bidder(seed)), name=f"bidder-{i}")
+               for i in range(args.bidders)]
+    threads += [threading.Thread(target=guarded(lambda seed=i: reader(seed)), name=f"reader-{i}")
+                for i in range(args.readers)]
+    threads += [threading.Thread(target=guarded(churn), name='churn'),
+                threading.Thread(target=guarded(settings), name='settings')]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        stop.wait(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    for auction in manager.auctions.values():
+        snapshot = auction.snapshot
+        if snapshot.bid_count != accepted.get(auction, 0) or len(auction.bids) != snapshot.bid_count:
+            errors.append(f"{auction.post_id}: {accepted.get(auction, 0)} accepted, "
+                          f"snapshot {snapshot.bid_count}, columns {len(auction.bids)}")
+
+    read_latencies.sort()
+    p99 = read_latencies[int(len(read_latencies) * 0.99)] * 1000 if read_latencies else 0
+    print(f"{counts['bids']} bids accepted ({counts['bids'] / args.seconds:.0f}/s), {counts['rejected']} rejected, "
+          f"{counts['reads']} reads (p99 {p99:.1f} ms), {counts['deletes']} deletes, "
+          f"{counts['settings']} settings changes")
+    for error in errors[:10]:
+        print(f"  FAIL {error}")
+    print('OK' if not errors else f"{len(errors)} failures")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
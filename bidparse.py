@@ -0,0 +1,101 @@
+import os
+import re
+
+DECIMAL_MARK = os.environ.get('BID_DECIMAL_MARK', '.')  # ',' for comma-decimal locales
+
+SUFFIXES = {'k': 1e3, 'grand': 1e3, 'm': 1e6, 'mil': 1e6}
+
+_has_digit = re.compile(r'\d').search
+
+# Quoted replies, "quoted text" and @mentions are someone else's words, not a bid
+_QUOTED = re.compile(r'^\s*>.*$|"[^"\n]*"|\u201c[^\u201d\n]*\u201d|@[\w.]+(?:\s+[A-Z][\w.]*)?', re.M)
+_may_quote = re.compile('[>"\u201c@]').search
+
+_AMOUNT = re.compile(r"""
+    (?P<currency>[$€£¥₹]|\b(?:usd|eur|gbp|cad|aud)\b)?\s?
+    (?<![\w.,'#:/])
+    (?P<number>\d+(?:[.,'\u00a0\u202f]\d+)*)
+    (?:\s?(?P<suffix>k|grand|mil|m)(?![a-z]))?
+    (?P<unit>\s?(?:[$€£¥₹]|(?:usd|eur|gbp|cad|aud|dollars?|bucks|euros?|pounds?)\b))?
+    (?![a-z%\d:/])
+""", re.I | re.X)
+
+_KEYWORD = re.compile(
+    r"(?:\bbid(?:ding|s)?|\boffer(?:ing)?|\bpay(?:ing)?|\braise(?:d)?(?:\s+it)?|\bgo(?:ing)?"
+    r"|\bin\s+at|\bi'?ll\s+do|\bmake\s+it)\s*(?:is\s+|of\s+|to\s+|at\s+|for\s+)?[:=\-]?\s*$",
+    re.I)
+_KEYWORD_WINDOW = 24
+
+
+class BidParser:
+    """Extracts a bid amount from comment text.
+
+    Amounts marked with a currency symbol/code or a k/m suffix win over
+    amounts that follow a bid keyword ("bid 40", "I'll pay 55"); a bare
+    number only counts when it is the only number in the comment, so
+    "2 for $35" bids 35 and "lot 3, 45" is ignored. Thousands separators
+    are recognised from their grouping; ``decimal_mark`` settles the
+    ambiguous single-separator case ("1.250" vs "1,250").
+    """
+
+    def __init__(self, decimal_mark=DECIMAL_MARK):
+        self.decimal_mark = decimal_mark
+
+    def to_number(self, number):
+        groups = re.split(r"[.,'\u00a0\u202f]", number)
+        if len(groups) == 1:
+            return float(number)
+        separators = [number[len(''.join(groups[:i + 1])) + i] for i in range(len(groups) - 1)]
+        fraction = ''
+        if len(groups[-1]) <= 2 or (len(separators) == 1 and separators[0] == self.decimal_mark
+                                    and len(groups[-1]) == 3):
+            # Last separator is the decimal mark; any before it must be a different character
+            fraction = groups.pop()
+            if separators.pop() in separators:
+                return None
+        if groups and separators:
+            if len(set(separators)) != 1 or not 1 <= len(groups[0]) <= 3 or any(len(g) != 3 for g in groups[1:]):
+                return None  # Not a thousands grouping: a date, version, phone number...
+        whole = ''.join(groups)
+        return float(f"{whole}.{fraction}" if fraction else whole)
+
+    def parse(self, text):
+        """Return the bid amount in ``text`` or None."""
+        if not text or not _has_digit(text):
+            return None
+        if _may_quote(text):
+            text = _QUOTED.sub(' ', text)
+            if not _has_digit(text):
+                return None
+        best_rank = -1
+        best = None
+        bare = 0
+        for match in _AMOUNT.finditer(text):
+            amount = self.to_number(match.group('number'))
+            if amount is None:
+                continue
+            suffix = match.group('suffix')
+            if suffix:
+                amount *= SUFFIXES[suffix.lower()]
+            if match.group('currency') or match.group('unit') or suffix:
+                rank = 2
+            elif _KEYWORD.search(text, max(0, match.start() - _KEYWORD_WINDOW), match.start()):
+                rank = 1
+            else:
+                rank = 0
+                bare += 1
+            if rank > best_rank or (rank == best_rank and amount > best):
+                best_rank, best = rank, amount
+        if best is None or best <= 0 or (best_rank == 0 and bare > 1):
+            return None
+        return round(best, 2)
+
+    def parse_many(self, texts):
+        """Parse a list of comment texts in one call; entries without a bid are None."""
+        parse = self.parse
+        return [parse(text) if text and _has_digit(text) else None for text in texts]
+
+
+default = BidParser()
+parse_amount = default.parse
+parse_many = default.parse_many
@@ -0,0 +1,71 @@
+import collections
+import json
+import threading
+import time
+
+
+class EventBus:
+    """In-process fan-out of dashboard events as Server-Sent Events frames.
+
+    Each event is serialized once into a shared ring of recent frames and
+    every open stream reads from that ring at its own position, so
+    publishing costs the same however many dashboards are open. A stream
+    that falls further behind than the ring holds is told to ``resync``
+    (reload the full list) instead of slowing down publishers; reconnecting
+    clients resume from ``Last-Event-ID``.
+    """
+
+    def __init__(self, history=1000):
+        self.condition = threading.Condition()
+        self.history = collections.deque(maxlen=history)  # (seq, frame)
+        self.seq = 0
+        self.subscribers = 0
+        self.resyncs = 0
+
+    def publish(self, event_type, data):
+        payload = json.dumps(dict(data, ts=time.time()))
+        with self.condition:
+            self.seq += 1
+            self.history.append((self.seq, f"id: {self.seq}\nevent: {event_type}\ndata: {payload}\n\n"))
+            self.condition.notify_all()
+
+    def _frames_after(self, position):
+        # Caller holds the condition; returns None when position fell out of the ring
+        if position > self.seq:
+            return None  # An id from before a restart: nothing to resume from
+        if not self.history or position == self.seq:
+            return []
+        if position < self.history[0][0] - 1:
+            return None
+        return [frame for seq, frame in self.history if seq > position]
+
+    def stream(self, last_event_id=None, keepalive=15):
+        """Yield SSE frames for one subscriber until it disconnects."""
+        with self.condition:
+            position = self.seq if last_event_id is None else last_event_id
+            self.subscribers += 1
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                with self.condition:
+                    if position == self.seq:
+                        self.condition.wait(timeout=keepalive)
+                    frames = self._frames_after(position)
+                    if frames is None:
+                        self.resyncs += 1
+                        position = self.seq
+                    elif frames:
+                        position = self.seq
+                if frames is None:
+                    yield 'event: resync\ndata: {}\n\n'
+                elif frames:
+                    yield ''.join(frames)
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            with self.condition:
+                self.subscribers -= 1
+
+    def get_stats(self):
+        with self.condition:
+            return {'subscribers': self.subscribers, 'published': self.seq, 'resyncs': self.resyncs}
@@ -0,0 +1,137 @@
+import csv
+import datetime
+import io
+import json
+import time
+import zlib
+
+import analytics
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow export is only offered when pyarrow is installed
+    pa = None
+
+CHUNK_SIZE = 64 * 1024
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'txt': ('text/plain', 'txt'),
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+CSV_COLUMNS = ['post_id', 'bidder_id', 'bidder_name', 'amount', 'timestamp', 'time']
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'arrow' or pa is not None]
+
+
+def iso_utc(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def bid_rows(auction, start=None, end=None):
+    # One auction's columns at a time, so memory follows the largest auction, not the export
+    bidder, amount, times = auction.bid_columns(start, end)
+    names, ids = analytics.bidders.names, analytics.bidders.ids
+    for idx, value, epoch in zip(bidder.tolist(), amount.tolist(), times.tolist()):
+        yield ids[idx], names[idx], value, epoch
+
+
+def export_txt(auctions, start, end, timezone, date_format):
+    for auction in auctions:
+        yield f"Auction {auction.post_id}:\n"
+        for bidder_id, bidder_name, amount, epoch in bid_rows(auction, start, end):
+            formatted_time = datetime.datetime.fromtimestamp(epoch, timezone).strftime(date_format)
+            yield f"  {formatted_time}: {bidder_name} bid ${amount}\n"
+
+
+def export_csv(auctions, start, end, timezone, date_format):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for auction in auctions:
+        for bidder_id, bidder_name, amount, epoch in bid_rows(auction, start, end):
+            writer.writerow([auction.post_id, bidder_id, bidder_name, amount, epoch, iso_utc(epoch)])
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(auctions, start, end, timezone, date_format):
+    for auction in auctions:
+        for bidder_id, bidder_name, amount, epoch in bid_rows(auction, start, end):
+            yield json.dumps(dict(zip(CSV_COLUMNS, (auction.post_id, bidder_id, bidder_name, amount,
+                                                    epoch, iso_utc(epoch))))) + '\n'
+
+
+def export_arrow(auctions, start, end, timezone, date_format):
+    """Arrow IPC stream, one (zstd-compressed where supported) record batch per auction."""
+    schema = pa.schema([
+        ('post_id', pa.string()),
+        ('bidder_id', pa.string()),
+        ('bidder_name', pa.string()),
+        ('amount', pa.float64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+    ])
+    sink = io.BytesIO()
+    options = pa.ipc.IpcWriteOptions(compression='zstd' if pa.Codec.is_available('zstd') else None)
+    writer = pa.ipc.new_stream(sink, schema, options=options)
+    ids = pa.array(analytics.bidders.ids, pa.string())
+    names = pa.array(analytics.bidders.names, pa.string())
+    for auction in auctions:
+        bidder, amount, times = auction.bid_columns(start, end)
+        if not len(amount):
+            continue
+        indices = pa.array(bidder)
+        writer.write_batch(pa.record_batch([
+            pa.array([auction.post_id] * len(amount), pa.string()),
+            ids.take(indices),
+            names.take(indices),
+            pa.array(amount),
+            pa.array((times * 1e6).astype('int64'), pa.timestamp('us', tz='UTC')),
+        ], schema=schema))
+        # Hand each batch's bytes off and reuse the buffer; messages are 8-byte aligned
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+EXPORTERS = {'txt': export_txt, 'csv': export_csv, 'ndjson': export_ndjson, 'arrow': export_arrow}
+
+
+def batched(chunks, size=CHUNK_SIZE):
+    """Coalesce small string/bytes chunks into writes of about ``size`` bytes."""
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield b''.join(pending)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(fmt, auctions, start=None, end=None, timezone=None, date_format=None, gzip=False):
+    chunks = batched(EXPORTERS[fmt](auctions, start, end, timezone, date_format))
+    return gzipped(chunks) if gzip else chunks
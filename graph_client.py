@@ -0,0 +1,504 @@
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+GRAPH_API_URL = os.environ.get('GRAPH_API_URL', 'https://graph.facebook.com/v19.0')
+MAX_BATCH_SIZE = 50  # Graph API limit per batch request
+CONNECT_TIMEOUT = float(os.environ.get('GRAPH_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('GRAPH_READ_TIMEOUT', 10))
+MAX_RETRIES = int(os.environ.get('GRAPH_MAX_RETRIES', 2))  # Extra attempts after a transient failure
+RATE_LIMIT = float(os.environ.get('GRAPH_RATE_LIMIT', 20))  # Calls per second while usage shows headroom
+BUDGET_WAIT = 2.0  # Longest a call waits for the budget before failing fast
+
+# Graph error codes by what they say about the service
+THROTTLE_CODES = {4, 17, 32, 613} | set(range(80000, 80015))  # App, user, page, custom and business use case limits
+TRANSIENT_CODES = {1, 2}  # Unknown error, service temporarily unavailable
+AUTH_CODES = {102, 190}  # Session or access token invalid; retrying won't help
+POST_CODES = {10, 100, 200}  # About one object (deleted post, missing permission); only that post backs off
+UNAVAILABLE_CODES = {'circuit_open', 'post_backoff', 'budget'}  # GraphUnavailable: refused without sending
+
+GRAPH_LATENCY = metrics.histogram('graph_request_seconds', 'Graph API HTTP request latency', ['method'])
+GRAPH_ERRORS = metrics.counter('graph_api_errors_total', 'Graph API errors by error code or exception', ['code'])
+GRAPH_RETRIES = metrics.counter('graph_retries_total', 'Graph requests retried, by error class', ['reason'])
+GRAPH_REJECTED = metrics.counter('graph_short_circuits_total', 'Graph calls refused without being sent', ['reason'])
+
+
+class GraphError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class GraphUnavailable(GraphError):
+    """Refused locally: a circuit is open, the post is backing off, or the budget is spent."""
+
+
+def classify(code=None, status=None):
+    """Error class of a failed call: throttle, server, auth, post, or None for success."""
+    if code in THROTTLE_CODES or status == 429:
+        return 'throttle'
+    if code in AUTH_CODES:
+        return 'auth'
+    if code in POST_CODES:
+        return 'post'
+    if code in TRANSIENT_CODES or (status or 0) >= 500:
+        return 'server'
+    if code is not None or (status or 200) >= 400:
+        return 'post'  # Anything else is about this request, not the service
+    return None
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    # Full jitter: spreads retries from many callers instead of synchronising them
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Request budget refilled at ``rate`` per second, scaled down as Graph usage rises.
+
+    ``set_usage`` takes the percentage from the usage headers: above
+    ``soft`` the refill rate falls towards 5% of ``rate`` at 100, and an
+    estimated time to regain access empties the bucket until then.
+    """
+
+    def __init__(self, rate, burst=None, soft=75, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or rate * 2
+        self.soft = soft
+        self.clock = clock
+        self.tokens = self.burst
+        self.scale = 1.0
+        self.paused_until = 0
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def set_usage(self, usage, regain_in=0):
+        with self.lock:
+            self._refill(self.clock())
+            self.scale = 1.0 if usage <= self.soft else max((100 - usage) / (100 - self.soft), 0.05)
+            if regain_in:
+                self.pause(regain_in)
+
+    def pause(self, seconds):
+        # Caller holds the lock
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate * self.scale)
+        self.updated = now
+
+    def take(self, count=1):
+        """Spend ``count`` tokens if there are enough; otherwise return seconds until there will be."""
+        with self.lock:
+            now = self.clock()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self._refill(now)
+            count = min(count, self.burst)
+            if self.tokens >= count:
+                self.tokens -= count
+                return 0
+            return (count - self.tokens) / (self.rate * self.scale)
+
+    def acquire(self, count=1, max_wait=BUDGET_WAIT):
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.take(count)
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def get_stats(self):
+        with self.lock:
+            self._refill(self.clock())
+            return {'tokens': round(self.tokens, 1), 'rate': round(self.rate * self.scale, 2),
+                    'paused_for': round(max(self.paused_until - self.clock(), 0), 1)}
+
+
+class CircuitBreaker:
+    """Stops calls after ``threshold`` failures in a row of one error class.
+
+    Open for ``cooldown`` seconds, then one probe goes through (half-open):
+    success closes the circuit, failure reopens it for twice as long, up to
+    ``max_cooldown``.
+    """
+
+    def __init__(self, name, threshold=5, cooldown=30, max_cooldown=600, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_until = 0
+        self.probing = None  # When the half-open probe was let through
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            now = self.clock()
+            if self.state == 'open' and now >= self.opened_until:
+                self.state = 'half_open'
+                self.probing = None
+            # A probe that ended without a verdict for this class (another class failed) gets replaced
+            if self.state == 'half_open' and (self.probing is None or now - self.probing > self.base_cooldown):
+                self.probing = now
+                return True
+            return False
+
+    def retry_in(self):
+        return max(self.opened_until - self.clock(), 0) if self.state != 'closed' else 0
+
+    def success(self):
+        with self.lock:
+            if self.state != 'open':  # A call admitted before the circuit opened says nothing about now
+                self.state = 'closed'
+                self.failures = 0
+                self.cooldown = self.base_cooldown
+                self.probing = None
+
+    def failure(self, cooldown=None):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.failures < self.threshold or self.state == 'open':
+                return
+            self.state = 'open'
+            self.probing = None
+            self.opened += 1
+            self.opened_until = self.clock() + max(cooldown or 0, self.cooldown)
+
+    def get_stats(self):
+        with self.lock:
+            return {'state': self.state, 'failures': self.failures, 'opened': self.opened,
+                    'retry_in': round(self.retry_in(), 1)}
+
+
+class PostBackoff:
+    """Per-post exponential backoff, so one broken post can't trip the shared circuits."""
+
+    def __init__(self, base=5, cap=900, clock=time.monotonic):
+        self.base = base
+        self.cap = cap
+        self.clock = clock
+        self.posts = {}  # key -> (consecutive failures, blocked until)
+        self.lock = threading.Lock()
+
+    def blocked_for(self, key):
+        entry = self.posts.get(key)
+        return max(entry[1] - self.clock(), 0) if entry else 0
+
+    def failure(self, key):
+        with self.lock:
+            failures = self.posts.get(key, (0, 0))[0] + 1
+            delay = min(self.base * 2 ** (failures - 1), self.cap)
+            self.posts[key] = (failures, self.clock() + random.uniform(delay / 2, delay))
+
+    def success(self, key):
+        if key in self.posts:
+            with self.lock:
+                self.posts.pop(key, None)
+
+    def get_stats(self):
+        with self.lock:
+            now = self.clock()
+            return {key: {'failures': failures, 'blocked_for': round(max(until - now, 0), 1)}
+                    for key, (failures, until) in self.posts.items()}
+
+
+class BatchItem:
+    """One request inside a Graph batch; ``result`` is filled in after sending."""
+
+    def __init__(self, method, path, params=None, key=None):
+        self.method = method
+        self.path = path.lstrip('/')
+        self.params = params or {}
+        self.key = key
+        self.result = None
+
+    def error(self):
+        """The item's failure as a GraphError (GraphUnavailable if it was never sent), or None."""
+        error = self.result.get('error') if isinstance(self.result, dict) else None
+        if not isinstance(error, dict):
+            return None
+        cls = GraphUnavailable if error.get('code') in UNAVAILABLE_CODES else GraphError
+        return cls(error.get('message', 'Unknown Graph error'), error.get('code'))
+
+    def to_dict(self):
+        if self.method == 'GET':
+            query = urlencode(self.params)
+            return {'method': 'GET', 'relative_url': f"{self.path}?{query}" if query else self.path}
+        return {'method': self.method, 'relative_url': self.path, 'body': urlencode(self.params)}
+
+
+class GraphClient:
+    """Graph API client sharing one pooled keep-alive session across callers.
+
+    Every call has connect/read timeouts and spends from a token bucket
+    that follows the usage headers. Transient failures (5xx, Graph codes
+    1/2, timeouts on reads) are retried with jittered exponential backoff.
+    Repeated failures of one class (throttle, server, transport, auth)
+    open that class's circuit and calls fail fast with GraphUnavailable
+    until it recovers. Errors about a single object only back off that
+    post. API errors still come back as ``{'error': {...}}`` bodies.
+    """
+
+    def __init__(self, access_token, base_url=None, pool_size=20, rate=RATE_LIMIT, retries=MAX_RETRIES,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.access_token = access_token
+        self.base_url = (base_url or GRAPH_API_URL).rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.retries = retries
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.usage = 0  # Highest call/CPU/time percentage from the last usage headers
+        self.regain_at = 0  # Epoch seconds when a throttled business use case gets access back
+        self.usage_updated = None
+        self.budget = TokenBucket(rate)
+        self.breakers = {
+            'throttle': CircuitBreaker('throttle', threshold=1, cooldown=60),
+            'server': CircuitBreaker('server', threshold=5, cooldown=15),
+            'transport': CircuitBreaker('transport', threshold=5, cooldown=15),
+            'auth': CircuitBreaker('auth', threshold=1, cooldown=300, max_cooldown=3600),
+        }
+        self.posts = PostBackoff()
+
+    def record_usage(self, headers):
+        """Track rate-limit headroom from X-App-Usage / X-Business-Use-Case-Usage."""
+        usage = []
+        regain = 0
+        app_usage = headers.get('X-App-Usage')
+        if app_usage:
+            try:
+                usage.extend(json.loads(app_usage).values())
+            except (ValueError, AttributeError):
+                pass
+        buc_usage = headers.get('X-Business-Use-Case-Usage')
+        if buc_usage:
+            try:
+                for entries in json.loads(buc_usage).values():
+                    for entry in entries:
+                        usage.extend(entry.get(key, 0) for key in ('call_count', 'total_cputime', 'total_time'))
+                        regain = max(regain, entry.get('estimated_time_to_regain_access', 0) * 60)
+            except (ValueError, AttributeError, TypeError):
+                pass
+        if app_usage or buc_usage:
+            now = time.time()
+            self.usage = max([value for value in usage if isinstance(value, (int, float))], default=0)
+            self.regain_at = now + regain if regain else 0
+            self.usage_updated = now
+            self.budget.set_usage(self.usage, regain)
+
+    def regain_in(self):
+        return max(self.regain_at - time.time(), 0)
+
+    def get(self, path, params=None, timeout=None):
+        return self.request('GET', path, params, timeout)
+
+    def post(self, path, params=None, timeout=None):
+        return self.request('POST', path, params, timeout)
+
+    def check(self, key=None):
+        """Raise GraphUnavailable if a call for ``key`` should not be sent now."""
+        for name, breaker in self.breakers.items():
+            if not breaker.allow():
+                GRAPH_REJECTED.inc(reason=name)
+                raise GraphUnavailable(f"Graph {name} circuit open, retry in {breaker.retry_in():.0f}s",
+                                       'circuit_open')
+        if key is not None and self.posts.blocked_for(key):
+            GRAPH_REJECTED.inc(reason='post')
+            raise GraphUnavailable(f"{key} backing off for {self.posts.blocked_for(key):.0f}s", 'post_backoff')
+
+    def spend(self, count=1):
+        if not self.budget.acquire(count):
+            GRAPH_REJECTED.inc(reason='budget')
+            raise GraphUnavailable('Graph request budget exhausted', 'budget')
+
+    def timeouts(self, deadline):
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+        remaining = max(deadline - time.monotonic(), 0.001)
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def request(self, method, path, params=None, timeout=None):
+        """Send one call with retries; ``timeout`` bounds all attempts together."""
+        path = path.lstrip('/')
+        key = path.split('/')[0]  # The post a comments call is about
+        params = dict(params or {}, access_token=self.access_token)
+        url = f"{self.base_url}/{path}"
+        deadline = time.monotonic() + timeout if timeout else None
+        self.check(key)
+        for attempt in range(self.retries + 1):
+            self.spend()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.timeouts(deadline),
+                                                **({'params': params} if method == 'GET' else {'data': params}))
+                body = response.json()
+            except (requests.RequestException, ValueError) as e:
+                GRAPH_ERRORS.inc(code=type(e).__name__)
+                self.breakers['transport'].failure()
+                # A POST that may have reached Graph is not repeated: it would comment twice
+                if (method == 'GET' or isinstance(e, requests.ConnectTimeout)) and self.can_retry(attempt, deadline):
+                    GRAPH_RETRIES.inc(reason='transport')
+                    continue
+                raise
+            finally:
+                GRAPH_LATENCY.observe(time.perf_counter() - started, method=method)
+            self.record_usage(response.headers)
+            error_class = self.record_result(key, body, response.status_code)
+            if error_class == 'server' and self.can_retry(attempt, deadline):
+                GRAPH_RETRIES.inc(reason='server')
+                continue
+            return body
+
+    def can_retry(self, attempt, deadline):
+        # Sleeps the backoff if another attempt fits before the deadline and the circuits allow it
+        if attempt >= self.retries:
+            return False
+        delay = backoff_delay(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return all(breaker.state == 'closed' for breaker in self.breakers.values())
+
+    def record_result(self, key, body, status=200):
+        """Feed one response into the circuits and post backoff; returns its error class."""
+        error = body.get('error') if isinstance(body, dict) else None
+        if not isinstance(error, dict):
+            error = None
+        error_class = classify(error.get('code') if error else None, status)
+        if error:
+            GRAPH_ERRORS.inc(code=str(error.get('code')))
+        # Any response at all clears every class except the one it failed with
+        for name, breaker in self.breakers.items():
+            if name != error_class:
+                breaker.success()
+        if error_class is None:
+            if key is not None:
+                self.posts.success(key)
+        elif error_class == 'post':
+            if key is not None:
+                self.posts.failure(key)
+        else:
+            self.breakers[error_class].failure(self.regain_in() if error_class == 'throttle' else None)
+            if error_class == 'throttle':
+                with self.budget.lock:
+                    self.budget.pause(max(self.regain_in(), 1))
+        return error_class
+
+    def batch(self, items, timeout=None):
+        """Send items in chunks of 50 and set each item's ``result``.
+
+        A result is the decoded body, or ``{'error': {...}}`` for that item
+        alone; a failed chunk marks only its own items as failed.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        for start in range(0, len(items), MAX_BATCH_SIZE):
+            chunk = []
+            for item in items[start:start + MAX_BATCH_SIZE]:
+                try:
+                    self.check(item.key)
+                    chunk.append(item)
+                except GraphUnavailable as e:
+                    item.result = {'error': {'message': str(e), 'code': e.code}}
+            if chunk:
+                self._send_chunk(chunk, deadline)
+        return items
+
+    def _send_chunk(self, chunk, deadline):
+        # Graph counts each item in a batch against the rate limits
+        retryable = all(item.method == 'GET' for item in chunk)
+        for attempt in range(self.retries + 1):
+            try:
+                self.spend(len(chunk))
+            except GraphUnavailable as e:
+                for item in chunk:
+                    item.result = {'error': {'message': str(e), 'code': e.code}}
+                return
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.base_url + '/', data={
+                    'access_token': self.access_token,
+                    'batch': json.dumps([item.to_dict() for item in chunk]),
+                    'include_headers': 'false',
+                }, timeout=self.timeouts(deadline))
+                responses = response.json()
+            except (requests.RequestException, ValueError) as e:
+                GRAPH_ERRORS.inc(code=type(e).__name__)
+                self.breakers['transport'].failure()
+                if (retryable or isinstance(e, requests.ConnectTimeout)) and self.can_retry(attempt, deadline):
+                    GRAPH_RETRIES.inc(reason='transport')
+                    continue
+                for item in chunk:
+                    item.result = {'error': {'message': str(e), 'code': None}}
+                return
+            finally:
+                GRAPH_LATENCY.observe(time.perf_counter() - started, method='batch')
+            self.record_usage(response.headers)
+            if isinstance(responses, dict):
+                error_class = self.record_result(None, responses, response.status_code)
+                if error_class == 'server' and retryable and self.can_retry(attempt, deadline):
+                    GRAPH_RETRIES.inc(reason='server')
+                    continue
+                for item in chunk:
+                    item.result = responses if 'error' in responses else {'error': {'message': 'Bad batch response'}}
+                return
+            for item, entry in zip(chunk, responses):
+                item.result = self._decode_entry(entry)
+                self.record_result(item.key, item.result, entry.get('code', 200) if entry else 504)
+            return
+
+    def get_stats(self):
+        return {
+            'usage': self.usage,
+            'budget': self.budget.get_stats(),
+            'circuits': {name: breaker.get_stats() for name, breaker in self.breakers.items()},
+            'posts_backing_off': self.posts.get_stats(),
+        }
+
+    @staticmethod
+    def _decode_entry(entry):
+        if entry is None:
+            return {'error': {'message': 'Batch item timed out', 'code': None}}
+        try:
+            body = json.loads(entry.get('body') or '{}')
+        except ValueError:
+            body = {}
+        if entry.get('code') != 200 and 'error' not in body:
+            body = {'error': {'message': f"HTTP {entry.get('code')}", 'code': entry.get('code')}}
+        return body
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(access_token):
+    """Return the shared client for a token so every caller reuses its pool."""
+    with _clients_lock:
+        client = _clients.get(access_token)
+        if client is None:
+            client = _clients[access_token] = GraphClient(access_token)
+        return client
@@ -0,0 +1,85 @@
+"""Reading auction rows for bulk creation from JSON, CSV or NDJSON.
+
+Readers yield ``(row, fields, error)``: the 1-based data row, a dict of
+``POST /api/auctions`` fields, and None, or None and a message when the
+row itself could not be read. A bad row never stops the rows after it;
+only a CSV without the required header columns is rejected as a whole.
+"""
+import csv
+import io
+import json
+
+# format -> mimetype
+IMPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+FIELDS = ('post_id', 'start_time', 'end_time', 'starting_bid', 'timezone', 'page_id')
+REQUIRED = ('post_id', 'start_time', 'end_time')
+
+
+def detect_format(filename=None, mimetype=None):
+    """Format from the file extension, then the mimetype; None if neither says."""
+    extension = (filename or '').rsplit('.', 1)[-1].lower() if filename and '.' in filename else None
+    if extension in IMPORT_FORMATS:
+        return extension
+    if extension == 'jsonl':
+        return 'ndjson'
+    for fmt, known in IMPORT_FORMATS.items():
+        if mimetype == known:
+            return fmt
+    return None
+
+
+def read_json(items):
+    for row, item in enumerate(items, 1):
+        if isinstance(item, dict):
+            yield row, item, None
+        else:
+            yield row, None, 'Expected an object with auction fields'
+
+
+def read_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    columns = [name.strip() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED if name not in columns]
+    if missing:
+        raise ValueError(f"CSV header is missing {', '.join(missing)}")
+    reader.fieldnames = columns
+    for row, record in enumerate(reader, 1):
+        if None in record:
+            yield row, None, f"{len(record[None])} more values than header columns"
+            continue
+        yield row, {name: value.strip() for name, value in record.items() if value is not None}, None
+
+
+def read_ndjson(text):
+    row = 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {str(e)}"
+            continue
+        if isinstance(item, dict):
+            yield row, item, None
+        else:
+            yield row, None, 'Expected an object with auction fields'
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def read_rows(fmt, text):
+    return READERS[fmt](text)
+
+
+def limit(rows, max_rows):
+    """Pass rows through, raising ValueError past ``max_rows`` before anything is created."""
+    for count, row in enumerate(rows, 1):
+        if count > max_rows:
+            raise ValueError(f"At most {max_rows} auctions per import")
+        yield row
@@ -0,0 +1,158 @@
+"""Structured in-memory log with incremental reads and a non-blocking writer.
+
+Records go into a fixed-size ring indexed by sequence number, so appending
+never shifts anything and a reader that remembers the last ``seq`` it saw
+gets just the newer records (``since``) or waits for them (``stream``).
+Printing happens on a background thread (``LogWriter``) so a slow
+terminal or disk never holds up the thread that logged.
+"""
+import collections
+import json
+import sys
+import threading
+
+LEVELS = ('debug', 'info', 'warning', 'error')
+
+
+class LogRecord(collections.namedtuple('LogRecord', ['seq', 'time', 'level', 'event', 'post_id', 'message'])):
+    __slots__ = ()
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class LogRing:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.slots = [None] * capacity  # Record with sequence number s lives in slots[s % capacity]
+        self.seq = 0
+        self.condition = threading.Condition()
+        self.subscribers = 0
+
+    def append(self, time, level, event, post_id, message):
+        with self.condition:
+            self.seq += 1
+            record = LogRecord(self.seq, time, level, event, post_id, message)
+            self.slots[self.seq % self.capacity] = record
+            self.condition.notify_all()
+        return record
+
+    def _after(self, seq, limit):
+        # Caller holds the condition; returns (records, seq of the last one, how many were overwritten)
+        if seq > self.seq:
+            seq = 0  # A position from before a restart: start over
+        oldest = max(self.seq - self.capacity + 1, 1)
+        first = max(seq + 1, oldest)
+        last = min(self.seq, first + limit - 1)
+        return [self.slots[s % self.capacity] for s in range(first, last + 1)], max(last, seq), max(oldest - seq - 1, 0)
+
+    def since(self, seq=None, limit=100, level=None, post_id=None):
+        """Records after ``seq`` (the last ``limit`` when None), oldest first.
+
+        Returns ``(records, next_seq, missed)``: pass ``next_seq`` back to
+        continue, and ``missed`` counts records that were overwritten before
+        this reader got to them. Filters apply after the limit, so a reader
+        always advances.
+        """
+        with self.condition:
+            if seq is None:
+                seq = max(self.seq - limit, 0)
+            records, next_seq, missed = self._after(seq, limit)
+        return [r for r in records if matches(r, level, post_id)], next_seq, missed
+
+    def stream(self, seq=None, level=None, post_id=None, keepalive=15, batch=500):
+        """Yield SSE frames for each new record until the client disconnects."""
+        with self.condition:
+            position = self.seq if seq is None else seq
+            self.subscribers += 1
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                with self.condition:
+                    if position >= self.seq:
+                        self.condition.wait(timeout=keepalive)
+                    records, position, missed = self._after(position, batch)
+                frames = []
+                if missed:
+                    frames.append(f"event: gap\ndata: {json.dumps({'missed': missed})}\n\n")
+                frames.extend(f"id: {r.seq}\nevent: log\ndata: {json.dumps(r.to_dict())}\n\n"
+                              for r in records if matches(r, level, post_id))
+                yield ''.join(frames) or ': keepalive\n\n'
+        finally:
+            with self.condition:
+                self.subscribers -= 1
+
+    def get_stats(self):
+        with self.condition:
+            return {'seq': self.seq, 'capacity': self.capacity, 'subscribers': self.subscribers}
+
+
+def matches(record, level=None, post_id=None):
+    if level is not None and LEVELS.index(record.level) < LEVELS.index(level):
+        return False
+    return post_id is None or record.post_id == post_id
+
+
+class LogWriter:
+    """Prints records to stdout and/or a file from a daemon thread.
+
+    ``write`` only appends to a bounded queue; when the output can't keep
+    up, new lines are dropped and counted rather than blocking the caller.
+    ``format_line`` runs on the writer thread too.
+    """
+
+    def __init__(self, format_line, path=None, stdout=True, capacity=10000):
+        self.format_line = format_line
+        self.path = path
+        self.stdout = stdout
+        self.capacity = capacity
+        self.pending = collections.deque()
+        self.dropped = 0
+        self.written = 0
+        self.wakeup = threading.Event()
+        self.output_lock = threading.Lock()  # flush() and the thread never interleave
+        self.file = None
+        self.thread = None
+
+    def write(self, record):
+        if len(self.pending) >= self.capacity:
+            self.dropped += 1
+            return
+        self.pending.append(record)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True, name='log-writer')
+            self.thread.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.output_lock:
+            lines = []
+            while self.pending:
+                lines.append(self.format_line(self.pending.popleft()))
+            if self.dropped:
+                lines.append(f"... {self.dropped} log lines dropped, output too slow")
+                self.dropped = 0
+            if not lines:
+                return
+            text = '\n'.join(lines) + '\n'
+            try:
+                if self.stdout:
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+                if self.path:
+                    if self.file is None:
+                        self.file = open(self.path, 'a', encoding='utf-8')
+                    self.file.write(text)
+                    self.file.flush()
+            except Exception as e:
+                print(f"Error writing logs: {str(e)}", file=sys.stderr)
+            self.written += len(lines)
+
+    def get_stats(self):
+        return {'pending': len(self.pending), 'dropped': self.dropped, 'written': self.written}
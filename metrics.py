@@ -0,0 +1,176 @@
+"""Counters, histograms and gauges rendered in the Prometheus text format.
+
+Metrics are created at import time by the module that updates them
+(``GRAPH_LATENCY = metrics.histogram(...)``) and all land in one registry,
+which ``/metrics`` renders. Updates take a per-metric lock for a few
+dictionary operations, so they are cheap enough for the bid path.
+"""
+import bisect
+import threading
+import time
+
+# Seconds, from a fast local call up to a Graph timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Seconds from a comment being posted to the bid being seen
+LAG_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(labels.get(name, '') for name in self.labels), 0)
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            yield f"{self.name}{_label_text(self.labels, key)} {_number(value)}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        series = self.series.get(tuple(labels.get(name, '') for name in self.labels))
+        return series[-1] if series else 0
+
+    def samples(self):
+        with self.lock:
+            series = sorted((key, list(values)) for key, values in self.series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield f"{self.name}_bucket{_label_text(self.labels, key, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_label_text(self.labels, key, [('le', '+Inf')])} {values[-1]}"
+            yield f"{self.name}_sum{_label_text(self.labels, key)} {_number(values[-2])}"
+            yield f"{self.name}_count{_label_text(self.labels, key)} {values[-1]}"
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Gauge:
+    """A value read at scrape time from ``fn``, which returns a number or {label value: number}."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, fn, label=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        if self.label is None:
+            yield f"{self.name} {_number(value)}"
+            return
+        for key, number in sorted(value.items()):
+            yield f"{self.name}{_label_text([self.label], [key])} {_number(number)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        # Returns the metric already registered under the name, so re-imports share it
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def replace(self, metric):
+        # Gauges read the current objects, so a new manager replaces the old one's
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def gauge(name, help, fn, label=None):
+    return REGISTRY.replace(Gauge(name, help, fn, label))
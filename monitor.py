@@ -0,0 +1,62 @@
+"""Dedicated monitor process for multi-worker deployments.
+
+Run one or more of these next to ``gunicorn -w N app:app`` with
+``MONITOR_MODE=web`` and a shared ``AUCTION_STORE=sqlite:...``. A lease in the
+store makes sure only one of them polls and announces at a time; the others
+wait to take over if the leader stops renewing.
+"""
+import os
+import signal
+import socket
+import sys
+import time
+
+os.environ['MONITOR_MODE'] = 'monitor'  # Even when the shared environment says 'web'
+
+from app import manager  # noqa: E402
+
+LEASE_NAME = 'monitor'
+LEASE_TTL = 30  # Seconds a leader keeps the lease without renewing
+TICK = 5  # Seconds between lease renewals and control checks
+
+
+def run():
+    store = manager.store
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+    leader = False
+    try:
+        while True:
+            if store.acquire_lease(LEASE_NAME, holder, LEASE_TTL):
+                if not leader:
+                    leader = True
+                    manager.log_message(f"Monitor lease acquired by {holder}", event='lease')
+                    manager.sync_from_store(refresh=True, full=True)  # Take over the last leader's bids and lifecycle state
+                    manager.start_lifecycle()
+                    manager.webhooks.follow_store(store)
+                manager.sync_from_store(refresh=False)
+                wanted = store.get_setting('monitoring') == '1'
+                engine = store.get_setting('poll_engine', manager.poll_engine)
+                if manager.monitoring and (not wanted or engine != manager.poll_engine):
+                    manager.stop_monitoring()
+                    for thread in manager.monitor_threads():
+                        thread.join()
+                if wanted and not manager.monitoring:
+                    manager.start_monitoring(engine)
+            elif leader:
+                leader = False
+                manager.log_message(f"Monitor lease lost by {holder}", level='warning', event='lease')
+                manager.webhooks.draining = False
+                if manager.monitoring:
+                    manager.stop_monitoring()
+                manager.stop_lifecycle()
+            time.sleep(TICK)
+    finally:
+        if manager.monitoring:
+            manager.stop_monitoring()
+        store.release_lease(LEASE_NAME, holder)
+
+
+if __name__ == '__main__':
+    # Let the finally block release the lease when the platform stops us
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    run()
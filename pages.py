@@ -0,0 +1,91 @@
+"""Facebook Pages this deployment runs auctions for, and their access tokens.
+
+Graph rate-limits each Page token on its own, so everything that talks to
+Graph for an auction goes through the auction's Page: ``client(page_id)``
+is that token's shared GraphClient, with its own request budget and
+circuits, and the manager gives each Page a ``PageWorkers`` group (poll
+thread plus announcement workers). A throttled Page then only waits on
+itself.
+
+Tokens are read once, from ``FB_ACCESS_TOKEN`` for auctions without a Page
+and from ``FB_PAGE_TOKENS`` for the rest, given either as a JSON object
+(``{"<page id>": "<token>"}``) or as comma-separated ``<page id>:<token>``
+pairs.
+"""
+import json
+import os
+import threading
+
+from announcer import AnnouncementQueue
+from graph_client import get_client
+
+DEFAULT_PAGE = 'default'  # Auctions created without a Page use FB_ACCESS_TOKEN
+
+
+def parse_page_tokens(spec):
+    if not spec or not spec.strip():
+        return {}
+    spec = spec.strip()
+    if spec.startswith('{'):
+        return {str(page_id): token for page_id, token in json.loads(spec).items()}
+    tokens = {}
+    for pair in spec.split(','):
+        page_id, _, token = pair.strip().partition(':')
+        if not page_id or not token:
+            raise ValueError(f"FB_PAGE_TOKENS entries look like <page id>:<token>, got {pair.strip()!r}")
+        tokens[page_id] = token
+    return tokens
+
+
+class TokenRegistry:
+    """Page id -> access token; replaced on register, never mutated, so lookups take no lock."""
+
+    def __init__(self, default_token=None, page_tokens=None):
+        self.lock = threading.Lock()
+        self.tokens = {DEFAULT_PAGE: default_token} if default_token else {}
+        self.tokens.update(page_tokens or {})
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('FB_ACCESS_TOKEN'), parse_page_tokens(os.environ.get('FB_PAGE_TOKENS')))
+
+    def register(self, page_id, token):
+        with self.lock:
+            self.tokens = dict(self.tokens, **{page_id: token})
+
+    def token(self, page_id=None):
+        return self.tokens.get(page_id or DEFAULT_PAGE)
+
+    def client(self, page_id=None):
+        """The Page's shared GraphClient, or None if it has no token."""
+        token = self.token(page_id)
+        return get_client(token) if token else None
+
+    def pages(self):
+        return list(self.tokens)
+
+    def page_for_post(self, post_id):
+        # Page posts are named {page_id}_{post_id}; use that Page when we hold its token
+        page_id, sep, _ = (post_id or '').partition('_')
+        return page_id if sep and page_id in self.tokens else None
+
+    def usage(self):
+        return {page_id: get_client(token).usage for page_id, token in self.tokens.items()}
+
+    def get_stats(self):
+        return {page_id: get_client(token).get_stats() for page_id, token in self.tokens.items()}
+
+
+class PageWorkers:
+    """One Page's share of the monitor: its live auctions, poll thread and announcement workers."""
+
+    def __init__(self, page_id, send, send_batch=None, log=None, announce_workers=4):
+        self.page_id = page_id
+        self.live = {}  # post_id -> Auction of this Page between its start and end edges
+        suffix = '' if page_id == DEFAULT_PAGE else f"-{page_id}"
+        self.announcements = AnnouncementQueue(
+            lambda post_id, message: send(post_id, message, page_id), workers=announce_workers,
+            name=f"announcer{suffix}", log=log,
+            send_batch=(lambda comments: send_batch(comments, page_id)) if send_batch else None)
+        self.thread_name = f"monitor{suffix}"
+        self.thread = None
@@ -0,0 +1,56 @@
+import bisect
+
+
+class PollPolicy:
+    """Chooses how long to wait before polling an auction again.
+
+    The interval shrinks as ``end_time`` approaches (about 1/30 of the time
+    left) and with the bids seen in the last ``rate_window`` seconds, and
+    grows when the Graph API usage reported in the X-App-Usage /
+    X-Business-Use-Case-Usage headers gets close to the limit. Closing
+    minutes are kept at or under ``closing_interval`` unless usage is
+    critical.
+    """
+
+    def __init__(self, min_interval=3, max_interval=120, closing_window=600, closing_interval=8,
+                 rate_window=600, usage_soft=60, usage_hard=90):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closing_window = closing_window
+        self.closing_interval = closing_interval
+        self.rate_window = rate_window
+        self.usage_soft = usage_soft
+        self.usage_hard = usage_hard
+
+    def recent_bids(self, auction, now):
+        times = auction.bids.time  # Appended in time order
+        return len(times) - bisect.bisect_left(times, now - self.rate_window)
+
+    def interval(self, auction, now, usage=0, regain_in=0):
+        """Seconds until the next poll; ``now`` is epoch seconds, ``usage`` a 0-100 percentage."""
+        remaining = auction.end_time.timestamp() - now
+        interval = min(max(remaining / 30, self.min_interval), self.max_interval)
+        bids = self.recent_bids(auction, now)
+        if bids:
+            # A bidding war: aim for roughly two polls per bid at the recent rate
+            interval = min(interval, max(self.rate_window / bids / 2, self.min_interval))
+        if remaining <= self.closing_window:
+            interval = min(interval, self.closing_interval)
+        if usage >= self.usage_hard:
+            interval = max(interval * 4, self.closing_interval)
+        elif usage > self.usage_soft:
+            interval *= 1 + 3 * (usage - self.usage_soft) / (self.usage_hard - self.usage_soft)
+        if regain_in:
+            interval = max(interval, regain_in)  # Throttled: polling sooner only gets rejected
+        # Never wait past the close by more than a closing-window poll would
+        return max(min(interval, self.max_interval, max(remaining, 0) + self.min_interval), self.min_interval)
+
+
+class FixedPollPolicy:
+    """Every auction polled every ``interval`` seconds (the old behaviour)."""
+
+    def __init__(self, interval):
+        self.fixed = interval
+
+    def interval(self, auction, now, usage=0, regain_in=0):
+        return max(self.fixed, regain_in)
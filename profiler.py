@@ -0,0 +1,96 @@
+"""Sampling profiler for one thread, switched on and off while the app runs.
+
+A daemon thread reads the target thread's current frame through
+``sys._current_frames()`` every ``interval`` seconds and counts the
+stacks it sees. Nothing is hooked into the profiled thread itself, so it
+costs the monitor nothing beyond the GIL hand-off. ``collapsed()`` gives
+``func;func;func count`` lines that flamegraph.pl and speedscope read.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.target = None
+        self.interval = 0.01
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+
+    def start(self, target, interval=0.01, duration=None):
+        """Sample ``target`` (a Thread) until stop(), or for ``duration`` seconds."""
+        with self.lock:
+            if self.running:
+                return False
+            self.running = True
+            self.target = target
+            self.interval = interval
+            self.stacks = collections.Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+        self.thread = threading.Thread(target=self._run, args=(duration,), daemon=True, name='profiler')
+        self.thread.start()
+        return True
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return False
+            self.running = False
+            self.stopped_at = time.time()
+        return True
+
+    def _run(self, duration):
+        deadline = time.monotonic() + duration if duration else None
+        while self.running:
+            frame = sys._current_frames().get(self.target.ident)
+            if frame is None:  # The thread exited
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            with self.lock:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+            if deadline and time.monotonic() >= deadline:
+                break
+            time.sleep(self.interval)
+        self.stop()
+
+    def collapsed(self):
+        with self.lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit=20):
+        """Functions by samples spent in them (self) and under them (total)."""
+        own, total = collections.Counter(), collections.Counter()
+        with self.lock:
+            stacks = list(self.stacks.items())
+        for stack, count in stacks:
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        return [{'function': name, 'self': count, 'total': total[name]} for name, count in own.most_common(limit)]
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'running': self.running,
+                'thread': self.target.name if self.target else None,
+                'interval': self.interval,
+                'samples': self.samples,
+                'started_at': self.started_at,
+                'stopped_at': self.stopped_at,
+            }
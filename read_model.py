@@ -0,0 +1,122 @@
+"""Versioned, cached view of the auction list behind /api/auctions.
+
+The manager calls ``bump()`` whenever an auction or its bids change. Rows
+are formatted once per (generation, timezone, date_format) and kept until
+the next bump, or until the clock moves an auction across a status
+boundary (it starts, ends, or enters the ending-soon window). Serialized
+responses are cached per query with a content ETag, so a dashboard that
+already has the current list gets a 304 without touching any auction.
+"""
+import collections
+import hashlib
+import itertools
+import json
+import threading
+import time
+
+ENDING_SOON = 24 * 3600  # Seconds before end_time an active auction counts as ending soon
+STATUSES = ('active', 'ended')
+MAX_PER_PAGE = 500
+CACHE_SIZE = 64  # Serialized responses kept; one per distinct query
+
+
+class View(collections.namedtuple('View', ['key', 'rows', 'ends', 'live', 'stats', 'valid_until'])):
+    """Rows and stats for one generation; ``ends``/``live`` are per-row, for filtering."""
+    __slots__ = ()
+
+
+class ReadModel:
+    def __init__(self, manager, clock=time.time, cache_size=CACHE_SIZE):
+        self.manager = manager
+        self.clock = clock
+        self.cache_size = cache_size
+        self.generations = itertools.count(1)  # next() is atomic, so concurrent bumps never collapse into one
+        self.generation = 0
+        self.view = None
+        self.responses = collections.OrderedDict()  # (view key, valid_until, query) -> (body, etag, headers)
+        self.lock = threading.Lock()
+        self.counts = {'builds': 0, 'hits': 0, 'misses': 0}
+
+    def bump(self):
+        self.generation = next(self.generations)
+
+    def current(self):
+        now = self.clock()
+        key = (self.generation, self.manager.timezone.zone, self.manager.date_format)
+        view = self.view
+        if view is None or view.key != key or now >= view.valid_until:
+            # The generation is read before the snapshots, so a change racing the
+            # build only makes this view newer than its key, never older
+            view = self.build(key, now)
+            self.view = view
+        return view
+
+    def build(self, key, now):
+        manager = self.manager
+        rows, ends, live = [], [], []
+        bidders = set()
+        total_bids = ending_soon = 0
+        valid_until = float('inf')
+        for auction in manager.auctions.values():
+            snapshot = auction.snapshot
+            start, end = snapshot.start_time.timestamp(), snapshot.end_time.timestamp()
+            is_live = start <= now <= end
+            rows.append(manager.auction_row(snapshot, is_live))
+            ends.append(end)
+            live.append(is_live)
+            total_bids += snapshot.bid_count
+            if snapshot.current_bidder:
+                bidders.add(snapshot.current_bidder)
+            if is_live and end - now <= ENDING_SOON:
+                ending_soon += 1
+            for edge in (start, end, end - ENDING_SOON):
+                if now <= edge < valid_until:
+                    valid_until = edge
+        stats = {
+            'active_auctions': sum(live),
+            'total_bids': total_bids,
+            'active_bidders': len(bidders),
+            'ending_soon': ending_soon,
+        }
+        self.counts['builds'] += 1
+        return View(key, rows, ends, live, stats, valid_until)
+
+    def query(self, view, status=None, ending_soon=False, page=1, per_page=None):
+        """Filter and page a view's rows; returns (rows, total matching)."""
+        indexes = range(len(view.rows))
+        if status is not None:
+            wanted = status == 'active'
+            indexes = [i for i in indexes if view.live[i] == wanted]
+        if ending_soon:
+            cutoff = self.clock() + ENDING_SOON
+            indexes = sorted((i for i in indexes if view.live[i] and view.ends[i] <= cutoff), key=view.ends.__getitem__)
+        total = len(indexes)
+        if per_page is not None:
+            indexes = indexes[(page - 1) * per_page:page * per_page]
+        return [view.rows[i] for i in indexes], total
+
+    def response(self, query, build):
+        """Serialized JSON for ``query``; ``build(view)`` returns (payload, headers) on a miss."""
+        view = self.current()
+        cache_key = (view.key, view.valid_until, query)
+        with self.lock:
+            entry = self.responses.get(cache_key)
+            if entry is not None:
+                self.responses.move_to_end(cache_key)
+                self.counts['hits'] += 1
+                return entry
+        payload, headers = build(view)
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        # Hash the body rather than the generation: web workers each count their own generations
+        entry = (body, hashlib.sha1(body).hexdigest(), headers)
+        with self.lock:
+            self.counts['misses'] += 1
+            self.responses[cache_key] = entry
+            while len(self.responses) > self.cache_size:
+                self.responses.popitem(last=False)
+        return entry
+
+    def get_stats(self):
+        view = self.view
+        return dict(self.counts, generation=self.generation, cached=len(self.responses),
+                    rows=len(view.rows) if view else 0)
@@ -0,0 +1,129 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class LifecycleScheduler:
+    """Fires auction start/end edges from a heap keyed on their scheduled time.
+
+    ``fire(post_id, edge)`` is called once per scheduled edge ('start' or
+    'end') from the scheduler thread, as soon as the clock passes it.
+    Rescheduling or cancelling a post bumps its generation so stale heap
+    entries are skipped when they come up instead of being searched for.
+    ``clock`` returns epoch seconds; pass a fake one with ``threaded=False``
+    and drive it with ``run_due()`` to simulate time. Errors raised by
+    ``fire`` go to ``log(message, level, event, post_id)``.
+    """
+
+    MAX_WAIT = 60  # Re-check at least this often in case the wall clock jumps
+
+    def __init__(self, fire, clock=time.time, threaded=True, log=None):
+        self.fire = fire
+        self.log = log
+        self.clock = clock
+        self.threaded = threaded
+        self.heap = []  # (when, seq, post_id, edge, generation)
+        self.generations = {}  # post_id -> current generation
+        self.seq = itertools.count()
+        self.lock = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.stats = {'scheduled': 0, 'fired': 0, 'stale': 0, 'max_lag': 0.0}
+
+    def start(self):
+        with self.lock:
+            if self.thread is None and self.threaded:
+                self.running = True
+                self.thread = threading.Thread(target=self._run, daemon=True, name='lifecycle')
+                self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.lock.notify()
+
+    def schedule(self, *auctions):
+        """(Re)schedule auctions' remaining lifecycle edges.
+
+        A large group (a bulk import) is added to the heap and heapified in
+        one pass under one lock rather than pushed entry by entry.
+        """
+        windows = [(auction.post_id, auction.active, auction.start_time.timestamp(), auction.end_time.timestamp())
+                   for auction in auctions]
+        with self.lock:
+            now = self.clock()
+            entries = []
+            for post_id, active, start, end in windows:
+                generation = self.generations.get(post_id, 0) + 1
+                self.generations[post_id] = generation
+                if active or now <= end:
+                    # An auction that ended while nobody was watching never went live, so has no edges.
+                    # Edges already in the past are due now; seq keeps start ahead of end.
+                    entries.append((max(start, now), next(self.seq), post_id, 'start', generation))
+                    entries.append((max(end, now), next(self.seq), post_id, 'end', generation))
+            if len(entries) > len(self.heap):
+                self.heap.extend(entries)
+                heapq.heapify(self.heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(self.heap, entry)
+            self.stats['scheduled'] += len(entries)
+            self.lock.notify()
+        self.start()
+
+    def cancel(self, post_id):
+        with self.lock:
+            if self.generations.pop(post_id, None) is not None:
+                if len(self.heap) > 64 and len(self.heap) > 4 * len(self.generations):
+                    # Mostly cancelled entries: drop them rather than wait for their time to come
+                    self.heap = [entry for entry in self.heap if self.generations.get(entry[2]) == entry[4]]
+                    heapq.heapify(self.heap)
+                self.lock.notify()
+
+    def next_due(self):
+        with self.lock:
+            return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        """Remove and return the (post_id, edge, lag) entries due at ``now``, in time order."""
+        now = self.clock() if now is None else now
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                when, _, post_id, edge, generation = heapq.heappop(self.heap)
+                if self.generations.get(post_id) != generation:
+                    self.stats['stale'] += 1
+                    continue
+                if edge == 'end':
+                    del self.generations[post_id]
+                lag = max(now - when, 0.0)
+                self.stats['fired'] += 1
+                self.stats['max_lag'] = max(self.stats['max_lag'], lag)
+                due.append((post_id, edge, lag))
+        return due
+
+    def run_due(self, now=None):
+        """Fire every edge due at ``now``; returns how many fired."""
+        due = self.pop_due(now)
+        for post_id, edge, _ in due:
+            try:
+                self.fire(post_id, edge)
+            except Exception as e:
+                if self.log is not None:
+                    self.log(f"Error firing {edge} for auction {post_id}: {str(e)}", 'error', 'auction', post_id)
+        return len(due)
+
+    def _run(self):
+        while self.running:
+            with self.lock:
+                wait = self.heap[0][0] - self.clock() if self.heap else self.MAX_WAIT
+                if wait > 0:
+                    self.lock.wait(min(wait, self.MAX_WAIT))
+                    continue
+            if self.running:
+                self.run_due()
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, pending=len(self.heap), auctions=len(self.generations))
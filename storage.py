@@ -0,0 +1,614 @@
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+def apply_event(auctions, event):
+    """Fold one stored event into a dict of post_id -> auction record."""
+    op = event['op']
+    post_id = event['post_id']
+    if op == 'auction':
+        auctions[post_id] = {
+            'post_id': post_id,
+            'start_time': event['start_time'],
+            'end_time': event['end_time'],
+            'starting_bid': event['starting_bid'],
+            'timezone': event['timezone'],
+            'page_id': event.get('page_id'),
+            'current_bid': event['starting_bid'],
+            'current_bidder': None,
+            'active': False,
+            'cursor': None,
+            'bids': [],
+            'bid_count': 0,
+            'archive': None,
+        }
+        return
+    record = auctions.get(post_id)
+    if record is None:
+        return
+    if op == 'delete':
+        del auctions[post_id]
+    elif op == 'bid':
+        record['bids'].append([event['bidder_id'], event['bidder_name'], event['amount'], event['time']])
+        record['bid_count'] += 1
+        record['current_bid'] = event['amount']
+        record['current_bidder'] = event['bidder_id']
+    elif op == 'state':
+        record['active'] = event['active']
+    elif op == 'cursor':
+        record['cursor'] = event['cursor']
+
+
+def finished(record, now=None):
+    """Whether an auction record is over: not running and past its end time."""
+    if record['active']:
+        return False
+    return datetime.datetime.fromisoformat(record['end_time']).timestamp() < (now or time.time())
+
+
+class AuctionStore:
+    """Base for durable auction stores.
+
+    ``append`` hands an event to a single writer thread which commits
+    whatever has queued up together, so a burst of bids costs one fsync.
+    ``flush`` blocks until every event appended so far is durable.
+
+    A batch that fails to write is kept and retried with backoff until it
+    goes through. Meanwhile ``error`` holds the failure and flushes
+    waiting on those events raise it; flushes of earlier events still
+    succeed, and the error clears once the batch is written. Failures and
+    the recovery go to ``log(message, level, event)``.
+
+    ``load`` returns every auction record, but only auctions that haven't
+    finished come with their bids; ended ones have ``bids`` None and a
+    ``bid_count``, and ``bids`` reads their list when something needs it.
+    """
+
+    def __init__(self, max_batch=1000, retry_backoff=0.1, max_retry_backoff=5.0, log=None):
+        self.max_batch = max_batch
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.log = log
+        self.events = queue.Queue()
+        self.lock = threading.Condition()
+        self.appended = 0
+        self.committed = 0
+        self.commits = 0
+        self.error = None
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True, name=type(self).__name__)
+        self.writer.start()
+
+    def append(self, event):
+        with self.lock:
+            self.appended += 1
+            self.events.put(event)
+            return self.appended
+
+    def flush(self, upto=None):
+        with self.lock:
+            target = self.appended if upto is None else upto
+            while self.committed < target:
+                if self.error is not None:
+                    raise self.error
+                self.lock.wait()
+
+    def close(self):
+        self.flush()
+        self.events.put(None)
+        self.writer.join()
+
+    def _writer_loop(self):
+        self._open()
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            batch = [event]
+            while len(batch) < self.max_batch:
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    self.events.put(None)
+                    break
+                batch.append(event)
+            self._commit(batch)
+        self._close()
+
+    def _commit(self, batch):
+        delay = self.retry_backoff
+        while True:
+            try:
+                self._write_batch(batch)
+                break
+            except Exception as e:
+                with self.lock:
+                    first = self.error is None
+                    self.error = e
+                    self.lock.notify_all()
+                if first and self.log is not None:
+                    self.log(f"Error writing auction store, retrying: {str(e)}", 'error', 'storage')
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_backoff)
+        with self.lock:
+            recovered = self.error is not None
+            self.error = None
+            self.committed += len(batch)
+            self.commits += 1
+            self.lock.notify_all()
+        if recovered and self.log is not None:
+            self.log('Auction store writes recovered', 'info', 'storage')
+
+    def _open(self):
+        pass
+
+    def _close(self):
+        pass
+
+    def _write_batch(self, events):
+        raise NotImplementedError
+
+    def load(self):
+        raise NotImplementedError
+
+    def bids(self, post_id, limit=None):
+        """One auction's bids, oldest first, as [bidder_id, bidder_name, amount, ISO time]; at most ``limit``."""
+        raise NotImplementedError
+
+
+class WALStore(AuctionStore):
+    """Append-only JSON-lines log with periodic snapshots.
+
+    Every ``snapshot_every`` events the writer dumps the live auctions to a
+    snapshot and starts a fresh log, so startup replays the snapshot plus a
+    short tail instead of the whole history. Events carry a sequence number
+    and replay skips anything already covered by the snapshot.
+
+    Before each snapshot the bids of finished auctions move to an
+    append-only archive file, and their records keep only its offset, so
+    neither the snapshot nor memory carries bid lists nobody polls.
+    """
+
+    def __init__(self, directory, snapshot_every=10000, **kwargs):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.wal_path = os.path.join(directory, 'auctions.wal')
+        self.snapshot_path = os.path.join(directory, 'auctions.snapshot.json')
+        self.archive_path = os.path.join(directory, 'auctions.archive.jsonl')
+        self.state_lock = threading.Lock()  # The writer changes state while readers copy from it
+        os.makedirs(directory, exist_ok=True)
+        self.seq, self.state = self._read()
+        self.since_snapshot = 0
+        self.wal = None
+        super().__init__(**kwargs)
+
+    def _open(self):
+        # Cut off a torn tail first, or the next event would be glued onto it and lost with it
+        if os.path.exists(self.wal_path) and os.path.getsize(self.wal_path) > self.wal_end:
+            os.truncate(self.wal_path, self.wal_end)
+        self.wal = open(self.wal_path, 'a', encoding='utf-8')
+
+    def _close(self):
+        self.wal.close()
+
+    def _write_batch(self, events):
+        events = [dict(event, seq=self.seq + i) for i, event in enumerate(events, 1)]
+        if self.wal.closed:  # A snapshot failed to reopen it
+            self.wal = open(self.wal_path, 'a', encoding='utf-8')
+        start = os.fstat(self.wal.fileno()).st_size
+        try:
+            self.wal.write('\n'.join(json.dumps(event) for event in events) + '\n')
+            self.wal.flush()
+            os.fsync(self.wal.fileno())
+        except Exception:
+            self._rewind(start)
+            raise
+        # Only once the events are durable, so a failed batch can be retried as it was
+        self.seq += len(events)
+        with self.state_lock:
+            for event in events:
+                apply_event(self.state, event)
+        self.since_snapshot += len(events)
+        if self.since_snapshot >= self.snapshot_every:
+            try:
+                self.snapshot()
+            except Exception as e:  # The log still holds everything; try again after the next batch
+                if self.log is not None:
+                    self.log(f"Error writing auction snapshot: {str(e)}", 'error', 'storage')
+
+    def _rewind(self, offset):
+        # Drop whatever part of a failed batch reached the log, so its retry starts on a clean line
+        try:
+            self.wal.close()
+        except OSError:
+            pass
+        os.truncate(self.wal_path, offset)
+        self.wal = open(self.wal_path, 'a', encoding='utf-8')
+
+    def snapshot(self):
+        # Only called from the writer thread, the only one that changes state
+        self.archive_finished()
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self.seq, 'auctions': self.state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.wal.close()
+        self.wal = open(self.wal_path, 'w', encoding='utf-8')
+        self.since_snapshot = 0
+
+    def archive_finished(self):
+        """Move finished auctions' bids out of state into the archive file."""
+        now = time.time()
+        records = [record for record in self.state.values() if record['bids'] and finished(record, now)]
+        if not records:
+            return
+        offsets = []
+        with open(self.archive_path, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            for record in records:
+                offsets.append(f.tell())
+                bids = self._archived(record) + record['bids']
+                f.write(json.dumps({'post_id': record['post_id'], 'bids': bids}).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        with self.state_lock:
+            for record, offset in zip(records, offsets):
+                record['archive'] = offset
+                record['bids'] = []
+
+    def _archived(self, record):
+        if record['archive'] is None:
+            return []
+        with open(self.archive_path, 'rb') as f:
+            f.seek(record['archive'])
+            return json.loads(f.readline())['bids']
+
+    def _read(self):
+        seq = 0
+        auctions = {}
+        self.wal_end = 0  # Byte offset just past the last whole event in the log
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            seq = snapshot['seq']
+            auctions = snapshot['auctions']
+            for record in auctions.values():  # Snapshots from before the archive
+                record.setdefault('bid_count', len(record['bids']))
+                record.setdefault('archive', None)
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    offset += len(line)
+                    if not line.endswith(b'\n'):
+                        break  # Torn write at the tail from a crash
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # A damaged line; the events after it still count
+                    self.wal_end = offset
+                    if event['seq'] <= seq:
+                        continue
+                    apply_event(auctions, event)
+                    seq = event['seq']
+        return seq, auctions
+
+    def load(self):
+        self.flush()
+        now = time.time()
+        records = []
+        with self.state_lock:
+            for record in self.state.values():
+                bids = None if finished(record, now) else self._archived(record) + record['bids']
+                records.append(dict(record, bids=bids))
+        for record in records:
+            del record['archive']
+        return json.loads(json.dumps(records))
+
+    def bids(self, post_id, limit=None):
+        with self.state_lock:
+            record = self.state.get(post_id)
+            bids = [] if record is None else self._archived(record) + record['bids']
+        return [list(bid) for bid in bids[:limit]]
+
+
+class SQLiteStore(AuctionStore):
+    """SQLite-backed store; each group of queued events is one transaction.
+
+    Every transaction stamps the auctions it touches with the next
+    ``version``, and deletions leave a tombstone with theirs, so another
+    process can read just what changed since its last look (``changes``).
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS auctions (
+            post_id TEXT PRIMARY KEY,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            starting_bid REAL NOT NULL,
+            timezone TEXT NOT NULL,
+            current_bid REAL NOT NULL,
+            current_bidder TEXT,
+            active INTEGER NOT NULL DEFAULT 0,
+            cursor TEXT,
+            page_id TEXT,
+            version INTEGER NOT NULL DEFAULT 0,
+            created INTEGER NOT NULL DEFAULT 0,
+            bid_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS bids (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id TEXT NOT NULL,
+            bidder_id TEXT,
+            bidder_name TEXT,
+            amount REAL NOT NULL,
+            time TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS bids_post_id ON bids (post_id, id);
+        CREATE TABLE IF NOT EXISTS deletions (
+            post_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS deletions_version ON deletions (version);
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS inbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    '''
+    # Columns added to auctions after the first release, for databases made before them
+    MIGRATIONS = {
+        'page_id': 'TEXT',
+        'version': 'INTEGER NOT NULL DEFAULT 0',
+        'created': 'INTEGER NOT NULL DEFAULT 0',
+        'bid_count': 'INTEGER NOT NULL DEFAULT 0',
+    }
+    # Filling in a migrated column for the rows already there
+    BACKFILLS = {
+        'bid_count': 'UPDATE auctions SET bid_count = '
+                     '(SELECT COUNT(*) FROM bids WHERE bids.post_id = auctions.post_id)',
+    }
+    COLUMNS = ('post_id, start_time, end_time, starting_bid, timezone, current_bid, current_bidder, active, cursor, '
+               'page_id, created, bid_count')
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.conn = None
+        self.reader = None
+        self.reader_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _connect(self, **kwargs):
+        conn = sqlite3.connect(self.path, timeout=30, **kwargs)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(auctions)')}
+        for name, definition in self.MIGRATIONS.items():
+            if name not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE auctions ADD COLUMN {name} {definition}")
+                except sqlite3.OperationalError:
+                    continue  # Another process added it first
+                if name in self.BACKFILLS:
+                    conn.execute(self.BACKFILLS[name])
+                    conn.commit()
+        conn.execute('CREATE INDEX IF NOT EXISTS auctions_version ON auctions (version)')
+        return conn
+
+    def _open(self):
+        self.conn = self._connect()
+
+    def _close(self):
+        self.conn.close()
+
+    def _write_batch(self, events):
+        with self.conn:
+            # Taking the write lock first keeps versions in commit order across processes
+            self.conn.execute('BEGIN IMMEDIATE')
+            version = self._last_version(self.conn) + 1
+            for event in events:
+                op = event['op']
+                post_id = event['post_id']
+                if op == 'auction':
+                    self.conn.execute('DELETE FROM bids WHERE post_id = ?', (post_id,))
+                    self.conn.execute('DELETE FROM deletions WHERE post_id = ?', (post_id,))
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO auctions (post_id, start_time, end_time, starting_bid, timezone, '
+                        'current_bid, page_id, version, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (post_id, event['start_time'], event['end_time'], event['starting_bid'],
+                         event['timezone'], event['starting_bid'], event.get('page_id'), version, version),
+                    )
+                elif op == 'bid':
+                    self.conn.execute(
+                        'INSERT INTO bids (post_id, bidder_id, bidder_name, amount, time) VALUES (?, ?, ?, ?, ?)',
+                        (post_id, event['bidder_id'], event['bidder_name'], event['amount'], event['time']),
+                    )
+                    self.conn.execute(
+                        'UPDATE auctions SET current_bid = ?, current_bidder = ?, bid_count = bid_count + 1, '
+                        'version = ? WHERE post_id = ?',
+                        (event['amount'], event['bidder_id'], version, post_id),
+                    )
+                elif op == 'state':
+                    self.conn.execute('UPDATE auctions SET active = ?, version = ? WHERE post_id = ?',
+                                      (int(event['active']), version, post_id))
+                elif op == 'cursor':
+                    self.conn.execute('UPDATE auctions SET cursor = ?, version = ? WHERE post_id = ?',
+                                      (json.dumps(event['cursor']), version, post_id))
+                elif op == 'delete':
+                    self.conn.execute('DELETE FROM bids WHERE post_id = ?', (post_id,))
+                    self.conn.execute('DELETE FROM auctions WHERE post_id = ?', (post_id,))
+                    self.conn.execute('INSERT OR REPLACE INTO deletions (post_id, version) VALUES (?, ?)',
+                                      (post_id, version))
+
+    @staticmethod
+    def _last_version(conn):
+        return conn.execute(
+            'SELECT MAX(COALESCE((SELECT MAX(version) FROM auctions), 0), '
+            'COALESCE((SELECT MAX(version) FROM deletions), 0))'
+        ).fetchone()[0]
+
+    def _read_conn(self):
+        # Autocommit connection shared by readers and the small control writes below
+        if self.reader is None:
+            self.reader = self._connect(check_same_thread=False, isolation_level=None)
+        return self.reader
+
+    def data_version(self):
+        """Changes whenever another connection (or process) commits to the database."""
+        with self.reader_lock:
+            return self._read_conn().execute('PRAGMA data_version').fetchone()[0]
+
+    def get_setting(self, key, default=None):
+        with self.reader_lock:
+            row = self._read_conn().execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_setting(self, key, value):
+        with self.reader_lock:
+            self._read_conn().execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
+
+    def acquire_lease(self, name, holder, ttl):
+        """Take or renew a named lease; return True if ``holder`` owns it afterwards."""
+        now = time.time()
+        with self.reader_lock:
+            conn = self._read_conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT holder, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+                if row is not None and row[0] != holder and row[1] > now:
+                    conn.execute('COMMIT')
+                    return False
+                conn.execute('INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)',
+                             (name, holder, now + ttl))
+                conn.execute('COMMIT')
+                return True
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def release_lease(self, name, holder):
+        with self.reader_lock:
+            self._read_conn().execute('DELETE FROM leases WHERE name = ? AND holder = ?', (name, holder))
+
+    def push_inbox(self, items):
+        """Park JSON-serializable items for another process to pick up."""
+        with self.reader_lock:
+            self._read_conn().executemany('INSERT INTO inbox (payload) VALUES (?)',
+                                          [(json.dumps(item),) for item in items])
+
+    def pop_inbox(self, limit=500):
+        with self.reader_lock:
+            conn = self._read_conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute('SELECT id, payload FROM inbox ORDER BY id LIMIT ?', (limit,)).fetchall()
+                if rows:
+                    conn.execute('DELETE FROM inbox WHERE id <= ?', (rows[-1][0],))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return [json.loads(payload) for _, payload in rows]
+
+    def lease_holder(self, name):
+        with self.reader_lock:
+            row = self._read_conn().execute(
+                'SELECT holder FROM leases WHERE name = ? AND expires_at > ?', (name, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self):
+        self.flush()
+        return self.changes()[0]
+
+    def changes(self, since=None):
+        """What changed after the ``since`` mark an earlier call returned; None reads everything.
+
+        Returns ``(records, bids, deleted, mark)``: the auction records whose
+        version moved, each flagged ``new`` when it was created or re-created
+        after the mark (and then carrying its whole bid list, unless it has
+        finished); the bids placed since on the others, as ``(post_id, bid)``;
+        the post_ids deleted since; and the mark to pass next time. It all
+        comes from one read transaction.
+        """
+        version, bid_id = since or (-1, 0)
+        now = time.time()
+        with self.reader_lock:
+            conn = self._read_conn()
+            conn.execute('BEGIN')
+            try:
+                mark = (self._last_version(conn), conn.execute('SELECT COALESCE(MAX(id), 0) FROM bids').fetchone()[0])
+                auctions = {}
+                for row in conn.execute(f"SELECT {self.COLUMNS} FROM auctions WHERE version > ?", (version,)):
+                    auctions[row[0]] = self._record(row, row[10] > version, now)
+                for post_id, record in auctions.items():
+                    if record['bids'] is not None:
+                        record['bids'] = [list(row) for row in conn.execute(
+                            'SELECT bidder_id, bidder_name, amount, time FROM bids '
+                            'WHERE post_id = ? AND id <= ? ORDER BY id', (post_id, mark[1]))]
+                bids = []
+                if since is not None:
+                    bids = [(row[0], list(row[1:])) for row in conn.execute(
+                        'SELECT post_id, bidder_id, bidder_name, amount, time FROM bids '
+                        'WHERE id > ? AND id <= ? ORDER BY id', (bid_id, mark[1]))
+                        if row[0] in auctions and not auctions[row[0]]['new']]
+                deleted = [] if since is None else [row[0] for row in conn.execute(
+                    'SELECT post_id FROM deletions WHERE version > ?', (version,))]
+            finally:
+                conn.execute('COMMIT')
+        return list(auctions.values()), bids, deleted, mark
+
+    def bids(self, post_id, limit=None):
+        with self.reader_lock:
+            rows = self._read_conn().execute(
+                'SELECT bidder_id, bidder_name, amount, time FROM bids WHERE post_id = ? ORDER BY id LIMIT ?',
+                (post_id, -1 if limit is None else limit)).fetchall()
+        return [list(row) for row in rows]
+
+    @staticmethod
+    def _record(row, new=True, now=None):
+        record = {
+            'post_id': row[0],
+            'start_time': row[1],
+            'end_time': row[2],
+            'starting_bid': row[3],
+            'timezone': row[4],
+            'current_bid': row[5],
+            'current_bidder': row[6],
+            'active': bool(row[7]),
+            'cursor': json.loads(row[8]) if row[8] else None,
+            'page_id': row[9],
+            'bid_count': row[11],
+            'new': new,
+        }
+        record['bids'] = [] if new and not finished(record, now) else None
+        return record
+
+
+def open_store(spec):
+    """Open a store from a spec like ``wal:/var/lib/auctions`` or ``sqlite:auctions.db``."""
+    if not spec:
+        return None
+    backend, _, path = spec.partition(':')
+    if backend == 'wal':
+        return WALStore(path)
+    if backend == 'sqlite':
+        return SQLiteStore(path)
+    raise ValueError(f"Unknown auction store: {spec}")
@@ -0,0 +1,143 @@
+import collections
+import hashlib
+import hmac
+import queue
+import threading
+import time
+
+
+def verify_signature(app_secret, body, signature_header):
+    """Check Meta's X-Hub-Signature-256 header against the raw request body."""
+    if not app_secret or not signature_header or not signature_header.startswith('sha256='):
+        return False
+    expected = hmac.new(app_secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len('sha256='):])
+
+
+def as_list(value):
+    return value if isinstance(value, list) else []
+
+
+def extract_comments(payload):
+    """Pull new-comment changes out of a Page ``feed`` webhook payload; parts of the wrong shape are skipped."""
+    comments = []
+    for entry in as_list(payload.get('entry')):
+        for change in as_list(entry.get('changes') if isinstance(entry, dict) else None):
+            value = change.get('value') if isinstance(change, dict) else None
+            if not isinstance(value, dict) or change.get('field') != 'feed':
+                continue
+            if value.get('item') != 'comment' or value.get('verb') != 'add':
+                continue
+            if not value.get('comment_id') or not value.get('message'):
+                continue
+            comments.append((value.get('post_id'), {
+                'id': value['comment_id'],
+                'message': value['message'],
+                'from': value.get('from', {}),
+                'created_time': value.get('created_time'),
+            }))
+    return comments
+
+
+class CommentDeduper:
+    """Bounded set of comment ids already handled by webhooks or polling."""
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.seen = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def claim(self, comment_id):
+        """Return True the first time an id is seen."""
+        with self.lock:
+            if comment_id in self.seen:
+                return False
+            self.seen[comment_id] = None
+            if len(self.seen) > self.capacity:
+                self.seen.popitem(last=False)
+            return True
+
+    def release(self, comment_id):
+        with self.lock:
+            self.seen.pop(comment_id, None)
+
+
+class WebhookIngestor:
+    """Queues webhook comments and feeds them to the manager off the request thread.
+
+    ``submit`` only dedupes and enqueues, so the HTTP response never waits
+    on bid processing. When the queue is full the comment is released
+    again and left for the reconciliation poll to pick up.
+    """
+
+    def __init__(self, manager, max_queue=10000):
+        self.manager = manager
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.drain_thread = None
+        self.draining = False
+        self.lock = threading.Lock()
+        self.stats = {'received': 0, 'duplicates': 0, 'dropped': 0, 'processed': 0, 'unknown_post': 0}
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._worker, daemon=True, name='webhook-ingestor')
+                self.thread.start()
+
+    def submit(self, comments):
+        self.start()
+        accepted = 0
+        for post_id, comment in comments:
+            with self.lock:
+                self.stats['received'] += 1
+            if not self.manager.seen_comments.claim(comment['id']):
+                with self.lock:
+                    self.stats['duplicates'] += 1
+                continue
+            try:
+                self.queue.put_nowait((post_id, comment))
+                accepted += 1
+            except queue.Full:
+                self.manager.seen_comments.release(comment['id'])
+                with self.lock:
+                    self.stats['dropped'] += 1
+        return accepted
+
+    def _worker(self):
+        while True:
+            post_id, comment = self.queue.get()
+            try:
+                if self.manager.ingest_comment(post_id, comment):
+                    key = 'processed'
+                else:
+                    key = 'unknown_post'
+                with self.lock:
+                    self.stats[key] += 1
+            except Exception as e:
+                self.manager.log_message(f"Error ingesting webhook comment {comment['id']}: {str(e)}", 'error', 'webhook', post_id)
+
+    def follow_store(self, store, interval=0.5):
+        """Drain comments web workers parked in the shared store (monitor process only)."""
+        self.draining = True
+        if self.drain_thread is not None:
+            return
+
+        def drain():
+            while True:
+                if self.draining:
+                    try:
+                        comments = store.pop_inbox()
+                        if comments:
+                            self.submit(comments)
+                            continue
+                    except Exception as e:
+                        self.manager.log_message(f"Error draining webhook inbox: {str(e)}", 'error', 'webhook')
+                time.sleep(interval)
+
+        self.drain_thread = threading.Thread(target=drain, daemon=True, name='webhook-inbox')
+        self.drain_thread.start()
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, depth=self.queue.qsize())